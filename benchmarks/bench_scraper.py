@@ -0,0 +1,254 @@
+"""
+Offline scraper benchmark
+Runs PlaywrightBookingScraper searches and hotel-details scrapes (and the browserless
+HTTP path) against the replayed fixtures at several concurrency levels, reporting
+latency, throughput and per-stage time (launch, lease, goto, wait, evaluate, ...).
+
+    python -m benchmarks.bench_scraper                     # run and compare to baseline
+    python -m benchmarks.bench_scraper --save-baseline     # accept this run as the baseline
+    python -m benchmarks.bench_scraper --concurrency 1,4 --target search
+
+Every run is written to benchmarks/results/<timestamp>.json. The exit code is 1 when a
+p50 latency or throughput figure regresses past --threshold against baseline.json.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.replay import FixtureServer, ReplayRouter
+from browser_pool import BrowserPool, bind_engine_loop
+from config import BROWSER_POOL_CONFIG, SCRAPER_CONFIG
+from timings import StageTimer
+import scraper
+import scraper_playwright
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+TARGETS = ("search", "details", "http_search", "http_details")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def request_factory(target: str, base_url: str) -> Callable[[int], Awaitable]:
+    """Build the i-th request; every i gets its own city/hotel URL so nothing is coalesced"""
+    search = scraper_playwright.PlaywrightBookingScraper()
+    if target == "search":
+        return lambda i: search.search_hotels_async(f"Bengaluru {i}")
+    if target == "details":
+        return lambda i: scraper_playwright.fetch_hotel_details_async(
+            f"https://www.booking.com/hotel/in/bench-{i}.html"
+        )
+    if target == "http_search":
+        return lambda i: asyncio.to_thread(scraper.fetch_hotels, f"Bengaluru {i}")
+    return lambda i: asyncio.to_thread(scraper.fetch_hotel_details_http, f"{base_url}/hotel/in/bench-{i}.html")
+
+
+async def timed(call: Awaitable) -> Dict:
+    with StageTimer() as timer:
+        start = time.perf_counter()
+        try:
+            ok = bool(await call)
+        except Exception as e:
+            logger.error(f"Benchmark request failed: {e}")
+            ok = False
+        elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "ok": ok, "stages": timer.as_ms()}
+
+
+async def run_level(target: str, concurrency: int, rounds: int, make_request, offset: int) -> Dict:
+    """`concurrency` workers each issuing `rounds` requests back to back"""
+    samples = []
+
+    async def worker(w: int):
+        for r in range(rounds):
+            samples.append(await timed(make_request(offset + w * rounds + r)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies = [s["seconds"] * 1000 for s in samples]
+    stage_totals = defaultdict(float)
+    for sample in samples:
+        for name, ms in sample["stages"].items():
+            stage_totals[name] += ms
+    return {
+        "target": target,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "ok": sum(s["ok"] for s in samples),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(samples) / wall, 3) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "mean_ms": round(statistics.mean(latencies), 1),
+        "stages_mean_ms": {name: round(total / len(samples), 1) for name, total in sorted(stage_totals.items())},
+    }
+
+
+async def run(args) -> Dict:
+    # Host the pool on this loop and swap in one whose pages are served from fixtures
+    bind_engine_loop(asyncio.get_running_loop())
+    router = ReplayRouter(latency_ms=args.latency_ms)
+
+    async def page_setup(page):
+        await scraper_playwright.PlaywrightBookingScraper.setup_route(page)
+        await router.install(page)
+
+    pool = BrowserPool(size=args.pool_size, page_setup=page_setup)
+    scraper_playwright._pool = pool
+    SCRAPER_CONFIG["extraction_mode"] = args.mode
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "settings": {
+            "pool_size": args.pool_size,
+            "rounds": args.rounds,
+            "latency_ms": args.latency_ms,
+            "extraction_mode": args.mode,
+        },
+        "cold_start": None,
+        "runs": [],
+    }
+
+    # The HTTP scraper builds its URLs from base_url, so point it at the stand-in server
+    server = FixtureServer(latency_ms=args.latency_ms).start()
+    live_base_url = scraper.BOOKING_CONFIG["base_url"]
+    scraper.BOOKING_CONFIG["base_url"] = server.url
+    try:
+        if any(t in ("search", "details") for t in args.target):
+            with StageTimer() as timer:
+                start = time.perf_counter()
+                await pool.start()
+                cold = time.perf_counter() - start
+            report["cold_start"] = {"seconds": round(cold, 3), "stages_ms": timer.as_ms()}
+            logger.info(f"🚀 Pool of {args.pool_size} ready in {cold:.2f}s")
+
+        offset = 0
+        for target in args.target:
+            make_request = request_factory(target, server.url)
+            for concurrency in args.concurrency:
+                result = await run_level(target, concurrency, args.rounds, make_request, offset)
+                offset += result["requests"]
+                report["runs"].append(result)
+                logger.info(
+                    f"📊 {target} x{concurrency}: {result['throughput_rps']} req/s, "
+                    f"p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms ({result['ok']}/{result['requests']} ok)"
+                )
+    finally:
+        scraper.BOOKING_CONFIG["base_url"] = live_base_url
+        server.stop()
+        await pool.close()
+    report["replay"] = {"served": router.served + server.router.served, "blocked": router.blocked}
+    return report
+
+
+def compare(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Regressions of this report against the baseline, as human-readable lines"""
+    previous = {(r["target"], r["concurrency"]): r for r in baseline.get("runs", [])}
+    regressions = []
+    for run in report["runs"]:
+        base = previous.get((run["target"], run["concurrency"]))
+        if not base:
+            continue
+        name = f"{run['target']} x{run['concurrency']}"
+        if base["p50_ms"] and run["p50_ms"] > base["p50_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p50 {base['p50_ms']}ms -> {run['p50_ms']}ms")
+        if base["throughput_rps"] and run["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['throughput_rps']} -> {run['throughput_rps']} req/s")
+        if run["ok"] < run["requests"] and base["ok"] == base["requests"]:
+            regressions.append(f"{name}: {run['requests'] - run['ok']} failed requests")
+    return regressions
+
+
+def print_table(report: Dict):
+    if report["cold_start"]:
+        print(f"\nCold start: {report['cold_start']['seconds']}s {report['cold_start']['stages_ms']}")
+    print(f"\n{'target':<14}{'conc':>5}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'ok':>8}  stages (mean ms)")
+    for run in report["runs"]:
+        stages = ", ".join(f"{name} {ms}" for name, ms in run["stages_mean_ms"].items())
+        print(
+            f"{run['target']:<14}{run['concurrency']:>5}{run['throughput_rps']:>9}{run['p50_ms']:>10}"
+            f"{run['p95_ms']:>10}{run['ok']:>4}/{run['requests']:<3}  {stages}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="search,details,http_search,http_details",
+                        help=f"comma-separated subset of {', '.join(TARGETS)}")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=3, help="requests per worker at each level")
+    parser.add_argument("--pool-size", type=int, default=BROWSER_POOL_CONFIG["size"])
+    parser.add_argument("--latency-ms", type=float, default=0, help="simulated network latency per response")
+    parser.add_argument("--mode", default=SCRAPER_CONFIG["extraction_mode"], choices=["auto", "dom"])
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown vs. the baseline")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+    args.target = [t for t in args.target.split(",") if t]
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    unknown = set(args.target) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.INFO)
+    # Scraper logs every navigation; keep the benchmark output readable
+    for name in ("scraper", "scraper_playwright", "browser_pool", "singleflight"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    report = asyncio.run(run(args))
+    print_table(report)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {path}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline {BASELINE_PATH}")
+        return
+
+    if not os.path.exists(BASELINE_PATH):
+        print("No baseline yet; rerun with --save-baseline to record one")
+        return
+    with open(BASELINE_PATH) as f:
+        regressions = compare(report, json.load(f), args.threshold)
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
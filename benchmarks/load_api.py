@@ -0,0 +1,269 @@
+"""
+API load test with stub scraper backends
+Serves the FastAPI app from main.py with uvicorn, replaces the scrapers it calls with
+stubs of fixed latency, and drives /hotels/search and /hotels/details at increasing
+open-loop request rates. Reports p50/p95/p99 latency, errors and the server event
+loop's lag, i.e. the cost of the API layer itself before any scraping happens.
+
+    python -m benchmarks.load_api
+    python -m benchmarks.load_api --rates 50,200,800 --duration 5 --stub-latency-ms 200
+    python -m benchmarks.load_api --backend http --cache    # browserless stubs, caching on
+
+Results are written to benchmarks/results/load-<timestamp>.json.
+"""
+
+from datetime import datetime
+from typing import Dict, List
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+LAG_PROBE_INTERVAL = 0.01
+
+
+def stub_hotels(city: str) -> List[Dict]:
+    return [
+        {
+            "hotel_id": 10000 + i,
+            "name": f"{city.title()} Stub Hotel {i}",
+            "price": 2500.0 + 100 * i,
+            "currency": "INR",
+            "rating": 4.2,
+            "url": f"https://www.booking.com/hotel/in/stub-{i}.html",
+        }
+        for i in range(10)
+    ]
+
+
+def stub_details(hotel_url: str) -> Dict:
+    return {
+        "hotel_id": 42,
+        "name": "Stub Grand",
+        "rating": 4.4,
+        "address": "1 MG Road, Bengaluru",
+        "description": "A stub hotel for load testing.",
+        "amenities": [{"category": "Popular", "name": name} for name in ("Free WiFi", "Pool", "Gym", "Spa")],
+        "reviews": [{"reviewer_name": "Guest", "rating": 8.0, "comment": "Fine stay."}] * 3,
+        "photos": [],
+        "room_types": [{"name": "Deluxe Room", "price": 6400.0, "currency": "INR"}] * 3,
+    }
+
+
+def install_stubs(main, latency: float, backend: str, cache: bool):
+    """Swap the scraper entry points main calls for fixed-latency stubs"""
+    async def search_async(city, checkin=None, checkout=None):
+        await asyncio.sleep(latency)
+        return stub_hotels(city)
+
+    async def details_async(hotel_url, sections=None, deadline=None):
+        await asyncio.sleep(latency)
+        return stub_details(hotel_url)
+
+    # The browserless scrapers are blocking and run in a worker thread
+    def search_http(city, checkin=None, checkout=None):
+        time.sleep(latency)
+        return stub_hotels(city)
+
+    def details_http(hotel_url, sections=None):
+        time.sleep(latency)
+        return stub_details(hotel_url)
+
+    # main imports these from the scraper modules at call time
+    import scraper
+    import scraper_playwright
+    scraper_playwright.fetch_hotels_advanced_async = search_async
+    scraper_playwright.fetch_hotel_details_async = details_async
+    scraper.fetch_hotels = search_http
+    scraper.fetch_hotel_details_http = details_http
+    main.HTTP_SCRAPER_CONFIG["enabled"] = backend == "http"
+    main.search_cache.enabled = cache
+    main.details_cache.store.enabled = cache
+
+
+class LagProbe:
+    """Samples how late the server loop wakes up from a short sleep"""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self._task = None
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            self.samples.append(time.perf_counter() - start - LAG_PROBE_INTERVAL)
+
+    async def start(self):
+        self._task = asyncio.get_running_loop().create_task(self.run())
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", loop="asyncio"))
+    thread = threading.Thread(target=server.run, name="api-server", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("API server failed to start")
+        time.sleep(0.05)
+    return server, thread
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+async def run_step(client: httpx.AsyncClient, target: str, rate: float, duration: float, probe: LagProbe, api_key: str) -> Dict:
+    """Fire `rate` requests per second for `duration` seconds regardless of how fast they return"""
+    latencies, errors, statuses = [], 0, {}
+    lag_start = len(probe.samples)
+
+    async def one(i: int):
+        nonlocal errors
+        if target == "search":
+            path, params = "/hotels/search", {"city": f"city{i % 50}"}
+        else:
+            path, params = "/hotels/details", {"hotel_url": f"https://www.booking.com/hotel/in/stub-{i % 50}.html"}
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, params=params, headers={"access_token": api_key})
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+        if status != "200":
+            errors += 1
+
+    total = int(rate * duration)
+    tasks = []
+    start = time.perf_counter()
+    for i in range(total):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i)))
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+
+    lag_ms = [lag * 1000 for lag in probe.samples[lag_start:]]
+    return {
+        "target": target,
+        "rate": rate,
+        "requests": total,
+        "errors": errors,
+        "statuses": statuses,
+        "achieved_rps": round(total / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "mean_ms": round(statistics.mean(latencies), 1) if latencies else 0.0,
+        "loop_lag_p99_ms": round(percentile(lag_ms, 99), 2),
+        "loop_lag_max_ms": round(max(lag_ms), 2) if lag_ms else 0.0,
+    }
+
+
+async def drive(base_url: str, args, probe: LagProbe, api_key: str) -> List[Dict]:
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        steps = []
+        for target in args.target:
+            for rate in args.rates:
+                step = await run_step(client, target, rate, args.duration, probe, api_key)
+                steps.append(step)
+                logger.info(
+                    f"📊 {target} @ {rate}/s: {step['achieved_rps']} req/s, p50 {step['p50_ms']}ms, "
+                    f"p99 {step['p99_ms']}ms, {step['errors']} errors, loop lag p99 {step['loop_lag_p99_ms']}ms"
+                )
+        return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="search,details", help="comma-separated subset of search, details")
+    parser.add_argument("--rates", default="25,50,100,200,400", help="comma-separated request rates (req/s)")
+    parser.add_argument("--duration", type=float, default=5, help="seconds per rate step")
+    parser.add_argument("--stub-latency-ms", type=float, default=50, help="latency of the stub scraper")
+    parser.add_argument("--backend", choices=["browser", "http"], default="browser",
+                        help="which scraper path the stubs stand in for")
+    parser.add_argument("--cache", action="store_true", help="keep the result caches on (default: every request scrapes)")
+    parser.add_argument("--max-connections", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+    args.target = [t for t in args.target.split(",") if t]
+    args.rates = [float(r) for r in args.rates.split(",")]
+
+    # Keep the load test away from the real disk cache and background refreshes
+    os.environ["HOTEL_CACHE_DB"] = os.path.join(tempfile.mkdtemp(prefix="hotel-load-"), "cache.db")
+    import config
+    config.REFRESH_CONFIG["enabled"] = False
+    config.STARTUP_CONFIG["prewarm"] = False
+    # One key drives all the load: no quotas, and stub scrapes are not capped by the browser count
+    config.RATE_LIMIT_CONFIG["enabled"] = False
+    config.SCHEDULER_CONFIG["concurrency"] = args.max_connections
+    import main as api
+
+    logging.basicConfig(level=logging.INFO)
+    for name in ("main", "scraper", "scraper_playwright", "browser_pool", "refresh"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    install_stubs(api, args.stub_latency_ms / 1000, args.backend, args.cache)
+    probe = LagProbe()
+    api.app.router.add_event_handler("startup", probe.start)
+
+    port = free_port()
+    server, thread = start_server(api.app, port)
+    try:
+        steps = asyncio.run(drive(f"http://127.0.0.1:{port}", args, probe, config.VALID_API_KEYS[0]))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    print(f"\n{'target':<9}{'rate':>7}{'req/s':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'errors':>8}{'lag p99':>9}{'lag max':>9}")
+    for step in steps:
+        print(
+            f"{step['target']:<9}{step['rate']:>7g}{step['achieved_rps']:>8}{step['p50_ms']:>8}{step['p95_ms']:>8}"
+            f"{step['p99_ms']:>8}{step['errors']:>8}{step['loop_lag_p99_ms']:>9}{step['loop_lag_max_ms']:>9}"
+        )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"load-{datetime.now():%Y%m%d-%H%M%S}.json")
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "settings": {
+            "stub_latency_ms": args.stub_latency_ms,
+            "backend": args.backend,
+            "cache": args.cache,
+            "duration": args.duration,
+        },
+        "steps": steps,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Replay recorded Booking.com pages without touching the live site
+Fixtures are listed in fixtures/index.json as URL pattern -> file. They can be served
+to Playwright through route fulfilment (ReplayRouter) or to the HTTP scraper through a
+local stand-in server (FixtureServer).
+
+Record fresh fixtures from the live site:
+    python -m benchmarks.replay record --city Bengaluru --hotel-url https://www.booking.com/hotel/in/...
+Serve them for manual poking:
+    python -m benchmarks.replay serve --port 8765
+"""
+
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+@dataclass
+class Fixture:
+    pattern: "re.Pattern"
+    path: str
+    content_type: str
+    status: int = 200
+
+    def body(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+def load_fixtures(directory: str = FIXTURES_DIR) -> List[Fixture]:
+    with open(os.path.join(directory, "index.json")) as f:
+        manifest = json.load(f)
+    return [
+        Fixture(
+            pattern=re.compile(entry["pattern"]),
+            path=os.path.join(directory, entry["file"]),
+            content_type=entry.get("content_type", "text/html; charset=utf-8"),
+            status=entry.get("status", 200),
+        )
+        for entry in manifest["entries"]
+    ]
+
+
+class ReplayRouter:
+    """Fulfils matching Playwright requests from fixtures, optionally after a fixed latency"""
+
+    def __init__(self, fixtures: Optional[List[Fixture]] = None, latency_ms: float = 0, offline: bool = True):
+        self.fixtures = fixtures if fixtures is not None else load_fixtures()
+        self.latency = latency_ms / 1000
+        self.offline = offline  # Abort unmatched requests instead of letting them hit the network
+        self._bodies = {fixture.path: fixture.body() for fixture in self.fixtures}
+        self.served = 0
+        self.blocked = 0
+
+    def match(self, url: str) -> Optional[Fixture]:
+        for fixture in self.fixtures:
+            if fixture.pattern.search(url):
+                return fixture
+        return None
+
+    async def handle(self, route):
+        fixture = self.match(route.request.url)
+        if fixture is None:
+            if self.offline:
+                self.blocked += 1
+                return await route.abort("internetdisconnected")
+            # Let the scraper's own route handler decide
+            return await route.fallback()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.served += 1
+        await route.fulfill(
+            status=fixture.status,
+            content_type=fixture.content_type,
+            body=self._bodies[fixture.path],
+        )
+
+    async def install(self, page):
+        # Routes registered last run first, so this sits in front of setup_route
+        await page.route("**/*", self.handle)
+
+
+class FixtureServer:
+    """Local stand-in for www.booking.com serving the same fixtures over plain HTTP"""
+
+    def __init__(self, fixtures: Optional[List[Fixture]] = None, port: int = 0, latency_ms: float = 0):
+        self.router = ReplayRouter(fixtures)
+        latency = latency_ms / 1000
+        router = self.router
+
+        class Handler(BaseHTTPRequestHandler):
+            def _serve(self):
+                fixture = router.match(self.path)
+                if latency:
+                    time.sleep(latency)
+                if fixture is None:
+                    self.send_error(404)
+                    return
+                body = router._bodies[fixture.path]
+                self.send_response(fixture.status)
+                self.send_header("Content-Type", fixture.content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                router.served += 1
+
+            do_GET = _serve
+            do_POST = _serve
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+async def record(city: str, hotel_urls: List[str], directory: str = FIXTURES_DIR):
+    """Capture live pages (rendered DOM) and the GraphQL search payload into the fixture corpus"""
+    from playwright.async_api import async_playwright
+
+    from browser_pool import CONTEXT_OPTIONS, STEALTH_SCRIPT
+    from booking_payloads import is_search_payload_url, search_results
+    from config import SCRAPER_CONFIG
+    from scraper_playwright import PlaywrightBookingScraper
+
+    manifest_path = os.path.join(directory, "index.json")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    entries = {entry["pattern"]: entry for entry in manifest["entries"]}
+    slug = re.sub(r"[^a-z0-9]+", "_", city.lower()).strip("_")
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=SCRAPER_CONFIG["headless"])
+        context = await browser.new_context(**CONTEXT_OPTIONS)
+        await context.add_init_script(STEALTH_SCRIPT)
+        page = await context.new_page()
+
+        payloads = []
+
+        async def on_response(response):
+            if is_search_payload_url(response.url):
+                try:
+                    data = await response.json()
+                except Exception:
+                    return
+                if search_results(data):
+                    payloads.append(data)
+
+        page.on("response", on_response)
+        await page.goto(PlaywrightBookingScraper()._build_search_url(city), wait_until="domcontentloaded")
+        await page.wait_for_selector('[data-testid="property-card"]', timeout=30000)
+        with open(os.path.join(directory, f"search_{slug}.html"), "w") as f:
+            f.write(await page.content())
+        entries["/searchresults"] = {
+            "pattern": "/searchresults",
+            "file": f"search_{slug}.html",
+            "content_type": "text/html; charset=utf-8",
+        }
+        if payloads:
+            with open(os.path.join(directory, "search_graphql.json"), "w") as f:
+                json.dump(payloads[0], f, ensure_ascii=False)
+        logger.info(f"✅ Recorded search page for {city} ({len(payloads)} payloads)")
+
+        for index, hotel_url in enumerate(hotel_urls):
+            await page.goto(hotel_url, wait_until="domcontentloaded")
+            await page.wait_for_selector('[data-testid="property-name"]', timeout=30000)
+            name = f"hotel_{slug}_{index}.html"
+            with open(os.path.join(directory, name), "w") as f:
+                f.write(await page.content())
+            path = re.escape(hotel_url.split("booking.com", 1)[-1].split("?")[0])
+            entries[path] = {"pattern": path, "file": name, "content_type": "text/html; charset=utf-8"}
+            logger.info(f"✅ Recorded {hotel_url}")
+
+        await browser.close()
+
+    # Specific hotel paths first so they win over the generic /hotel/ entry
+    manifest["entries"] = sorted(entries.values(), key=lambda entry: -len(entry["pattern"]))
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="record live pages into the fixture corpus")
+    rec.add_argument("--city", required=True)
+    rec.add_argument("--hotel-url", action="append", default=[])
+
+    serve = commands.add_parser("serve", help="serve the fixtures on a local port")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency-ms", type=float, default=0)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "record":
+        asyncio.run(record(args.city, args.hotel_url))
+    else:
+        server = FixtureServer(port=args.port, latency_ms=args.latency_ms).start()
+        print(f"Serving {len(server.router.fixtures)} fixtures at {server.url} (Ctrl+C to stop)")
+        try:
+            server._thread.join()
+        except KeyboardInterrupt:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
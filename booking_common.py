@@ -0,0 +1,77 @@
+"""
+Booking.com request helpers shared by the API and the scrapers
+Kept free of Playwright, lxml and requests so the API can import them at startup and
+load the scrapers themselves only when the first scrape (or the pre-warm) needs them.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from booking_payloads import stable_hotel_id
+from config import BOOKING_CONFIG
+
+
+def resolve_stay_dates(checkin: Optional[str] = None, checkout: Optional[str] = None) -> Tuple[str, str]:
+    """Fill in the default check-in/check-out dates (YYYY-MM-DD)"""
+    if not checkin:
+        checkin_date = datetime.now() + timedelta(days=BOOKING_CONFIG["default_checkin_offset"])
+        checkin = checkin_date.strftime("%Y-%m-%d")
+
+    if not checkout:
+        checkout_date = datetime.now() + timedelta(days=BOOKING_CONFIG["default_checkout_offset"])
+        checkout = checkout_date.strftime("%Y-%m-%d")
+    return checkin, checkout
+
+
+def build_search_url(city: str, checkin: Optional[str] = None, checkout: Optional[str] = None) -> str:
+    """Booking.com search results URL for a city and stay (default dates and guests filled in)"""
+    checkin, checkout = resolve_stay_dates(checkin, checkout)
+    params = {
+        "ss": city,
+        "checkin": checkin,
+        "checkout": checkout,
+        "group_adults": BOOKING_CONFIG["default_adults"],
+        "group_children": BOOKING_CONFIG["default_children"],
+        "no_rooms": BOOKING_CONFIG["default_rooms"],
+    }
+    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
+    return f"{BOOKING_CONFIG['base_url']}{BOOKING_CONFIG['search_endpoint']}?{query_string}"
+
+
+def canonical_hotel_url(hotel_url: str) -> str:
+    """Hotel page URL without query string, fragment or trailing slash"""
+    parts = urlsplit(hotel_url.strip())
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower() or "https", parts.netloc.lower(), path, "", ""))
+
+
+# Hotel detail fields grouped by how they are loaded (and how fast they change)
+DETAIL_SECTIONS = {
+    "info": ["hotel_id", "name", "rating", "address", "description", "photos"],
+    "amenities": ["amenities"],
+    "reviews": ["reviews"],
+    "room_types": ["room_types"],
+}
+
+# Part of a details deadline kept back for the final extraction (seconds)
+EXTRACT_RESERVE = 0.5
+
+
+def normalize_hotel_details(hotel_data: Dict, hotel_url: Optional[str] = None) -> Dict:
+    """Assign hotel_id and scale the rating to 5 points (shared by every details extractor)"""
+    # Same id the hotel has in search results (see booking_payloads.stable_hotel_id)
+    hotel_data['hotel_id'] = stable_hotel_id(hotel_url, hotel_data['name'])
+    
+    # Fix rating if exceeds 5 (Booking uses 10-point scale sometimes)
+    if hotel_data.get('rating') and hotel_data['rating'] > 5:
+        hotel_data['rating'] = round(hotel_data['rating'] / 2, 1)
+    return hotel_data
+
+
+def split_detail_sections(hotel_data: Dict, sections: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """Split a details payload into {section: {field: value}}"""
+    return {
+        section: {field: hotel_data[field] for field in DETAIL_SECTIONS[section] if field in hotel_data}
+        for section in (sections or DETAIL_SECTIONS)
+    }
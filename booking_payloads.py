@@ -0,0 +1,114 @@
+"""
+Parsers for Booking.com's own JSON payloads
+The search results page loads its hotels through a GraphQL call (/dml/graphql);
+reading that response gives exact prices and currencies without waiting for the DOM.
+"""
+
+from typing import Any, Dict, List, Optional
+import hashlib
+import logging
+import re
+
+from config import BOOKING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+GRAPHQL_PATH = "/dml/graphql"
+
+
+# /hotel/<country>/<page name>[.<language>].html
+HOTEL_PATH = re.compile(r"/hotel/([a-z]{2})/([^/.?#]+)", re.IGNORECASE)
+
+
+def hotel_identity(url: Optional[str], name: str = "") -> str:
+    """What identifies a hotel: "<country>/<page name>" from its Booking URL, else its name"""
+    match = HOTEL_PATH.search(url or "")
+    if match:
+        return f"{match.group(1).lower()}/{match.group(2).lower()}"
+    return "name:" + " ".join(name.split()).lower()
+
+
+def stable_hotel_id(url: Optional[str], name: str = "") -> int:
+    """hotel_id: first 48 bits of the identity's SHA-1 (same in every process, safe as a JS number)"""
+    digest = hashlib.sha1(hotel_identity(url, name).encode()).digest()
+    return int.from_bytes(digest[:6], "big")
+
+
+def with_hotel_id(hotel: Dict) -> Dict:
+    hotel["hotel_id"] = stable_hotel_id(hotel.get("url"), hotel["name"])
+    return hotel
+
+
+def _dig(data: Any, *path, default=None):
+    for step in path:
+        if isinstance(data, dict):
+            data = data.get(step)
+        elif isinstance(data, list) and isinstance(step, int) and -len(data) <= step < len(data):
+            data = data[step]
+        else:
+            return default
+        if data is None:
+            return default
+    return data
+
+
+def is_search_payload_url(url: str) -> bool:
+    return GRAPHQL_PATH in url
+
+
+def search_results(payload: Any) -> Optional[List[Dict]]:
+    """The raw result list from a FullSearch response, or None if this is another query"""
+    results = _dig(payload, "data", "searchQueries", "search", "results")
+    return results if isinstance(results, list) else None
+
+
+def _price(result: Dict):
+    amount = _dig(result, "priceDisplayInfoIrene", "displayPrice", "amountPerStay")
+    if amount and amount.get("amountUnformatted") is not None:
+        return float(amount["amountUnformatted"]), amount.get("currency")
+    block_price = _dig(result, "blocks", 0, "finalPrice")
+    if block_price and block_price.get("amount") is not None:
+        return float(block_price["amount"]), block_price.get("currency")
+    return 0.0, None
+
+
+def parse_search_result(result: Dict, base_url: Optional[str] = None) -> Optional[Dict]:
+    """One GraphQL search result in the same shape the card script returns"""
+    name = _dig(result, "displayName", "text") or _dig(result, "basicPropertyData", "name")
+    if not name:
+        return None
+    name = name.strip()
+
+    url = None
+    page_name = _dig(result, "basicPropertyData", "pageName")
+    country = _dig(result, "basicPropertyData", "location", "countryCode")
+    if page_name and country:
+        url = f"{base_url or BOOKING_CONFIG['base_url']}/hotel/{country}/{page_name}.html"
+
+    price, currency = _price(result)
+    score = _dig(result, "basicPropertyData", "reviewScore", "score") or 0
+    rating = score / 2 if score > 5 else score
+
+    return {
+        "hotel_id": stable_hotel_id(url, name),
+        "name": name,
+        "price": price,
+        "currency": currency or "INR",
+        "rating": round(rating, 1),
+        "url": url,
+    }
+
+
+def parse_search_payload(payload: Any, max_results: Optional[int] = None) -> List[Dict]:
+    hotels = []
+    for result in search_results(payload) or []:
+        if max_results is not None and len(hotels) >= max_results:
+            break
+        try:
+            hotel = parse_search_result(result)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Skipping unparseable search result: {e}")
+            continue
+        if hotel:
+            hotels.append(hotel)
+    return hotels
@@ -0,0 +1,335 @@
+"""
+Warm Chromium pool for the Playwright scrapers
+Keeps one long-lived browser with pre-created context+page slots that are leased
+to a single scrape at a time, instead of launching Chromium for every request.
+"""
+
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import logging
+import threading
+import time
+
+from config import BROWSER_POOL_CONFIG, SCRAPER_CONFIG
+from sessions import SessionState, session_pool
+from timings import stage
+
+logger = logging.getLogger(__name__)
+
+# Options shared by every pooled context
+CONTEXT_OPTIONS = {
+    "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    "viewport": {'width': 1280, 'height': 800},
+    "locale": 'en-US',
+    "timezone_id": 'Asia/Kolkata',
+    "permissions": ['geolocation'],
+}
+
+STEALTH_SCRIPT = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+# Used JS heap of the page in bytes, where CDP is unavailable (Chromium only, 0 elsewhere)
+HEAP_SCRIPT = "() => (performance.memory ? performance.memory.usedJSHeapSize : 0)"
+
+
+class PoolTimeout(Exception):
+    """Raised when no browser slot frees up within the lease timeout"""
+
+
+class BrowserSlot:
+    """A pre-created context and page owned by the pool"""
+
+    def __init__(self, pool: "BrowserPool", index: int):
+        self.pool = pool
+        self.index = index
+        self.context = None
+        self.page = None
+        self.uses = 0
+        self.checked_at = 0.0
+        self.session: Optional[SessionState] = None  # WAF-cleared state the context started from
+        self.cdp = None  # CDP session for heap metrics (False if the browser has none)
+
+    @property
+    def is_open(self) -> bool:
+        return self.page is not None and not self.page.is_closed()
+
+    async def open(self):
+        browser = await self.pool._ensure_browser()
+        self.session = session_pool.acquire()
+        options = dict(CONTEXT_OPTIONS)
+        if self.session:
+            options["storage_state"] = self.session.state
+        with stage("context"):
+            self.context = await browser.new_context(**options)
+            await self.context.add_init_script(STEALTH_SCRIPT)
+            self.page = await self.context.new_page()
+            if self.pool.page_setup:
+                await self.pool.page_setup(self.page)
+        self.uses = 0
+        self.checked_at = time.monotonic()
+
+    async def close(self):
+        if self.context:
+            try:
+                await self.context.close()
+            except Exception as e:
+                logger.debug(f"Slot {self.index} context close failed: {e}")
+        self.context = None
+        self.page = None
+        self.session = None
+        self.cdp = None
+
+    async def recycle(self, reason: str):
+        logger.info(f"♻️ Recycling browser slot {self.index}: {reason}")
+        await self.close()
+        await self.open()
+
+    async def heap_mb(self) -> float:
+        """Used JS heap of the page's renderer (CDP Performance.getMetrics, JSHeapUsedSize)"""
+        used = None
+        if self.cdp is None:
+            try:
+                self.cdp = await self.context.new_cdp_session(self.page)
+                await self.cdp.send("Performance.enable")
+            except Exception as e:
+                logger.debug(f"Slot {self.index} has no CDP session, using performance.memory: {e}")
+                self.cdp = False
+        if self.cdp:
+            metrics = await self.cdp.send("Performance.getMetrics")
+            used = next((m["value"] for m in metrics["metrics"] if m["name"] == "JSHeapUsedSize"), None)
+        if used is None:
+            used = await self.page.evaluate(HEAP_SCRIPT)
+        return (used or 0) / (1024 * 1024)
+
+    async def is_healthy(self) -> bool:
+        """Browser still connected and the page still answers a trivial evaluate"""
+        if not self.is_open or not self.pool.browser or not self.pool.browser.is_connected():
+            return False
+        try:
+            await asyncio.wait_for(self.page.evaluate("1"), timeout=5)
+            return True
+        except Exception:
+            return False
+
+
+class BrowserPool:
+    """Long-lived Chromium with a fixed number of leasable context+page slots"""
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        page_setup: Optional[Callable[..., Awaitable]] = None,
+    ):
+        self.size = size or BROWSER_POOL_CONFIG["size"]
+        self.page_setup = page_setup
+        self.lease_timeout = BROWSER_POOL_CONFIG["lease_timeout"]
+        self.max_uses = BROWSER_POOL_CONFIG["context_max_uses"]
+        self.max_memory_mb = BROWSER_POOL_CONFIG["context_max_memory_mb"]
+        self.health_check_interval = BROWSER_POOL_CONFIG["health_check_interval"]
+
+        self.browser = None
+        self._playwright = None
+        self._slots: List[BrowserSlot] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._lock = asyncio.Lock()
+        self._started = False
+
+    async def start(self):
+        """Launch the browser and pre-create every slot (idempotent)"""
+        if self._started:
+            return
+        async with self._lock:
+            if self._started:
+                return
+            # Imported here so the API can import the pool helpers without loading Playwright
+            from playwright.async_api import async_playwright
+
+            logger.info(f"Starting browser pool with {self.size} slots")
+            self._playwright = await async_playwright().start()
+            self._idle = asyncio.Queue()
+            for index in range(self.size):
+                slot = BrowserSlot(self, index)
+                try:
+                    await slot.open()
+                except Exception as e:
+                    # Slot stays closed and is reopened on its first lease
+                    logger.error(f"Could not pre-create browser slot {index}: {e}")
+                self._slots.append(slot)
+                self._idle.put_nowait(slot)
+            self._started = True
+
+    async def close(self):
+        for slot in self._slots:
+            await slot.close()
+        if self.browser:
+            try:
+                await self.browser.close()
+            except Exception as e:
+                logger.debug(f"Browser close failed: {e}")
+        if self._playwright:
+            await self._playwright.stop()
+        self.browser = None
+        self._playwright = None
+        self._slots = []
+        self._started = False
+
+    async def _ensure_browser(self):
+        """Return the shared browser, relaunching it if it crashed"""
+        if self.browser is None or not self.browser.is_connected():
+            logger.info("🚀 Launching pooled Chromium")
+            with stage("launch"):
+                self.browser = await self._playwright.chromium.launch(
+                    headless=SCRAPER_CONFIG["headless"],
+                    args=BROWSER_POOL_CONFIG["launch_args"],
+                )
+        return self.browser
+
+    async def _prepare(self, slot: BrowserSlot):
+        """Make sure a slot is usable before handing it out"""
+        if not slot.is_open:
+            await slot.open()
+        elif time.monotonic() - slot.checked_at > self.health_check_interval:
+            if not await slot.is_healthy():
+                await slot.recycle("failed health check")
+            slot.checked_at = time.monotonic()
+
+    async def _release(self, slot: BrowserSlot, failed: bool):
+        """Reset the page and recycle the context when it is worn out"""
+        try:
+            if not slot.is_open:
+                return
+            slot.uses += 1
+            if failed and not await slot.is_healthy():
+                await slot.recycle("failed health check after error")
+            elif slot.uses >= self.max_uses:
+                await slot.recycle(f"reached {slot.uses} uses")
+            else:
+                # Measured before the reset: about:blank would report an almost empty heap
+                heap = await slot.heap_mb()
+                if heap > self.max_memory_mb:
+                    await slot.recycle(f"JS heap at {heap:.0f} MB")
+                else:
+                    # Drop the previous document so the next lease starts clean
+                    await slot.page.goto("about:blank")
+            slot.checked_at = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Browser slot {slot.index} reset failed: {e}")
+            await slot.close()
+        finally:
+            self._idle.put_nowait(slot)
+
+    @asynccontextmanager
+    async def lease(self, timeout: Optional[float] = None):
+        """Borrow a warm page; raises PoolTimeout if none frees up in time"""
+        await self.start()
+        timeout = timeout if timeout is not None else self.lease_timeout
+        try:
+            with stage("lease"):
+                slot = await asyncio.wait_for(self._idle.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"No browser slot free after {timeout}s")
+
+        failed = False
+        try:
+            await self._prepare(slot)
+            yield slot.page
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self._release(slot, failed)
+
+    def slot_for(self, page) -> Optional[BrowserSlot]:
+        for slot in self._slots:
+            if slot.page is page:
+                return slot
+        return None
+
+    def report_session(self, page, ok: bool):
+        """Count a page load that did (ok) or did not get past the WAF on the slot's session"""
+        slot = self.slot_for(page)
+        if slot and slot.session:
+            session_pool.report(slot.session, ok)
+            if not slot.session.usable:
+                slot.session = None
+
+    async def capture_session(self, page):
+        """After a solved challenge: pool the context's state and hand its cookies to the other slots"""
+        slot = self.slot_for(page)
+        if slot is None or slot.context is None:
+            return
+        session = session_pool.add(await slot.context.storage_state())
+        if session is None:
+            return
+        slot.session = session
+        for other in self._slots:
+            if other is slot or not other.is_open or (other.session and other.session.usable):
+                continue
+            try:
+                await other.context.add_cookies(session.cookies)
+                other.session = session
+            except Exception as e:
+                logger.debug(f"Could not share session with slot {other.index}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "started": self._started,
+            "idle": self._idle.qsize() if self._idle else 0,
+            "browser_connected": bool(self.browser and self.browser.is_connected()),
+            "slots": [
+                {"index": s.index, "open": s.is_open, "uses": s.uses, "session": s.session.id if s.session else None}
+                for s in self._slots
+            ],
+        }
+
+
+# --- Engine event loop ---
+# Playwright objects are bound to the event loop that created them, so all
+# pooled browsers live on one engine loop. The API binds its own loop at
+# startup; otherwise a background loop thread is started on first use.
+_engine_loop: Optional[asyncio.AbstractEventLoop] = None
+_engine_lock = threading.Lock()
+
+
+def bind_engine_loop(loop: asyncio.AbstractEventLoop) -> bool:
+    """Host the engine on an existing loop (e.g. the FastAPI loop)"""
+    global _engine_loop
+    with _engine_lock:
+        if _engine_loop is not None and _engine_loop is not loop:
+            logger.warning("Engine loop already running elsewhere; keeping it")
+            return False
+        _engine_loop = loop
+    return True
+
+
+def get_engine_loop() -> asyncio.AbstractEventLoop:
+    global _engine_loop
+    with _engine_lock:
+        if _engine_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True)
+            thread.start()
+            _engine_loop = loop
+    return _engine_loop
+
+
+async def run_on_engine(coro):
+    """Await a coroutine on the engine loop, hopping loops only when needed"""
+    loop = get_engine_loop()
+    if loop is asyncio.get_running_loop():
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+def run_sync(coro):
+    """Run a coroutine on the engine loop and block until it finishes"""
+    loop = get_engine_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("Blocking scraper call made on the engine loop; await the async variant instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
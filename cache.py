@@ -0,0 +1,366 @@
+"""
+Search and details result cache
+TTL + LRU in-memory tier driven by CACHE_CONFIG, backed by an SQLite (WAL) disk tier
+that every worker process on the host shares and that survives restarts.
+Expired entries are kept for a stale window so they can be served while a refresh runs.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from config import BOOKING_CONFIG, CACHE_CONFIG, DETAILS_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def search_cache_key(
+    city: str,
+    checkin: str,
+    checkout: str,
+    adults: Optional[int] = None,
+    children: Optional[int] = None,
+    rooms: Optional[int] = None,
+) -> str:
+    """Normalized key for a search: city is case/whitespace-insensitive, dates must be resolved"""
+    city = " ".join(city.split()).lower()
+    adults = BOOKING_CONFIG["default_adults"] if adults is None else adults
+    children = BOOKING_CONFIG["default_children"] if children is None else children
+    rooms = BOOKING_CONFIG["default_rooms"] if rooms is None else rooms
+    return f"search:{city}|{checkin}|{checkout}|{adults}|{children}|{rooms}"
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    stored_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+class SQLiteCacheTier:
+    """Disk tier in one SQLite file; WAL mode lets every worker read while one writes"""
+
+    PURGE_EVERY = 100  # writes between sweeps of fully expired rows
+
+    def __init__(self, path: str, max_age: float):
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that opened them
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        row = self._connect().execute(
+            "SELECT value, stored_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(json.loads(row[0]), row[1])
+
+    def set(self, key: str, entry: CacheEntry):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(entry.value), entry.stored_at),
+            )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def delete(self, key: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount > 0
+
+    def clear(self, prefix: str = "") -> int:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM cache WHERE key LIKE ?", (prefix + "%",)).rowcount
+
+    def purge_expired(self) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM cache WHERE stored_at < ?", (time.time() - self.max_age,)
+            ).rowcount
+
+    def count(self, prefix: str = "") -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM cache WHERE key LIKE ?", (prefix + "%",)
+        ).fetchone()[0]
+
+
+class TTLCache:
+    """Thread-safe cache with per-entry TTL and least-recently-used eviction"""
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_size: Optional[int] = None,
+        enabled: Optional[bool] = None,
+        stale_ttl: Optional[float] = None,
+        disk: Optional[SQLiteCacheTier] = None,
+        prefix: str = "",
+    ):
+        self.ttl = CACHE_CONFIG["ttl"] if ttl is None else ttl
+        self.stale_ttl = CACHE_CONFIG["stale_ttl"] if stale_ttl is None else stale_ttl
+        self.max_size = CACHE_CONFIG["max_size"] if max_size is None else max_size
+        self.enabled = CACHE_CONFIG["enabled"] if enabled is None else enabled
+        self.disk = disk
+        self.prefix = prefix  # Keys this cache owns in the shared disk tier
+        self._data: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _memory_entry(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def _lookup(self, key: str, ttl: float) -> Optional[CacheEntry]:
+        """
+        Memory first; the disk tier when memory has nothing younger than `ttl`, since another
+        worker may have refreshed the key. The newer of the two wins (disk hits are promoted).
+        """
+        entry = self._memory_entry(key)
+        if self.disk is None or (entry is not None and entry.age <= ttl):
+            return entry
+        try:
+            disk_entry = self.disk.get(key)
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache read failed for {key}: {e}")
+            return entry
+        if disk_entry is None or (entry is not None and disk_entry.stored_at <= entry.stored_at):
+            return entry
+        with self._lock:
+            self.disk_hits += 1
+            self._store(key, disk_entry)
+        return disk_entry
+
+    def _store(self, key: str, entry: CacheEntry):
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            evicted, _ = self._data.popitem(last=False)
+            self.evictions += 1
+            logger.debug(f"Cache evicted {evicted}")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Fresh value or None"""
+        entry = self.get_entry(key, allow_stale=False)
+        return entry.value if entry else None
+
+    def get_entry(self, key: str, allow_stale: bool = True, ttl: Optional[float] = None) -> Optional[CacheEntry]:
+        """
+        Entry younger than ttl, or (with allow_stale) younger than ttl + stale_ttl. `ttl` overrides
+        the age past which the disk tier is checked for a newer copy (e.g. a details section's TTL).
+        """
+        if not self.enabled:
+            return None
+        entry = self._lookup(key, self.ttl if ttl is None else ttl)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            age = entry.age
+            if age > self.ttl + self.stale_ttl:
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            if age > self.ttl and not allow_stale:
+                self.misses += 1
+                return None
+            if age > self.ttl:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return entry
+
+    async def get_entry_async(self, key: str, allow_stale: bool = True, ttl: Optional[float] = None) -> Optional[CacheEntry]:
+        """get_entry for the event loop: a lookup that needs the disk tier runs in a thread"""
+        if self.disk is None or not self.enabled or self.fresh_in_memory(key, ttl):
+            return self.get_entry(key, allow_stale, ttl)
+        return await asyncio.to_thread(self.get_entry, key, allow_stale, ttl)
+
+    def fresh_in_memory(self, key: str, ttl: Optional[float] = None) -> bool:
+        """True if a lookup would be answered from memory without reading the disk tier"""
+        with self._lock:
+            entry = self._data.get(key)
+        return entry is not None and entry.age <= (self.ttl if ttl is None else ttl)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return entry.age <= self.ttl
+
+    def age(self, key: str) -> Optional[float]:
+        """Age of a stored entry without touching counters (another worker may have refreshed it)"""
+        with self._lock:
+            entry = self._data.get(key)
+        if self.disk is not None:
+            try:
+                disk_entry = self.disk.get(key)
+            except sqlite3.Error:
+                disk_entry = None
+            if disk_entry is not None and (entry is None or disk_entry.stored_at > entry.stored_at):
+                entry = disk_entry
+                with self._lock:
+                    self._store(key, entry)
+        return entry.age if entry else None
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        entry = CacheEntry(value, time.time())
+        with self._lock:
+            self._store(key, entry)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, entry)
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.warning(f"Disk cache write failed for {key}: {e}")
+
+    async def set_async(self, key: str, value: Any):
+        """set for the event loop: the disk write runs in a thread"""
+        if self.disk is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            removed = self._data.pop(key, None) is not None
+        if self.disk is not None:
+            removed = self.disk.delete(key) or removed
+        return removed
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._data)
+            self._data.clear()
+        if self.disk is not None:
+            count = max(count, self.disk.clear(self.prefix))
+        return count
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            stats = {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+            }
+        if self.disk is not None:
+            stats["disk_size"] = self.disk.count(self.prefix)
+        return stats
+
+
+class SectionedDetailsCache:
+    """Hotel details stored per section (keyed by canonical hotel URL), each section with its own TTL"""
+
+    def __init__(self, section_ttls: Dict[str, float], disk: Optional[SQLiteCacheTier] = None):
+        self.section_ttls = section_ttls
+        self.store = TTLCache(
+            ttl=max(section_ttls.values()),
+            max_size=DETAILS_CACHE_CONFIG["max_size"],
+            disk=disk,
+            prefix="details:",
+        )
+
+    @staticmethod
+    def key(hotel_url: str, section: str) -> str:
+        return f"details:{hotel_url}#{section}"
+
+    def get_sections(self, hotel_url: str) -> Dict[str, CacheEntry]:
+        """Every cached section, fresh or stale"""
+        entries = {}
+        for section, ttl in self.section_ttls.items():
+            entry = self.store.get_entry(self.key(hotel_url, section), ttl=ttl)
+            if entry is not None:
+                entries[section] = entry
+        return entries
+
+    async def get_sections_async(self, hotel_url: str) -> Dict[str, CacheEntry]:
+        if self.store.disk is None or all(
+            self.store.fresh_in_memory(self.key(hotel_url, section), ttl) for section, ttl in self.section_ttls.items()
+        ):
+            return self.get_sections(hotel_url)
+        return await asyncio.to_thread(self.get_sections, hotel_url)
+
+    def stale_sections(self, entries: Dict[str, CacheEntry]) -> List[str]:
+        """Sections that are missing or older than their own TTL"""
+        return [
+            section for section, ttl in self.section_ttls.items()
+            if section not in entries or entries[section].age > ttl
+        ]
+
+    def set_sections(self, hotel_url: str, sections: Dict[str, dict]):
+        for section, value in sections.items():
+            self.store.set(self.key(hotel_url, section), value)
+
+    async def set_sections_async(self, hotel_url: str, sections: Dict[str, dict]):
+        if self.store.disk is None:
+            self.set_sections(hotel_url, sections)
+        else:
+            await asyncio.to_thread(self.set_sections, hotel_url, sections)
+
+    def delete(self, hotel_url: str) -> int:
+        return sum(self.store.delete(self.key(hotel_url, section)) for section in self.section_ttls)
+
+    def clear(self) -> int:
+        return self.store.clear()
+
+    def stats(self) -> dict:
+        return {**self.store.stats(), "section_ttl": self.section_ttls}
+
+
+def _disk_tier() -> Optional[SQLiteCacheTier]:
+    if not CACHE_CONFIG["disk_enabled"]:
+        return None
+    try:
+        longest_ttl = max(CACHE_CONFIG["ttl"], *DETAILS_CACHE_CONFIG["section_ttl"].values())
+        return SQLiteCacheTier(CACHE_CONFIG["disk_path"], longest_ttl + CACHE_CONFIG["stale_ttl"])
+    except sqlite3.Error as e:
+        logger.error(f"Disk cache unavailable at {CACHE_CONFIG['disk_path']}, memory only: {e}")
+        return None
+
+
+disk_tier = _disk_tier()
+
+# Shared caches for /hotels/search and /hotels/details results
+search_cache = TTLCache(disk=disk_tier, prefix="search:")
+details_cache = SectionedDetailsCache(DETAILS_CACHE_CONFIG["section_ttl"], disk=disk_tier)
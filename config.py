@@ -16,6 +16,38 @@ VALID_API_KEYS: List[str] = [
     "premium_user_key_999"
 ]
 
+# Quota/priority tier per key (keys not listed are "standard")
+API_KEY_TIERS = {
+    "premium_user_key_999": "premium",
+}
+
+# Lower priority is scraped first; "background" is for refreshes nobody is waiting on
+TIER_CONFIG = {
+    "premium": {"priority": 0, "quota_multiplier": 10},
+    "standard": {"priority": 1, "quota_multiplier": 1},
+    "background": {"priority": 2, "quota_multiplier": 1},
+}
+
+# Token-bucket quotas per API key (scaled by the key's tier)
+RATE_LIMIT_CONFIG = {
+    "enabled": os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true",
+    "per_minute": int(os.getenv("RATE_LIMIT_PER_MINUTE", "60")),
+    "per_day": int(os.getenv("RATE_LIMIT_PER_DAY", "1000")),
+}
+
+# Admission to browser scrapes (cache hits and browserless fetches never queue here)
+SCHEDULER_CONFIG = {
+    "concurrency": None,  # Scrapes at once; None = browser pool size (or worker fleet capacity)
+    "max_waiting": 20,  # Queued scrapes before new ones get a 429
+    "max_waiting_per_key": 4,  # Keeps one key from filling the queue
+    "initial_run_estimate": 10,  # seconds per scrape, until measured (for Retry-After)
+}
+
+# Keys allowed to call the /admin endpoints
+ADMIN_API_KEYS: List[str] = [
+    "premium_user_key_999"
+]
+
 # Scraper Configuration
 SCRAPER_CONFIG = {
     "timeout": 30,  # seconds
@@ -27,6 +59,69 @@ SCRAPER_CONFIG = {
         "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
     ],
     "headless": True,  # Run browser in headless mode
+    "extraction_mode": "auto",  # "auto": read Booking's search JSON payload, DOM script as fallback; "dom": DOM only
+    "payload_timeout": 10,  # seconds to wait for the payload or the rendered cards
+}
+
+# Browserless HTTP fast path (tried before Playwright)
+HTTP_SCRAPER_CONFIG = {
+    "enabled": True,
+    "timeout": 10,  # seconds
+    "pool_size": 10,  # Keep-alive connections per host
+    "retries": 1,  # Connection-level retries
+}
+
+# Out-of-process scraper workers (run with `python worker.py`)
+WORKER_CONFIG = {
+    "enabled": os.getenv("SCRAPER_WORKERS_ENABLED", "false").lower() == "true",  # API hands scrapes to workers
+    "queue_path": os.getenv("HOTEL_JOB_DB", "data/jobs.db"),
+    "workers": int(os.getenv("SCRAPER_WORKERS", "2")),  # Worker processes on this machine
+    "concurrency": 2,  # Jobs one worker runs at once (its browser pool size)
+    "job_timeout": 90,  # seconds the API waits for a job (and a worker lets it run)
+    "max_attempts": 2,  # Runs per job before a dead worker's job is failed instead of requeued
+    "heartbeat_interval": 5,  # seconds
+    "stuck_after": 60,  # seconds without a heartbeat before a worker is replaced
+    "poll_interval": 0.2,  # seconds between API result polls / idle worker claims
+    "retention": 3600,  # seconds finished jobs are kept
+}
+
+# Reuse of browser sessions that already passed Booking's AWS WAF challenge
+SESSION_CONFIG = {
+    "enabled": True,
+    "clearance_cookie": "aws-waf-token",  # A captured session is only kept if it has this cookie
+    "max_sessions": 4,  # Cleared sessions kept at once
+    "max_age": 3600,  # seconds, unless the clearance cookie expires sooner
+    "max_consecutive_failures": 2,  # Challenged loads in a row before a session is retired
+    "min_success_ratio": 0.5,  # ...or once it has this poor a record
+    "min_uses_for_ratio": 5,  # Loads before the ratio is judged
+}
+
+# Request routing for pooled browser contexts
+ROUTING_CONFIG = {
+    "blocked_domains": ["google-analytics.com", "doubleclick.net", "facebook.net", "adgoogles.com"],
+    "allowed_script_domains": ["booking.com", "bstatic.com"],  # Scripts from anywhere else are blocked
+    "blocked_extensions": ["png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico",
+                           "woff", "woff2", "ttf", "otf", "eot", "mp4", "webm", "mp3"],
+    "asset_cache": True,  # Serve bstatic.com JS/CSS from a shared on-disk cache
+    "asset_cache_dir": os.getenv("HOTEL_ASSET_CACHE", "data/assets"),
+    "asset_max_bytes": 5 * 1024 * 1024,  # Larger assets are not cached
+    "asset_max_age": 7 * 86400,  # seconds; bstatic URLs are content-versioned
+    "asset_cache_max_bytes": 200 * 1024 * 1024,  # Blob bytes kept on disk; the oldest assets go first
+}
+
+# Browser Pool Configuration
+BROWSER_POOL_CONFIG = {
+    "size": 2,  # Number of warm context+page slots
+    "lease_timeout": 30,  # seconds to wait for a free slot
+    "context_max_uses": 50,  # Recycle a context after this many leases
+    "context_max_memory_mb": 512,  # Recycle a context when its JS heap grows past this
+    "health_check_interval": 60,  # seconds an idle slot may sit before it is re-checked
+    "launch_args": [
+        "--no-sandbox",
+        "--disable-setuid-sandbox",
+        "--disable-dev-shm-usage",
+        "--disable-blink-features=AutomationControlled",
+    ],
 }
 
 # Cache Configuration
@@ -34,6 +129,98 @@ CACHE_CONFIG = {
     "enabled": True,
     "ttl": 3600,  # Time to live in seconds (1 hour)
     "max_size": 100,  # Maximum number of cached items
+    "stale_ttl": 21600,  # Serve expired entries for up to 6 more hours while refreshing
+    "disk_enabled": True,  # SQLite tier shared by all workers on the host, survives restarts
+    "disk_path": os.getenv("HOTEL_CACHE_DB", "data/hotel_cache.db"),
+}
+
+# hotel_id -> Booking URL index behind /hotels/details?hotel_id= (shared by all workers on the host)
+HOTEL_INDEX_CONFIG = {
+    "enabled": True,
+    "path": os.getenv("HOTEL_INDEX_DB", "data/hotel_index.db"),
+}
+
+# Pre-encoded /hotels/search and /hotels/details bodies (see encoded.py)
+RESPONSE_CONFIG = {
+    "max_entries": 1000,  # Encoded bodies kept per process
+    "min_compress_bytes": 512,  # Smaller bodies are only sent uncompressed
+    "gzip_level": 6,
+    "brotli_quality": 5,  # Used when the brotli package is installed
+}
+
+# Batch endpoints
+BATCH_CONFIG = {
+    "max_search_items": 50,
+    "search_parallelism": 2,  # Concurrent scrapes per batch (keep <= BROWSER_POOL_CONFIG size)
+    "max_details_items": 10,
+    "details_parallelism": 2,
+    "details_deadline": 60,  # seconds; unfinished hotels are reported as "timeout"
+}
+
+# Streaming search (/hotels/search/stream)
+STREAM_CONFIG = {
+    "max_results": 100,  # Upper bound on hotels streamed per request
+    "buffer": 25,  # Parsed hotels held for a slow reader before the page stops parsing
+    "idle_timeout": 15,  # seconds the buffer may stay full before the stream gives up its page
+    "lease_timeout": 60,  # seconds a stream may hold a browser page in total
+}
+
+# Price calendar (/hotels/calendar)
+CALENDAR_CONFIG = {
+    "default_days": 30,  # Check-in dates swept when no end date is given
+    "max_days": 31,  # Check-in dates per request
+    "max_nights": 14,
+    "parallel_pages": 2,  # Most pooled pages one sweep keeps leased (each takes a free scrape slot)
+    "http_parallelism": 4,  # Concurrent browserless fetches before the browser sweep
+    "timeout": 180,  # seconds for the browser sweep of one request
+}
+
+# Filter/sort queries over stored search results (/hotels/query)
+QUERY_CONFIG = {
+    "max_searches": 2000,  # City/date searches kept in the store
+    "max_cities": 10,  # Cities per query
+    "default_limit": 20,
+    "max_limit": 200,
+}
+
+# Hotel details are cached per section; each section expires on its own schedule
+DETAILS_CACHE_CONFIG = {
+    "section_ttl": {
+        "info": 7 * 86400,  # name, rating, address, description
+        "amenities": 7 * 86400,
+        "reviews": 6 * 3600,
+        "room_types": 3600,
+    },
+    "max_size": 500,  # Cached sections kept in memory
+}
+
+# Background refresh of frequently requested searches
+REFRESH_CONFIG = {
+    "enabled": True,
+    "interval": 60,  # seconds between scheduler passes
+    "top_n": 10,  # Hottest keys considered per pass
+    "max_concurrent": 2,  # Concurrent background scrapes (shared with stale refreshes)
+    "refresh_ahead": 0.8,  # Refresh once an entry has used 80% of its TTL
+    "decay": 0.5,  # Request counts are multiplied by this every pass
+    "max_tracked": 1000,  # Keys tracked for frequency
+}
+
+# Startup pre-warm, run in the background after the app starts (/readyz reports it)
+STARTUP_CONFIG = {
+    "prewarm": os.getenv("PREWARM_ENABLED", "true").lower() == "true",  # Load the scrapers on startup
+    "prewarm_browser": os.getenv("PREWARM_BROWSER", "true").lower() == "true",  # Launch the browser pool too
+    # Cities searched (default dates) into the cache before reporting ready, e.g. "Goa,Mumbai"
+    "prewarm_cities": [city.strip() for city in os.getenv("PREWARM_CITIES", "").split(",") if city.strip()],
+    "prewarm_concurrency": 2,  # Concurrent pre-warm searches
+    "prewarm_timeout": 120,  # seconds the city pre-warm may take before startup reports ready anyway
+    "retry_delay": 5,  # seconds before a failed import/browser pre-warm is retried (doubles each time)
+    "max_retry_delay": 60,
+}
+
+# Prometheus metrics and Server-Timing headers
+METRICS_CONFIG = {
+    "enabled": True,  # Serve /metrics
+    "server_timing": True,  # Add a Server-Timing header with per-stage scrape times
 }
 
 # Booking.com Configuration
@@ -42,6 +229,9 @@ BOOKING_CONFIG = {
     "search_endpoint": "/searchresults.html",
     "default_checkin_offset": 7,  # days from today
     "default_checkout_offset": 8,  # days from today
+    "default_adults": 2,
+    "default_children": 0,
+    "default_rooms": 1,
     "max_results": 10,  # Maximum number of hotels to return
     "max_reviews": 10,  # Maximum reviews to fetch for hotel details
     "max_photos": 15,  # Maximum photos to fetch
@@ -0,0 +1,125 @@
+"""
+Pre-encoded API responses
+Hot results are validated and JSON-encoded once (pydantic TypeAdapter, in Rust), then
+compressed once with gzip and, when the brotli package is installed, brotli. Requests are
+answered with whichever stored body the client accepts, without touching the models again.
+"""
+
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import gzip
+import hashlib
+import logging
+import threading
+
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+from config import RESPONSE_CONFIG
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+class EncodedPayload:
+    """One response body as identity, gzip and (optionally) brotli bytes, plus its ETag"""
+
+    __slots__ = ("body", "gzip", "br", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        self.gzip = self.br = None
+        if len(body) >= RESPONSE_CONFIG["min_compress_bytes"]:
+            self.gzip = gzip.compress(body, compresslevel=RESPONSE_CONFIG["gzip_level"], mtime=0)
+            if brotli is not None:
+                self.br = brotli.compress(body, quality=RESPONSE_CONFIG["brotli_quality"])
+
+
+def encode(adapter: TypeAdapter, value: Any) -> EncodedPayload:
+    """Validate `value` against the response model once and keep the encoded bytes"""
+    return EncodedPayload(adapter.dump_json(adapter.validate_python(value)))
+
+
+class EncodedCache:
+    """LRU of encoded payloads; an entry is only valid for the `version` it was encoded from"""
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size or RESPONSE_CONFIG["max_entries"]
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: Hashable) -> Optional[EncodedPayload]:
+        with self._lock:
+            entry = self._data.get(key)
+            # Versions may be the cached value itself: compare by identity, then equality
+            if entry is not None and (entry[0] is version or entry[0] == version):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, version: Hashable, payload: EncodedPayload) -> EncodedPayload:
+        with self._lock:
+            self._data[key] = (version, payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return payload
+
+    def get_or_encode(self, key: str, version: Hashable, adapter: TypeAdapter, value: Any) -> EncodedPayload:
+        return self.get(key, version) or self.put(key, version, encode(adapter, value))
+
+    def delete_prefix(self, prefix: str = "") -> int:
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "brotli": brotli is not None,
+            }
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() == coding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class EncodedJSONResponse(Response):
+    """JSON response from an EncodedPayload, compressed as the request's Accept-Encoding allows"""
+
+    media_type = "application/json"
+
+    def __init__(self, payload: EncodedPayload, accept_encoding: Optional[str] = None, status_code: int = 200, headers=None):
+        accept_encoding = accept_encoding or ""
+        body, coding = payload.body, None
+        if payload.br is not None and _accepts(accept_encoding, "br"):
+            body, coding = payload.br, "br"
+        elif payload.gzip is not None and _accepts(accept_encoding, "gzip"):
+            body, coding = payload.gzip, "gzip"
+        super().__init__(content=body, status_code=status_code, headers=headers)
+        self.headers["Vary"] = "Accept-Encoding"
+        if coding:
+            self.headers["Content-Encoding"] = coding
+
+
+# Encoded /hotels/search and /hotels/details bodies of this process
+encoded_cache = EncodedCache()
@@ -0,0 +1,85 @@
+"""
+Hotel identity index
+Maps the stable hotel_id every scraper assigns (booking_payloads.stable_hotel_id) to the
+hotel's Booking URL, name and city, in an SQLite file shared by every process on the host,
+so /hotels/details can take a hotel_id from an earlier search without searching again.
+"""
+
+from typing import Dict, List, Optional
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from config import HOTEL_INDEX_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class HotelIndex:
+    """hotel_id -> {url, name, city}; later sightings update the entry (a known city is kept)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS hotels ("
+                "id INTEGER PRIMARY KEY, url TEXT NOT NULL, name TEXT NOT NULL, city TEXT, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, hotels: List[Dict], city: Optional[str] = None) -> int:
+        """Index hotels that carry a URL (the only way to load their details)"""
+        now = time.time()
+        rows = [
+            (hotel["hotel_id"], hotel["url"], hotel["name"], city, now)
+            for hotel in hotels if hotel.get("url") and hotel.get("hotel_id") is not None
+        ]
+        if not rows:
+            return 0
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO hotels (id, url, name, city, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET url = excluded.url, name = excluded.name, "
+                "city = COALESCE(excluded.city, hotels.city), updated_at = excluded.updated_at",
+                rows,
+            )
+        return len(rows)
+
+    def get(self, hotel_id: int) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT url, name, city FROM hotels WHERE id = ?", (hotel_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"hotel_id": hotel_id, "url": row[0], "name": row[1], "city": row[2]}
+
+    def stats(self) -> dict:
+        count = self._connect().execute("SELECT COUNT(*) FROM hotels").fetchone()[0]
+        return {"hotels": count, "path": self.path}
+
+
+def _hotel_index() -> Optional[HotelIndex]:
+    if not HOTEL_INDEX_CONFIG["enabled"]:
+        return None
+    try:
+        return HotelIndex(HOTEL_INDEX_CONFIG["path"])
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"Hotel index unavailable at {HOTEL_INDEX_CONFIG['path']}: {e}")
+        return None
+
+
+hotel_index = _hotel_index()
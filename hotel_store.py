@@ -0,0 +1,185 @@
+"""
+Queryable store of scraped search results
+Every stored search (city + dates) keeps its hotels as NumPy columns; the columns of all
+searches are concatenated and their sort orders (price, rating, scrape time) precomputed
+once per change, so a filter/sort/top-k query is a few vectorized passes over the arrays.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import logging
+import threading
+import time
+
+import numpy as np
+
+from config import QUERY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# sort parameter -> (column, descending); unknown prices sort last either way
+SORTS = {
+    "price": ("price", False),
+    "-price": ("price", True),
+    "rating": ("rating", False),
+    "-rating": ("rating", True),
+    "-scraped_at": ("scraped_at", True),
+}
+
+
+@dataclass
+class StoredSearch:
+    key: str
+    city: str
+    checkin: str
+    checkout: str
+    scraped_at: float
+    hotel_id: np.ndarray
+    price: np.ndarray  # NaN where the page showed no price
+    rating: np.ndarray
+    name: np.ndarray
+    currency: np.ndarray
+    url: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.hotel_id)
+
+
+class HotelStore:
+    """Latest results per search key, least recently stored searches evicted past max_searches"""
+
+    def __init__(self, max_searches: Optional[int] = None):
+        self.max_searches = max_searches or QUERY_CONFIG["max_searches"]
+        self._searches: "OrderedDict[str, StoredSearch]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._columns: Dict[str, np.ndarray] = {}
+        self._rows: Dict[str, slice] = {}  # Search key -> its rows in the combined columns
+        self._search_list: List[StoredSearch] = []
+        self._orders: Dict[str, np.ndarray] = {}
+        self._dirty = True
+        self.queries = 0
+
+    def put(self, key: str, city: str, checkin: str, checkout: str, hotels: List[Dict], scraped_at: Optional[float] = None):
+        prices = np.array([hotel.get("price") or np.nan for hotel in hotels], dtype=np.float64)
+        search = StoredSearch(
+            key=key,
+            city=city,
+            checkin=checkin,
+            checkout=checkout,
+            scraped_at=scraped_at or time.time(),
+            hotel_id=np.array([hotel["hotel_id"] for hotel in hotels], dtype=np.int64),
+            price=prices,
+            rating=np.array([hotel.get("rating") or 0.0 for hotel in hotels], dtype=np.float64),
+            name=np.array([hotel["name"] for hotel in hotels], dtype=object),
+            currency=np.array([hotel.get("currency") or "" for hotel in hotels], dtype=object),
+            url=np.array([hotel.get("url") for hotel in hotels], dtype=object),
+        )
+        with self._lock:
+            self._searches[key] = search
+            self._searches.move_to_end(key)
+            while len(self._searches) > self.max_searches:
+                self._searches.popitem(last=False)
+            self._dirty = True
+
+    def age(self, key: str) -> Optional[float]:
+        with self._lock:
+            search = self._searches.get(key)
+        return time.time() - search.scraped_at if search else None
+
+    def _rebuild(self):
+        """Concatenate every stored search into one set of columns and precompute the sort orders"""
+        searches = list(self._searches.values())
+        self._rows = {}
+        start = 0
+        for search in searches:
+            self._rows[search.key] = slice(start, start + len(search))
+            start += len(search)
+        search_index = np.repeat(np.arange(len(searches)), [len(search) for search in searches])
+        self._columns = {
+            column: np.concatenate([getattr(search, column) for search in searches]) if searches else np.array([])
+            for column in ("hotel_id", "price", "rating", "name", "currency", "url")
+        }
+        self._columns["search"] = search_index
+        self._columns["scraped_at"] = np.array([search.scraped_at for search in searches])[search_index]
+        self._search_list = searches
+
+        self._orders = {}
+        for sort, (column, descending) in SORTS.items():
+            values = self._columns[column].astype(np.float64)
+            self._orders[sort] = np.argsort(-values if descending else values, kind="stable")
+        self._dirty = False
+
+    def query(
+        self,
+        keys: List[str],
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        sort: str = "price",
+        limit: int = 20,
+    ) -> Tuple[int, List[Dict]]:
+        """(number of matches, the first `limit` of them in `sort` order) across the given searches"""
+        with self._lock:
+            if self._dirty:
+                self._rebuild()
+            self.queries += 1
+            columns = self._columns
+            mask = np.zeros(len(columns["hotel_id"]), dtype=bool)
+            for key in keys:
+                if key in self._rows:
+                    mask[self._rows[key]] = True
+            # NaN prices never pass a price bound
+            if min_price is not None:
+                mask &= columns["price"] >= min_price
+            if max_price is not None:
+                mask &= columns["price"] <= max_price
+            if min_rating is not None:
+                mask &= columns["rating"] >= min_rating
+
+            order = self._orders[sort]
+            matches = order[mask[order]]
+            now = time.time()
+            hotels = []
+            for row in matches[:limit]:
+                search = self._search_list[columns["search"][row]]
+                price = columns["price"][row]
+                hotels.append({
+                    "hotel_id": int(columns["hotel_id"][row]),
+                    "name": columns["name"][row],
+                    "price": 0.0 if np.isnan(price) else float(price),
+                    "currency": columns["currency"][row],
+                    "rating": float(columns["rating"][row]),
+                    "url": columns["url"][row],
+                    "city": search.city,
+                    "checkin": search.checkin,
+                    "checkout": search.checkout,
+                    "age": int(now - search.scraped_at),
+                })
+            return len(matches), hotels
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            removed = self._searches.pop(key, None) is not None
+            self._dirty = self._dirty or removed
+        return removed
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._searches)
+            self._searches.clear()
+            self._dirty = True
+        return count
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "searches": len(self._searches),
+                "max_searches": self.max_searches,
+                "hotels": sum(len(search) for search in self._searches.values()),
+                "queries": self.queries,
+            }
+
+
+# Filled from every real search result (see main.cache_search)
+hotel_store = HotelStore()
@@ -0,0 +1,262 @@
+"""
+SQLite job queue between the API and out-of-process scraper workers (worker.py)
+The API enqueues scrape jobs and awaits their results; workers claim jobs, heartbeat
+while running them and store the result. Jobs of dead or stuck workers are requeued.
+"""
+
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from config import WORKER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("done", "failed", "cancelled")
+
+
+class JobQueue:
+    """Jobs and worker heartbeats in one SQLite file (WAL mode, shared by every process on the host)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, key TEXT, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL DEFAULT 'queued', result TEXT, error TEXT, worker TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, "
+                "heartbeat_at REAL, finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS workers ("
+                "id TEXT PRIMARY KEY, pid INTEGER, started_at REAL, heartbeat_at REAL, "
+                "jobs_done INTEGER NOT NULL DEFAULT 0, jobs_failed INTEGER NOT NULL DEFAULT 0)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, sql: str, params=()) -> sqlite3.Cursor:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(sql, params)
+            conn.execute("COMMIT")
+            return cursor
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # --- API side ---
+    def enqueue(self, kind: str, payload: Dict, key: Optional[str] = None) -> int:
+        """Queue a job; a queued or running job with the same key is reused instead"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if key is not None:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE key = ? AND status IN ('queued', 'running') ORDER BY id LIMIT 1", (key,)
+                ).fetchone()
+                if row:
+                    conn.execute("COMMIT")
+                    return row[0]
+            job_id = conn.execute(
+                "INSERT INTO jobs (kind, key, payload, created_at) VALUES (?, ?, ?, ?)",
+                (kind, key, json.dumps(payload), time.time()),
+            ).lastrowid
+            conn.execute("COMMIT")
+            return job_id
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def finished(self, job_ids: List[int]) -> Dict[int, Dict]:
+        """Finished jobs among job_ids: {id: {"status", "result", "error"}}"""
+        if not job_ids:
+            return {}
+        marks = ",".join("?" * len(job_ids))
+        rows = self._connect().execute(
+            f"SELECT id, status, result, error FROM jobs WHERE id IN ({marks}) AND status IN ('done', 'failed', 'cancelled')",
+            job_ids,
+        ).fetchall()
+        return {
+            row[0]: {"status": row[1], "result": json.loads(row[2]) if row[2] else None, "error": row[3]}
+            for row in rows
+        }
+
+    def cancel(self, job_id: int) -> bool:
+        """Drop a job nobody waits for any more, if no worker has started it"""
+        return self._write(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id),
+        ).rowcount > 0
+
+    # --- Worker side ---
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """Atomically take the oldest queued job"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                "started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker_id, now, now, row[0]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return {"id": row[0], "kind": row[1], "payload": json.loads(row[2])}
+
+    def complete(self, job_id: int, worker_id: str, result: Any):
+        self._write(
+            "UPDATE jobs SET status = 'done', result = ?, finished_at = ? WHERE id = ? AND worker = ?",
+            (json.dumps(result), time.time(), job_id, worker_id),
+        )
+        self._write("UPDATE workers SET jobs_done = jobs_done + 1 WHERE id = ?", (worker_id,))
+
+    def fail(self, job_id: int, worker_id: str, error: str):
+        self._write(
+            "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ? AND worker = ?",
+            (error, time.time(), job_id, worker_id),
+        )
+        self._write("UPDATE workers SET jobs_failed = jobs_failed + 1 WHERE id = ?", (worker_id,))
+
+    def register_worker(self, worker_id: str, pid: int):
+        now = time.time()
+        self._write(
+            "INSERT OR REPLACE INTO workers (id, pid, started_at, heartbeat_at) VALUES (?, ?, ?, ?)",
+            (worker_id, pid, now, now),
+        )
+
+    def heartbeat(self, worker_id: str):
+        """Mark the worker and every job it is running as alive"""
+        now = time.time()
+        self._write("UPDATE workers SET heartbeat_at = ? WHERE id = ?", (now, worker_id))
+        self._write("UPDATE jobs SET heartbeat_at = ? WHERE worker = ? AND status = 'running'", (now, worker_id))
+
+    # --- Supervisor side ---
+    def worker_heartbeats(self) -> Dict[str, float]:
+        return dict(self._connect().execute("SELECT id, heartbeat_at FROM workers").fetchall())
+
+    def remove_worker(self, worker_id: str):
+        self._write("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def release_worker(self, worker_id: str, max_attempts: int) -> int:
+        """Requeue (or fail, once out of attempts) the running jobs of a worker that died"""
+        self._write(
+            "UPDATE jobs SET status = 'failed', error = 'worker died', finished_at = ? "
+            "WHERE worker = ? AND status = 'running' AND attempts >= ?",
+            (time.time(), worker_id, max_attempts),
+        )
+        return self._write(
+            "UPDATE jobs SET status = 'queued', worker = NULL WHERE worker = ? AND status = 'running'",
+            (worker_id,),
+        ).rowcount
+
+    def requeue_stale(self, stuck_after: float, max_attempts: int) -> int:
+        """Requeue running jobs whose worker stopped heartbeating"""
+        cutoff = time.time() - stuck_after
+        workers = [row[0] for row in self._connect().execute(
+            "SELECT DISTINCT worker FROM jobs WHERE status = 'running' AND heartbeat_at < ?", (cutoff,)
+        ).fetchall()]
+        return sum(self.release_worker(worker, max_attempts) for worker in workers)
+
+    def purge(self, older_than: float) -> int:
+        return self._write(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < ?",
+            (time.time() - older_than,),
+        ).rowcount
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        workers = conn.execute("SELECT id, pid, heartbeat_at, jobs_done, jobs_failed FROM workers").fetchall()
+        return {
+            "jobs": counts,
+            "workers": [
+                {"id": w[0], "pid": w[1], "heartbeat_age": round(time.time() - w[2], 1), "done": w[3], "failed": w[4]}
+                for w in workers
+            ],
+        }
+
+
+class JobClient:
+    """Enqueues jobs from the API and resolves their results with one shared poller"""
+
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+        self.poll_interval = WORKER_CONFIG["poll_interval"]
+        self._waiting: Dict[int, List[asyncio.Future]] = {}
+        self._poller: Optional[asyncio.Task] = None
+        self.timeouts = 0
+
+    async def submit(self, kind: str, payload: Dict, key: Optional[str] = None, timeout: Optional[float] = None):
+        """Run a job on a worker; returns its result, or None if it failed or timed out"""
+        timeout = timeout or WORKER_CONFIG["job_timeout"]
+        job_id = await asyncio.to_thread(self.queue.enqueue, kind, payload, key)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(job_id, []).append(future)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+        try:
+            job = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"⏱️ {kind} job {job_id} did not finish within {timeout}s")
+            waiters = self._waiting.get(job_id, [])
+            if future in waiters:
+                waiters.remove(future)
+            if not waiters:
+                self._waiting.pop(job_id, None)
+                await asyncio.to_thread(self.queue.cancel, job_id)
+            return None
+        if job["status"] != "done":
+            logger.error(f"{kind} job {job_id} {job['status']}: {job['error']}")
+            return None
+        return job["result"]
+
+    async def _poll(self):
+        while self._waiting:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                finished = await asyncio.to_thread(self.queue.finished, list(self._waiting))
+            except sqlite3.Error as e:
+                logger.warning(f"Job queue poll failed: {e}")
+                continue
+            for job_id, job in finished.items():
+                for future in self._waiting.pop(job_id, []):
+                    if not future.done():
+                        future.set_result(job)
+
+    def stats(self) -> dict:
+        return {"waiting": len(self._waiting), "timeouts": self.timeouts, **self.queue.stats()}
+
+
+def get_job_queue() -> JobQueue:
+    return JobQueue(WORKER_CONFIG["queue_path"])
@@ -3,15 +3,37 @@ Hotel Data API - Main Application
 Professional hotel search API with real-time data from Booking.com
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Header
-from pydantic import BaseModel
-from typing import List, Optional
+from warmup import Warmup  # First: startup is timed from its import
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from typing import Dict, List, Optional
+from email.utils import formatdate
+from datetime import datetime, timedelta
+import asyncio
+import json
 import logging
+import sqlite3
+import sys
+import time
 
-# Import configuration and scraper
-from config import API_TITLE, API_VERSION, API_DESCRIPTION, VALID_API_KEYS, ENABLE_MOCK_FALLBACK
-from scraper import fetch_hotels  # Basic scraper (fallback)
-from scraper_playwright import fetch_hotels_advanced, fetch_hotel_details  # Advanced Playwright scraper
+# Import configuration; the scrapers (Playwright, lxml) and the NumPy store are imported
+# where they are used, so the app starts without them (see warmup.py)
+from config import API_TITLE, API_VERSION, API_DESCRIPTION, VALID_API_KEYS, ADMIN_API_KEYS, ENABLE_MOCK_FALLBACK, BATCH_CONFIG, HTTP_SCRAPER_CONFIG, BOOKING_CONFIG, STREAM_CONFIG, METRICS_CONFIG, WORKER_CONFIG, CALENDAR_CONFIG, QUERY_CONFIG
+from cache import search_cache, search_cache_key, details_cache
+from hotel_index import hotel_index
+from encoded import EncodedJSONResponse, encode, encoded_cache
+from ratelimit import Overloaded, background, client_for, current_client, rate_limiter, scrape_scheduler
+from refresh import HotKeyRefresher
+from booking_common import DETAIL_SECTIONS, EXTRACT_RESERVE, canonical_hotel_url, resolve_stay_dates, split_detail_sections
+from booking_payloads import stable_hotel_id
+from browser_pool import bind_engine_loop
+from metrics import HTTP_REQUESTS, HTTP_SECONDS, render_latest, runtime as metrics_runtime
+from jobqueue import JobClient, get_job_queue
+from routing import asset_cache
+from sessions import session_pool
+from singleflight import SingleFlight
+from timings import StageTimer, stage
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -24,11 +46,58 @@ app = FastAPI(
     description=API_DESCRIPTION
 )
 
+@app.on_event("startup")
+async def start_scraper_engine():
+    """Host the Playwright engine on the API event loop, start background refreshes and the pre-warm"""
+    bind_engine_loop(asyncio.get_running_loop())
+    refresher.start()
+    warmup.start()
+
+@app.on_event("shutdown")
+async def stop_scraper_engine():
+    await warmup.stop()
+    await refresher.stop()
+    if "scraper_playwright" in sys.modules:  # Never loaded: no browser to close
+        from scraper_playwright import get_pool
+        await get_pool().close()
+
+@app.middleware("http")
+async def time_request(request: Request, call_next):
+    """Per-request stage timings: exported to Prometheus and, optionally, as a Server-Timing header"""
+    with StageTimer() as timer:
+        start = time.perf_counter()
+        response = await call_next(request)
+        elapsed = time.perf_counter() - start
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    HTTP_REQUESTS.labels(request.method, path, response.status_code).inc()
+    HTTP_SECONDS.labels(request.method, path).observe(elapsed)
+    if METRICS_CONFIG["server_timing"]:
+        timings = [f"{name};dur={ms}" for name, ms in timer.as_ms().items()]
+        timings.append(f"total;dur={round(elapsed * 1000, 2)}")
+        response.headers["Server-Timing"] = ", ".join(timings)
+    return response
+
 @app.get("/")
 def health_check():
     """Health check endpoint"""
     return {"status": "ok", "service": "Hotel API Scraper", "version": API_VERSION}
 
+@app.get("/healthz", include_in_schema=False)
+def liveness():
+    """Liveness: the process serves requests (answers before the browsers are up)"""
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+def readiness():
+    """Readiness: 503 until the startup pre-warm (scrapers, browser pool, hot cities) has finished"""
+    body = warmup.stats()
+    if "scraper_playwright" in sys.modules:
+        from scraper_playwright import get_pool
+        stats = get_pool().stats()
+        body["browser_pool"] = {key: stats[key] for key in ("size", "started", "idle", "browser_connected")}
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=body)
+
 # --- 1. MODELS ---
 class HotelResponse(BaseModel):
     hotel_id: int
@@ -43,8 +112,39 @@ async def get_api_key(access_token: str = Header(None, alias="access_token")):
     """Validate API key from header"""
     if not access_token or access_token not in VALID_API_KEYS:
         raise HTTPException(status_code=403, detail="Invalid or missing API key")
+    client = client_for(access_token)
+    charge_quota(access_token)
+    # Scrapes started by this request are scheduled at the key's priority
+    current_client.set(client)
     return access_token
 
+def charge_quota(api_key: str, cost: int = 1):
+    """Take `cost` tokens from the key's quotas; 429 with Retry-After once one is exhausted"""
+    if cost < 1:
+        return
+    limited = rate_limiter.check(client_for(api_key), cost)
+    if limited:
+        quota, retry_after = limited
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded (per-{quota} quota)",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+async def get_admin_key(access_token: str = Header(None, alias="access_token")):
+    """Validate admin API key from header"""
+    if not access_token or access_token not in ADMIN_API_KEYS:
+        raise HTTPException(status_code=403, detail="Invalid or missing admin API key")
+    return access_token
+
+@app.exception_handler(Overloaded)
+async def scrape_queue_full(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": f"Too many scrapes waiting: {exc}"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 # --- 3. DATA FETCHING LOGIC ---
 def fetch_hotel_data_mock(city: str):
     """Return mock hotel data for testing"""
@@ -66,34 +166,136 @@ def fetch_hotel_data_mock(city: str):
         ]
     return []
 
-def fetch_hotel_data_real(city: str, checkin: Optional[str] = None, checkout: Optional[str] = None):
-    """Fetch real hotel data from Booking.com using Playwright"""
+async def fetch_browserless(fetch, *args):
+    """Run a browserless scraper off the event loop; None means "use Playwright instead" """
+    if not HTTP_SCRAPER_CONFIG["enabled"]:
+        return None
+    from scraper import WafChallenge
+
     try:
-        logger.info(f"Fetching real hotel data for {city} using Playwright")
+        return await asyncio.to_thread(fetch, *args) or None
+    except WafChallenge as e:
+        logger.info(f"🛡️ {e}, falling back to Playwright")
+    except Exception as e:
+        logger.warning(f"Browserless fetch failed, falling back to Playwright: {e}")
+    return None
+
+def index_hotels(hotels: List[Dict], city: Optional[str] = None):
+    """Record hotel_id -> URL so details can later be requested by hotel_id"""
+    if hotel_index is None:
+        return
+    try:
+        hotel_index.add(hotels, city)
+    except sqlite3.Error as e:
+        logger.warning(f"Hotel index write failed: {e}")
+
+async def cache_search(city: str, checkin: str, checkout: str, hotels: List[Dict]):
+    """Keep a real search result: cache, hotel_id index and the /hotels/query store"""
+    cache_key = search_cache_key(city, checkin, checkout)
+    from hotel_store import hotel_store
+
+    await search_cache.set_async(cache_key, hotels)
+    hotel_store.put(cache_key, city, checkin, checkout, hotels)
+    await asyncio.to_thread(index_hotels, hotels, city)
+    try:
+        encoded_cache.put(cache_key, hotels, encode(HOTEL_LIST, hotels))
+    except ValidationError as e:
+        logger.warning(f"Scraped results for {city} do not match HotelResponse: {e}")
+
+# Scrapes run on the worker fleet (worker.py) when enabled, otherwise in this process
+job_client = JobClient(get_job_queue()) if WORKER_CONFIG["enabled"] else None
+
+# Identical scrapes share one place in the scheduler queue instead of one each
+scrape_flights = SingleFlight("scrape")
+
+async def scrape_search(city: str, checkin: str, checkout: str):
+    """Playwright search, on a worker process when the fleet is enabled"""
+    cache_key = search_cache_key(city, checkin, checkout)
+    return await scrape_flights.do(cache_key, lambda: _scrape_search(city, checkin, checkout, cache_key))
+
+async def _scrape_search(city: str, checkin: str, checkout: str, cache_key: str):
+    requested_at = time.time()
+    async with scrape_scheduler.slot():
+        # Another worker (or an earlier flight) may have cached it while this one was queued
+        entry = await search_cache.get_entry_async(cache_key, allow_stale=False)
+        if entry is not None and entry.stored_at >= requested_at:
+            return entry.value
+        if job_client:
+            payload = {"city": city, "checkin": checkin, "checkout": checkout}
+            return await job_client.submit("search", payload, key=cache_key) or []
+        from scraper_playwright import fetch_hotels_advanced_async
+        return await fetch_hotels_advanced_async(city, checkin, checkout)
+
+async def scrape_details(hotel_url: str, sections: List[str], deadline: Optional[float] = None):
+    """Playwright hotel details, on a worker process when the fleet is enabled"""
+    # Callers with and without a deadline get separate flights: a cut-short result only suits the former
+    key = f"{canonical_hotel_url(hotel_url)}|{','.join(sorted(sections))}|{'deadline' if deadline is not None else 'full'}"
+    flight = scrape_flights.do(key, lambda: _scrape_details(hotel_url, sections, deadline))
+    if deadline is None:
+        return await flight
+    try:
+        # A joiner still gives up at its own deadline; the shared scrape carries on
+        return await asyncio.wait_for(flight, deadline + EXTRACT_RESERVE)
+    except asyncio.TimeoutError:
+        return None
+
+async def _scrape_details(hotel_url: str, sections: List[str], deadline: Optional[float]):
+    started = time.monotonic()
+    requested_at = time.time()
+    async with scrape_scheduler.slot():
+        if deadline is not None:
+            # Time spent queued for a slot comes out of the deadline
+            deadline -= time.monotonic() - started
+            if deadline <= 0:
+                return None
+        entries = await details_cache.get_sections_async(canonical_hotel_url(hotel_url))
+        cached = [entries[name].value for name in sections if name in entries and entries[name].stored_at >= requested_at]
+        if len(cached) == len(sections):
+            # Cached by another scrape while this one was queued
+            hotel_data = {}
+            for part in cached:
+                hotel_data.update(part)
+            return hotel_data
+        if job_client:
+            payload = {"hotel_url": hotel_url, "sections": sections, "deadline": deadline}
+            # The deadline travels in the payload: identical hotels share one queued job whatever their deadlines
+            key = f"details:{canonical_hotel_url(hotel_url)}|{','.join(sorted(sections))}"
+            # A little slack over the deadline for queueing and handing the result back
+            return await job_client.submit("details", payload, key=key, timeout=deadline + 1 if deadline else None)
+        from scraper_playwright import fetch_hotel_details_async
+        return await fetch_hotel_details_async(hotel_url, sections=sections, deadline=deadline)
+
+async def fetch_hotel_data_real(city: str, checkin: Optional[str] = None, checkout: Optional[str] = None):
+    """Fetch real hotel data from Booking.com: browserless first, then Playwright (real results are cached, mock data never is)"""
+    from scraper import fetch_hotels
+
+    checkin, checkout = resolve_stay_dates(checkin, checkout)
+    cache_key = search_cache_key(city, checkin, checkout)
+    try:
+        # Try the browserless HTTP scraper first
+        hotels = await fetch_browserless(fetch_hotels, city, checkin, checkout)
+        if hotels:
+            logger.info(f"✅ Successfully fetched {len(hotels)} hotels for {city} without a browser")
+            await cache_search(city, checkin, checkout, hotels)
+            return hotels
         
-        # Try advanced Playwright scraper first
-        hotels = fetch_hotels_advanced(city, checkin, checkout)
+        # Fallback to the Playwright scraper
+        logger.info(f"Fetching real hotel data for {city} using Playwright")
+        hotels = await scrape_search(city, checkin, checkout)
         
         if hotels:
             logger.info(f"✅ Successfully fetched {len(hotels)} hotels for {city} using Playwright")
+            await cache_search(city, checkin, checkout, hotels)
             return hotels
-        else:
-            logger.warning(f"Playwright scraper returned no results for {city}")
-            
-            # Fallback to basic scraper
-            logger.info(f"Trying basic scraper as fallback for {city}")
-            hotels = fetch_hotels(city, checkin, checkout, use_cache=True)
-            
-            if hotels:
-                logger.info(f"Basic scraper found {len(hotels)} hotels for {city}")
-                return hotels
-            
-            # Final fallback to mock data
-            logger.warning(f"No hotels found for {city}, using mock data fallback")
-            if ENABLE_MOCK_FALLBACK:
-                return fetch_hotel_data_mock(city)
-            return []
+        
+        # Final fallback to mock data
+        logger.warning(f"No hotels found for {city}, using mock data fallback")
+        if ENABLE_MOCK_FALLBACK:
+            return fetch_hotel_data_mock(city)
+        return []
             
+    except Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Error fetching hotel data: {e}")
         if ENABLE_MOCK_FALLBACK:
@@ -101,6 +303,35 @@ def fetch_hotel_data_real(city: str, checkin: Optional[str] = None, checkout: Op
             return fetch_hotel_data_mock(city)
         return []
 
+# Re-scrapes hot or stale searches in the background (results land in search_cache)
+async def refresh_search(city: str, checkin: str, checkout: str):
+    # Refresh tasks inherit the context of the request that scheduled them
+    with background():
+        return await fetch_hotel_data_real(city, checkin, checkout)
+
+refresher = HotKeyRefresher(search_cache, refresh_search)
+
+async def start_browser_pool():
+    """Launch Chromium and pre-create the pool's pages (pre-warm)"""
+    from scraper_playwright import get_pool
+
+    pool = get_pool()
+    await pool.start()
+    if not pool.stats()["browser_connected"]:
+        # start() only runs once; a lease reopens a slot and relaunches the browser
+        async with pool.lease():
+            pass
+    if not pool.stats()["browser_connected"]:
+        raise RuntimeError("pooled Chromium did not launch")
+
+async def prewarm_city(city: str):
+    """Search a hot city (default dates) into the cache unless it is already there"""
+    with background():
+        await get_search_results(city)
+
+# Pre-warm after startup; browsers belong to the worker fleet when it is enabled
+warmup = Warmup(None if job_client else start_browser_pool, prewarm_city)
+
 # --- NEW: Hotel Details Models ---
 class HotelAmenity(BaseModel):
     category: str
@@ -137,11 +368,96 @@ class HotelDetails(BaseModel):
     policies: Optional[str] = None
     contact_phone: Optional[str] = None
     contact_email: Optional[str] = None
+    sections: Dict[str, bool] = {}  # Requested section -> fully loaded
+
+async def get_search_results(city: str, checkin: Optional[str] = None, checkout: Optional[str] = None):
+    """
+    Cached search with stale-while-revalidate.
+    Returns (results, cache_status, age_seconds) where cache_status is HIT, STALE or MISS.
+    """
+    checkin, checkout = resolve_stay_dates(checkin, checkout)
+    cache_key = search_cache_key(city, checkin, checkout)
+    refresher.record(cache_key, city, checkin, checkout)
+    
+    entry = await search_cache.get_entry_async(cache_key)
+    if entry is None:
+        return await fetch_hotel_data_real(city, checkin, checkout), "MISS", 0
+    if search_cache.is_fresh(entry):
+        return entry.value, "HIT", int(entry.age)
+    refresher.refresh_soon(cache_key)
+    return entry.value, "STALE", int(entry.age)
+
+async def fetch_hotel_details_cached(hotel_url: str, sections: Optional[List[str]] = None, deadline: Optional[float] = None):
+    """
+    Hotel details from the per-section cache, re-scraping only the requested sections past their TTL.
+    Returns (hotel_data, last_modified, refreshed_sections); stale sections are kept if the scrape fails.
+    hotel_data["sections"] flags which requested sections are complete: with a `deadline` (seconds)
+    a scrape cut short returns what it had, and only complete sections are cached.
+    """
+    from scraper import fetch_hotel_details_http
+
+    started = time.monotonic()
+    wanted = [name for name in DETAIL_SECTIONS if name == "info" or not sections or name in sections]
+    canonical = canonical_hotel_url(hotel_url)
+    entries = {name: entry for name, entry in (await details_cache.get_sections_async(canonical)).items() if name in wanted}
+    parts_by_section = {name: entry.value for name, entry in entries.items()}
+    stored_at = {name: entry.stored_at for name, entry in entries.items()}
+    complete = dict.fromkeys(entries, True)
+    
+    stale = [name for name in details_cache.stale_sections(entries) if name in wanted]
+    refreshed = []
+    if stale:
+        try:
+            hotel_data = await asyncio.wait_for(fetch_browserless(fetch_hotel_details_http, hotel_url, stale), deadline)
+        except asyncio.TimeoutError:
+            hotel_data = None
+        remaining = None if deadline is None else deadline - (time.monotonic() - started)
+        if not hotel_data and (remaining is None or remaining > 0):
+            hotel_data = await scrape_details(hotel_url, stale, remaining)
+        if hotel_data:
+            flags = hotel_data.get("sections", {})
+            now = time.time()
+            for name, part in split_detail_sections(hotel_data, stale).items():
+                if flags.get(name, True):
+                    await details_cache.set_sections_async(canonical, {name: part})
+                    refreshed.append(name)
+                elif name in parts_by_section:
+                    continue  # A stale but complete section beats a partial one
+                parts_by_section[name] = part
+                stored_at[name] = now
+                complete[name] = flags.get(name, True)
+    
+    if "info" not in parts_by_section:
+        return None, None, refreshed
+    merged = {}
+    for part in parts_by_section.values():
+        merged.update(part)
+    # Entries cached before ids were derived from the URL carry an older id
+    merged["hotel_id"] = stable_hotel_id(canonical, merged["name"])
+    merged["sections"] = {name: complete.get(name, False) for name in wanted}
+    if "info" in refreshed:
+        await asyncio.to_thread(index_hotels, [{"hotel_id": merged["hotel_id"], "url": canonical, "name": merged["name"]}])
+    return merged, max(stored_at.values()), refreshed
+
+# Response bodies are validated and encoded once per cached value (see encoded.py)
+HOTEL_LIST = TypeAdapter(List[HotelResponse])
+HOTEL_DETAILS = TypeAdapter(HotelDetails)
+
+def details_version(hotel_data: dict, last_modified: float) -> tuple:
+    """Changes whenever the merged details do: any re-scraped section is newer than last_modified"""
+    return last_modified, tuple(sorted(hotel_data["sections"].items()))
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
 
 # --- 4. THE ENDPOINT ---
 @app.get("/hotels/search", response_model=list[HotelResponse])
 async def search_hotels(
     city: str,
+    request: Request,
     checkin: Optional[str] = None,
     checkout: Optional[str] = None,
     api_key: str = Depends(get_api_key) # This locks the endpoint
@@ -158,23 +474,411 @@ async def search_hotels(
     
     **Returns**: A list of hotels with their details including price and rating.
     
-    **Note**: Data is cached for 1 hour to improve performance.
+    **Note**: Data is cached for 1 hour to improve performance. Expired entries are still
+    served (`X-Cache: STALE`) while a background refresh runs; the `Age` header gives
+    the data's age in seconds.
     """
     logger.info(f"API request for city: {city}, checkin: {checkin}, checkout: {checkout}")
     
-    # Run the scraper in a thread pool to avoid async issues with Playwright Sync API
-    import asyncio
-    from concurrent.futures import ThreadPoolExecutor
-    
-    loop = asyncio.get_event_loop()
-    with ThreadPoolExecutor() as executor:
-        results = await loop.run_in_executor(executor, fetch_hotel_data_real, city, checkin, checkout)
+    results, cache_status, age = await get_search_results(city, checkin, checkout)
     
     if not results:
         raise HTTPException(status_code=404, detail="No hotels found for this city")
-        
+    
+    # The cached list itself is the version: a refresh stores a new list
+    cache_key = search_cache_key(city, *resolve_stay_dates(checkin, checkout))
+    payload = encoded_cache.get_or_encode(cache_key, results, HOTEL_LIST, results)
+    return EncodedJSONResponse(
+        payload,
+        request.headers.get("accept-encoding"),
+        headers={"X-Cache": cache_status, "Age": str(age)},
+    )
+
+# --- 4a. STREAMING SEARCH ---
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def encode_stream_event(fmt: str, event: str, data: dict) -> str:
+    if fmt == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps(data if event == "hotel" else {event: data}) + "\n"
+
+@app.get("/hotels/search/stream")
+async def stream_search_hotels(
+    city: str,
+    checkin: Optional[str] = None,
+    checkout: Optional[str] = None,
+    format: str = "ndjson",
+    max_results: int = BOOKING_CONFIG["max_results"],
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Stream hotels for a city as they are parsed instead of waiting for the whole page.
+    
+    **Parameters** (as `/hotels/search`, plus):
+    - **format**: `ndjson` (one hotel JSON object per line) or `sse` (server-sent `hotel` events)
+    - **max_results**: Number of hotels to stream (up to `STREAM_CONFIG["max_results"]`); further
+      result pages are only loaded while the client keeps reading.
+    
+    The stream ends with an `end` record (`{"end": {"count": N}}` in NDJSON) or an `error` record
+    (with `retry_after` when the scrape queue is full). A stream holds a browser page and a scrape
+    slot; it gives them up once the client stops reading for `STREAM_CONFIG["idle_timeout"]` seconds
+    or after `STREAM_CONFIG["lease_timeout"]`, and ends early with `"truncated": true` in `end`.
+    """
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    max_results = max(1, min(max_results, STREAM_CONFIG["max_results"]))
+    checkin, checkout = resolve_stay_dates(checkin, checkout)
+    cache_key = search_cache_key(city, checkin, checkout)
+    logger.info(f"API stream request for city: {city}, checkin: {checkin}, checkout: {checkout}")
+    
+    entry = await search_cache.get_entry_async(cache_key, allow_stale=False)
+    cached = entry.value if entry else None
+    if cached is not None and len(cached) < max_results:
+        cached = None
+    
+    async def events():
+        first_page, streamed = [], []
+        count = 0
+        truncated = False
+        try:
+            if cached is not None:
+                for hotel in cached[:max_results]:
+                    count += 1
+                    yield encode_stream_event(format, "hotel", hotel)
+            elif job_client:
+                # Browsers live on the worker fleet: one buffered search through the job queue
+                for hotel in (await fetch_hotel_data_real(city, checkin, checkout))[:max_results]:
+                    count += 1
+                    yield encode_stream_event(format, "hotel", HotelResponse(**hotel).model_dump())
+            else:
+                from scraper_playwright import StreamTruncated, stream_hotels_async
+                async with scrape_scheduler.slot():
+                    try:
+                        async for hotel in stream_hotels_async(city, checkin, checkout, max_results):
+                            hotel = HotelResponse(**hotel).model_dump()
+                            streamed.append(hotel)
+                            if len(first_page) < BOOKING_CONFIG["max_results"]:
+                                first_page.append(hotel)
+                            count += 1
+                            yield encode_stream_event(format, "hotel", hotel)
+                    except StreamTruncated as e:
+                        logger.warning(f"Stream for {city} truncated after {count} hotels: {e}")
+                        truncated = True
+                # A full first page is what /hotels/search would have cached
+                if len(first_page) == BOOKING_CONFIG["max_results"]:
+                    await search_cache.set_async(cache_key, first_page)
+                await asyncio.to_thread(index_hotels, streamed, city)
+            end = {"count": count}
+            if truncated:
+                end["truncated"] = True
+            yield encode_stream_event(format, "end", end)
+        except Overloaded as e:
+            yield encode_stream_event(format, "error", {"detail": str(e), "retry_after": e.retry_after, "count": count})
+        except Exception as e:
+            logger.error(f"Stream for {city} failed after {count} hotels: {e}")
+            yield encode_stream_event(format, "error", {"detail": str(e), "count": count})
+    
+    return StreamingResponse(
+        events(),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"X-Cache": "HIT" if cached is not None else "MISS"},
+    )
+
+# --- 4b. BATCH SEARCH ---
+class BatchSearchItem(BaseModel):
+    city: str
+    checkin: Optional[str] = None
+    checkout: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    items: List[BatchSearchItem]
+
+class BatchSearchResult(BaseModel):
+    city: str
+    checkin: str
+    checkout: str
+    status: str  # "ok", "not_found" or "error"
+    cache: Optional[str] = None
+    hotels: List[HotelResponse] = []
+    error: Optional[str] = None
+
+@app.post("/hotels/search/batch", response_model=List[BatchSearchResult])
+async def search_hotels_batch(
+    request: BatchSearchRequest,
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Run many city/date searches in one call.
+    
+    **Body**: `{"items": [{"city": "Goa", "checkin": "2025-01-10", "checkout": "2025-01-11"}, ...]}`
+    
+    **Returns**: One result per item, in request order, each with its own `status`
+    (`ok`, `not_found` or `error`). Items run concurrently (up to `BATCH_CONFIG["search_parallelism"]`
+    at once), share the search cache, and identical items are scraped only once.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No search items given")
+    if len(request.items) > BATCH_CONFIG["max_search_items"]:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_CONFIG['max_search_items']} items per batch")
+    # One quota token per item (get_api_key took the first)
+    charge_quota(api_key, len(request.items) - 1)
+    
+    logger.info(f"API batch search for {len(request.items)} items")
+    limit = asyncio.Semaphore(BATCH_CONFIG["search_parallelism"])
+    
+    async def run_item(item: BatchSearchItem) -> BatchSearchResult:
+        checkin, checkout = resolve_stay_dates(item.checkin, item.checkout)
+        result = BatchSearchResult(city=item.city, checkin=checkin, checkout=checkout, status="ok")
+        try:
+            async with limit:
+                hotels, result.cache, _ = await get_search_results(item.city, checkin, checkout)
+            if hotels:
+                result.hotels = [HotelResponse(**hotel) for hotel in hotels]
+            else:
+                result.status = "not_found"
+        except Exception as e:
+            logger.error(f"Batch search item {item.city} failed: {e}")
+            result.status = "error"
+            result.error = str(e)
+        return result
+    
+    return await asyncio.gather(*(run_item(item) for item in request.items))
+
+# --- 4c. PRICE CALENDAR ---
+class CalendarDate(BaseModel):
+    checkin: str
+    checkout: str
+    status: str  # "ok", "not_found" or "error"
+    cache: Optional[str] = None
+    hotels: int = 0
+    min_price: Optional[float] = None
+
+class CalendarHotel(BaseModel):
+    hotel_id: int
+    name: str
+    rating: float
+    currency: str
+    url: Optional[str] = None
+    prices: Dict[str, Optional[float]] = {}  # Check-in date -> price (None where not listed)
+    cheapest_date: Optional[str] = None
+
+class PriceCalendar(BaseModel):
+    city: str
+    nights: int
+    dates: List[CalendarDate]
+    hotels: List[CalendarHotel]
+
+async def scrape_calendar(city: str, stays: List[tuple]) -> Dict[str, List[Dict]]:
+    """Browser sweep of many stays for one city, on a worker process when the fleet is enabled"""
+    wanted = min(CALENDAR_CONFIG["parallel_pages"], len(stays)) - 1
+    # One scheduler slot per leased page: extra pages only when slots are free right now
+    async with scrape_scheduler.slot(), scrape_scheduler.extra_slots(wanted) as extra:
+        pages = 1 + extra
+        # A sweep that runs out of time returns the dates it finished
+        timeout = CALENDAR_CONFIG["timeout"]
+        if job_client:
+            # A few seconds kept back to hand the partial result over before the job times out
+            payload = {"city": city, "stays": stays, "pages": pages, "timeout": timeout - 5}
+            key = f"calendar:{city.strip().lower()}|{','.join(checkin for checkin, _ in stays)}|{stays[0][1]}"
+            return await job_client.submit("calendar", payload, key=key, timeout=timeout) or {}
+        from scraper_playwright import sweep_search_dates_async
+        return await sweep_search_dates_async(city, stays, pages, timeout)
+
+async def fetch_calendar_stays(city: str, stays: List[tuple]) -> Dict[str, List[Dict]]:
+    """Scrape uncached stays: browserless in parallel, then one browser sweep for the rest (results are cached)"""
+    from scraper import fetch_hotels
+
+    results = {}
+    limit = asyncio.Semaphore(CALENDAR_CONFIG["http_parallelism"])
+    
+    async def fetch_http(checkin: str, checkout: str):
+        async with limit:
+            hotels = await fetch_browserless(fetch_hotels, city, checkin, checkout)
+        if hotels:
+            results[checkin] = hotels
+    
+    await asyncio.gather(*(fetch_http(checkin, checkout) for checkin, checkout in stays))
+    remaining = [stay for stay in stays if stay[0] not in results]
+    try:
+        if remaining:
+            logger.info(f"Sweeping {len(remaining)} dates for {city} using Playwright")
+            try:
+                results.update(await scrape_calendar(city, remaining))
+            except Overloaded:
+                raise
+            except Exception as e:
+                logger.error(f"Calendar sweep for {city} failed: {e}")
+    finally:
+        # Browserless dates are kept even when the sweep is turned away with a 429
+        for checkin, checkout in stays:
+            if results.get(checkin):
+                await cache_search(city, checkin, checkout, results[checkin])
     return results
 
+@app.get("/hotels/calendar", response_model=PriceCalendar)
+async def price_calendar(
+    city: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    nights: int = 1,
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Price of every hotel in a city for each check-in date in a range.
+    
+    **Parameters**:
+    - **city**: The city name to search for hotels
+    - **start**: First check-in date, YYYY-MM-DD (optional, defaults to the `/hotels/search` check-in)
+    - **end**: Last check-in date, YYYY-MM-DD (optional, defaults to `CALENDAR_CONFIG["default_days"]` days from `start`)
+    - **nights**: Length of each stay (default 1)
+    
+    **Returns**: Per-date summaries (`status`, `cache`, cheapest price) and per-hotel prices by check-in date,
+    cheapest hotels first. Dates already in the search cache are not scraped again; the rest are
+    swept on a few warm browser pages instead of one search each.
+    """
+    try:
+        first = datetime.strptime(start, "%Y-%m-%d") if start else datetime.strptime(resolve_stay_dates()[0], "%Y-%m-%d")
+        last = datetime.strptime(end, "%Y-%m-%d") if end else first + timedelta(days=CALENDAR_CONFIG["default_days"] - 1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be YYYY-MM-DD dates")
+    days = (last - first).days + 1
+    if days < 1:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if days > CALENDAR_CONFIG["max_days"]:
+        raise HTTPException(status_code=400, detail=f"At most {CALENDAR_CONFIG['max_days']} check-in dates per request")
+    if not 1 <= nights <= CALENDAR_CONFIG["max_nights"]:
+        raise HTTPException(status_code=400, detail=f"nights must be between 1 and {CALENDAR_CONFIG['max_nights']}")
+    
+    stays = []
+    for offset in range(days):
+        checkin = first + timedelta(days=offset)
+        stays.append((checkin.strftime("%Y-%m-%d"), (checkin + timedelta(days=nights)).strftime("%Y-%m-%d")))
+    logger.info(f"API calendar request for city: {city}, {stays[0][0]} to {stays[-1][0]}, {nights} nights")
+    
+    found, cache_status = {}, {}
+    for checkin, checkout in stays:
+        cache_key = search_cache_key(city, checkin, checkout)
+        refresher.record(cache_key, city, checkin, checkout)
+        entry = await search_cache.get_entry_async(cache_key)
+        if entry is None:
+            continue
+        found[checkin] = entry.value
+        cache_status[checkin] = "HIT"
+        if not search_cache.is_fresh(entry):
+            refresher.refresh_soon(cache_key)
+            cache_status[checkin] = "STALE"
+    
+    missing = [stay for stay in stays if stay[0] not in found]
+    if missing:
+        # One quota token per date that has to be scraped (get_api_key took the first)
+        charge_quota(api_key, len(missing) - 1)
+        scraped = await fetch_calendar_stays(city, missing)
+        for checkin, _ in missing:
+            if checkin in scraped:
+                found[checkin] = scraped[checkin]
+                cache_status[checkin] = "MISS"
+    
+    dates = []
+    hotels: Dict[int, CalendarHotel] = {}
+    for checkin, checkout in stays:
+        listed = found.get(checkin)
+        day = CalendarDate(checkin=checkin, checkout=checkout, status="ok", cache=cache_status.get(checkin))
+        if listed is None:
+            day.status = "error"
+        elif not listed:
+            day.status = "not_found"
+        for hotel in listed or []:
+            if hotel["hotel_id"] not in hotels:
+                hotels[hotel["hotel_id"]] = CalendarHotel(
+                    hotel_id=hotel["hotel_id"], name=hotel["name"], rating=hotel["rating"],
+                    currency=hotel["currency"], url=hotel.get("url"),
+                )
+            hotels[hotel["hotel_id"]].prices[checkin] = hotel["price"]
+        prices = [hotel["price"] for hotel in listed or [] if hotel.get("price")]
+        day.hotels = len(listed or [])
+        day.min_price = min(prices) if prices else None
+        dates.append(day)
+    
+    for hotel in hotels.values():
+        priced = {checkin: price for checkin, price in hotel.prices.items() if price}
+        hotel.cheapest_date = min(priced, key=priced.get) if priced else None
+        hotel.prices = {checkin: hotel.prices.get(checkin) for checkin, _ in stays}
+    ranked = sorted(hotels.values(), key=lambda h: h.prices[h.cheapest_date] if h.cheapest_date else float("inf"))
+    return PriceCalendar(city=city, nights=nights, dates=dates, hotels=ranked)
+
+# --- 4d. QUERY STORED RESULTS ---
+class QueryHotel(HotelResponse):
+    city: str
+    checkin: str
+    checkout: str
+    age: int  # Seconds since the search was scraped
+
+class HotelQueryResult(BaseModel):
+    total: int  # Matches before `limit`
+    hotels: List[QueryHotel]
+    sources: Dict[str, str]  # City -> STORE, HIT, STALE or MISS
+
+@app.get("/hotels/query", response_model=HotelQueryResult)
+async def query_hotels(
+    city: str,
+    checkin: Optional[str] = None,
+    checkout: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    sort: str = "price",
+    limit: int = QUERY_CONFIG["default_limit"],
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Filter, sort and rank hotels across one or more cities from stored search results.
+    
+    **Parameters**:
+    - **city**: One city or a comma-separated list (up to `QUERY_CONFIG["max_cities"]`)
+    - **checkin** / **checkout**: Stay dates as in `/hotels/search`
+    - **min_price**, **max_price**, **min_rating**: Filters (hotels without a listed price never match a price filter)
+    - **sort**: `price`, `-price`, `rating`, `-rating` or `-scraped_at` (`-` = descending)
+    - **limit**: Number of hotels to return (top-k)
+    
+    **Returns**: The total number of matches and the first `limit` of them. Cities whose results are
+    stored and fresh are answered from memory (`STORE`); the others go through the search cache and
+    are scraped only when missing (`MISS`) or refreshed in the background when expired (`STALE`).
+    """
+    from hotel_store import SORTS, hotel_store
+
+    cities = list(dict.fromkeys(name.strip() for name in city.split(",") if name.strip()))
+    if not cities:
+        raise HTTPException(status_code=400, detail="No city given")
+    if len(cities) > QUERY_CONFIG["max_cities"]:
+        raise HTTPException(status_code=400, detail=f"At most {QUERY_CONFIG['max_cities']} cities per query")
+    charge_quota(api_key, len(cities) - 1)
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SORTS)}")
+    limit = max(1, min(limit, QUERY_CONFIG["max_limit"]))
+    checkin, checkout = resolve_stay_dates(checkin, checkout)
+    
+    sources = {}
+    keys = []
+    limit_scrapes = asyncio.Semaphore(BATCH_CONFIG["search_parallelism"])
+    
+    async def ensure_stored(name: str):
+        key = search_cache_key(name, checkin, checkout)
+        keys.append(key)
+        age = hotel_store.age(key)
+        if age is not None and age <= search_cache.ttl:
+            sources[name] = "STORE"
+            return
+        async with limit_scrapes:
+            hotels, sources[name], age = await get_search_results(name, checkin, checkout)
+        # Fresh scrapes are stored by cache_search; cache hits are loaded with their original age
+        if hotels and sources[name] != "MISS":
+            hotel_store.put(key, name, checkin, checkout, hotels, scraped_at=time.time() - age)
+    
+    await asyncio.gather(*(ensure_stored(name) for name in cities))
+    with stage("query"):
+        total, hotels = hotel_store.query(keys, min_price, max_price, min_rating, sort, limit)
+    return HotelQueryResult(total=total, hotels=hotels, sources=sources)
+
 # --- 5. ROOT ENDPOINT ---
 @app.get("/")
 async def root():
@@ -186,7 +890,9 @@ async def root():
         "version": API_VERSION,
         "endpoints": {
             "search_hotels": "/hotels/search?city={city_name}&checkin={YYYY-MM-DD}&checkout={YYYY-MM-DD}",
-            "hotel_details": "/hotels/details?hotel_url={booking_url}"
+            "hotel_details": "/hotels/details?hotel_url={booking_url} or ?hotel_id={hotel_id}",
+            "price_calendar": "/hotels/calendar?city={city_name}&start={YYYY-MM-DD}&end={YYYY-MM-DD}",
+            "query_hotels": "/hotels/query?city={city_name}[,{city_name}...]&max_price={price}&min_rating={rating}&sort=price"
         },
         "features": [
             "Real-time hotel data from Booking.com",
@@ -199,34 +905,248 @@ async def root():
 # --- 6. HOTEL DETAILS ENDPOINT ---
 @app.get("/hotels/details", response_model=HotelDetails)
 async def get_hotel_details(
-    hotel_url: str,
+    request: Request,
+    hotel_url: Optional[str] = None,
+    hotel_id: Optional[int] = None,
+    sections: Optional[str] = None,
+    deadline_ms: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
     api_key: str = Depends(get_api_key)
 ):
     """
-    Get comprehensive details for a specific hotel using its Booking.com URL.
+    Get comprehensive details for a specific hotel using its Booking.com URL or its `hotel_id`.
     
     **Authentication**: Include your API key in the `access_token` header.
     
-    **Parameters**:
+    **Parameters** (give `hotel_url` or `hotel_id`):
     - **hotel_url**: Full Booking.com hotel URL (e.g., https://www.booking.com/hotel/in/taj-mahal-palace.html)
+    - **hotel_id**: The `hotel_id` of a hotel from search results. IDs are derived from the hotel's
+      Booking URL, so they stay the same across requests, workers and restarts.
+    - **sections**: Comma-separated subset of `info`, `amenities`, `reviews`, `room_types` (optional,
+      defaults to all). `info` (name, rating, address, description) is always included; skipping a
+      section skips the page interactions it needs.
+    - **deadline_ms**: Time budget in milliseconds (optional). When it runs out, whatever has been
+      extracted is returned; the `sections` map in the response flags each section as complete or not.
     
     **Returns**: Comprehensive hotel details including amenities, reviews, photos, room types, and policies.
     
-    **Note**: This endpoint takes 20-30 seconds as it scrapes detailed information.
+    **Note**: A full scrape takes 20-30 seconds. Details are cached per section (info, amenities,
+    reviews, room types), each with its own TTL, and only expired sections are re-scraped.
+    Responses carry `ETag` and `Last-Modified`; send `If-None-Match` to get a 304 when nothing changed.
     """
-    logger.info(f"API request for hotel details: {hotel_url}")
+    if (hotel_url is None) == (hotel_id is None):
+        raise HTTPException(status_code=400, detail="Give either hotel_url or hotel_id")
+    if hotel_id is not None:
+        indexed = await asyncio.to_thread(hotel_index.get, hotel_id) if hotel_index else None
+        if indexed is None:
+            raise HTTPException(status_code=404, detail="Unknown hotel_id; search for the hotel first or use hotel_url")
+        hotel_url = indexed["url"]
+    logger.info(f"API request for hotel details: {hotel_url} (sections: {sections}, deadline_ms: {deadline_ms})")
     
-    # Run in thread pool for async compatibility
-    import asyncio
-    from concurrent.futures import ThreadPoolExecutor
+    wanted = None
+    if sections:
+        wanted = [name.strip() for name in sections.split(",") if name.strip()]
+        unknown = [name for name in wanted if name not in DETAIL_SECTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+    deadline = None
+    if deadline_ms is not None:
+        if deadline_ms <= 0:
+            raise HTTPException(status_code=400, detail="deadline_ms must be positive")
+        deadline = min(deadline_ms / 1000, BOOKING_CONFIG["detail_timeout"])
     
-    loop = asyncio.get_event_loop()
-    with ThreadPoolExecutor() as executor:
-        hotel_data = await loop.run_in_executor(executor, fetch_hotel_details, hotel_url)
+    started = time.monotonic()
+    hotel_data, last_modified, refreshed = await fetch_hotel_details_cached(hotel_url, wanted, deadline)
     
     if not hotel_data:
+        if deadline is not None and time.monotonic() - started + EXTRACT_RESERVE >= deadline:
+            raise HTTPException(status_code=504, detail="Hotel details did not load within deadline_ms")
         raise HTTPException(status_code=404, detail="Could not fetch hotel details")
     
-    return hotel_data
+    encoded_key = f"details:{canonical_hotel_url(hotel_url)}|{','.join(sorted(hotel_data['sections']))}"
+    payload = encoded_cache.get_or_encode(
+        encoded_key, details_version(hotel_data, last_modified), HOTEL_DETAILS, hotel_data
+    )
+    etag = payload.etag
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "X-Cache": "MISS" if "info" in refreshed else ("PARTIAL" if refreshed else "HIT"),
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return EncodedJSONResponse(payload, request.headers.get("accept-encoding"), headers=headers)
+
+# --- 6b. BATCH HOTEL DETAILS ---
+class BatchDetailsRequest(BaseModel):
+    hotel_urls: List[str]
+    deadline_ms: Optional[int] = None
+
+class BatchDetailsResult(BaseModel):
+    hotel_url: str
+    status: str  # "ok", "not_found", "error" or "timeout"
+    cache: Optional[str] = None
+    details: Optional[HotelDetails] = None
+    error: Optional[str] = None
+
+# Batch detail fetches, kept referenced so they can outlive the batch that started them
+detached_fetches = set()
+
+def forget_fetch(task: asyncio.Task):
+    detached_fetches.discard(task)
+    if not task.cancelled():
+        task.exception()  # Retrieved here too: the batch may have answered before it failed
+
+@app.post("/hotels/details/batch", response_model=List[BatchDetailsResult])
+async def get_hotel_details_batch(
+    request: BatchDetailsRequest,
+    api_key: str = Depends(get_api_key)
+):
+    """
+    Fetch details for several hotels in one call.
+    
+    **Body**: `{"hotel_urls": ["https://www.booking.com/hotel/...", ...], "deadline_ms": 45000}`
+    
+    **Returns**: One result per URL, in request order. Hotels are scraped in parallel pooled tabs
+    (up to `BATCH_CONFIG["details_parallelism"]` at once) under one overall deadline
+    (`deadline_ms`, capped at `BATCH_CONFIG["details_deadline"]`). Whatever has not finished by then is
+    returned with `status: "timeout"`; its scrape keeps running and lands in the cache for the next call.
+    """
+    if not request.hotel_urls:
+        raise HTTPException(status_code=400, detail="No hotel URLs given")
+    if len(request.hotel_urls) > BATCH_CONFIG["max_details_items"]:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_CONFIG['max_details_items']} hotels per batch")
+    charge_quota(api_key, len(request.hotel_urls) - 1)
+    
+    deadline = BATCH_CONFIG["details_deadline"]
+    if request.deadline_ms:
+        deadline = min(deadline, request.deadline_ms / 1000)
+    logger.info(f"API batch details for {len(request.hotel_urls)} hotels (deadline {deadline}s)")
+    limit = asyncio.Semaphore(BATCH_CONFIG["details_parallelism"])
+    
+    async def run_item(hotel_url: str) -> BatchDetailsResult:
+        async with limit:
+            # Shielded: once started, a fetch outlives the deadline and still writes the cache
+            fetch = asyncio.ensure_future(fetch_hotel_details_cached(hotel_url))
+            detached_fetches.add(fetch)
+            fetch.add_done_callback(forget_fetch)
+            hotel_data, _, refreshed = await asyncio.shield(fetch)
+        if not hotel_data:
+            return BatchDetailsResult(hotel_url=hotel_url, status="not_found")
+        return BatchDetailsResult(
+            hotel_url=hotel_url,
+            status="ok",
+            cache="MISS" if "info" in refreshed else ("PARTIAL" if refreshed else "HIT"),
+            details=HotelDetails(**hotel_data),
+        )
+    
+    tasks = [asyncio.ensure_future(run_item(url)) for url in request.hotel_urls]
+    await asyncio.wait(tasks, timeout=deadline)
+    
+    results = []
+    for hotel_url, task in zip(request.hotel_urls, tasks):
+        if not task.done():
+            task.cancel()
+            results.append(BatchDetailsResult(hotel_url=hotel_url, status="timeout"))
+        elif task.exception():
+            logger.error(f"Batch details for {hotel_url} failed: {task.exception()}")
+            results.append(BatchDetailsResult(hotel_url=hotel_url, status="error", error=str(task.exception())))
+        else:
+            results.append(task.result())
+    return results
+
+# --- 7. METRICS ---
+metrics_runtime.caches.update({"search": search_cache, "details": details_cache.store})
+metrics_runtime.sessions = session_pool
+metrics_runtime.scheduler = scrape_scheduler
+metrics_runtime.flights.append(scrape_flights)
+metrics_runtime.warmup = warmup
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    if not METRICS_CONFIG["enabled"]:
+        raise HTTPException(status_code=404, detail="Not Found")
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+# --- 8. ADMIN: CACHE ---
+@app.get("/admin/cache")
+async def cache_stats(api_key: str = Depends(get_admin_key)):
+    """Cache size and hit/miss counters"""
+    from hotel_store import hotel_store
+
+    search_stats, details_stats, index_stats = await asyncio.gather(
+        asyncio.to_thread(search_cache.stats),
+        asyncio.to_thread(details_cache.stats),
+        asyncio.to_thread(hotel_index.stats) if hotel_index else asyncio.sleep(0),
+    )
+    return {
+        "search": search_stats,
+        "details": details_stats,
+        "refresh": refresher.stats(),
+        "assets": asset_cache.stats() if asset_cache else None,
+        "hotel_index": index_stats,
+        "store": hotel_store.stats(),
+        "encoded": encoded_cache.stats(),
+    }
+
+@app.delete("/admin/cache")
+async def purge_cache(
+    city: Optional[str] = None,
+    checkin: Optional[str] = None,
+    checkout: Optional[str] = None,
+    hotel_url: Optional[str] = None,
+    api_key: str = Depends(get_admin_key)
+):
+    """
+    Purge cached results from memory and the shared disk tier.
+    
+    With **city** (and optional dates, defaulting like `/hotels/search`) only that search is purged;
+    with **hotel_url** only that hotel's details; without either the whole cache is cleared.
+    """
+    from hotel_store import hotel_store
+
+    if city:
+        checkin, checkout = resolve_stay_dates(checkin, checkout)
+        key = search_cache_key(city, checkin, checkout)
+        hotel_store.delete(key)
+        encoded_cache.delete_prefix(key)
+        return {"purged": int(await asyncio.to_thread(search_cache.delete, key)), "key": key}
+    if hotel_url:
+        key = canonical_hotel_url(hotel_url)
+        encoded_cache.delete_prefix(f"details:{key}|")
+        return {"purged": await asyncio.to_thread(details_cache.delete, key), "key": key}
+    hotel_store.clear()
+    encoded_cache.delete_prefix("")
+    purged = await asyncio.to_thread(search_cache.clear) + await asyncio.to_thread(details_cache.clear)
+    return {"purged": purged}
+
+# --- 9. ADMIN: WORKERS ---
+@app.get("/admin/workers")
+async def worker_stats(api_key: str = Depends(get_admin_key)):
+    """Job queue counts and worker heartbeats (when the worker fleet is enabled)"""
+    if not job_client:
+        return {"enabled": False}
+    return {"enabled": True, **await asyncio.to_thread(job_client.stats)}
+
+# --- 9b. ADMIN: RATE LIMITS ---
+@app.get("/admin/limits")
+async def limit_stats(api_key: str = Depends(get_admin_key)):
+    """Quota left per key and the scrape scheduler's running/queued counts"""
+    return {"rate_limits": rate_limiter.stats(), "scheduler": scrape_scheduler.stats()}
+
+# --- 10. ADMIN: WAF SESSIONS ---
+@app.get("/admin/sessions")
+async def session_stats(api_key: str = Depends(get_admin_key)):
+    """Pooled WAF-cleared browser sessions with their success/failure counters"""
+    return session_pool.stats()
+
+@app.delete("/admin/sessions")
+async def clear_sessions(api_key: str = Depends(get_admin_key)):
+    """Retire every pooled session (contexts opened afterwards start without cookies)"""
+    count = len(session_pool.stats()["sessions"])
+    session_pool.clear()
+    return {"retired": count}
 
 # Trigger reload
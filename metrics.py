@@ -0,0 +1,130 @@
+"""
+Prometheus metrics
+Scraper stage durations arrive through timings.stage hooks; cache, pool and in-flight
+numbers are read from the live objects' stats() at scrape time by StatsCollector.
+"""
+
+from typing import Callable, Dict, List
+import logging
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from timings import add_hook
+
+logger = logging.getLogger(__name__)
+
+# Scraper steps run from milliseconds (evaluate) to tens of seconds (WAF, full details)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60)
+
+STAGE_SECONDS = Histogram(
+    "scraper_stage_seconds", "Time spent in each scraper stage", ["stage"], buckets=STAGE_BUCKETS
+)
+SCRAPE_ATTEMPTS = Counter(
+    "scraper_attempts_total", "Scrape attempts by kind and outcome (ok, empty, error)", ["kind", "outcome"]
+)
+ROUTE_DECISIONS = Counter(
+    "scraper_route_requests_total", "Browser requests allowed or blocked by the routing rules", ["action", "resource_type"]
+)
+ASSET_CACHE = Counter(
+    "scraper_asset_cache_total", "Static asset requests served from disk (hit) or the network (miss)", ["result"]
+)
+WAF_CHALLENGES = Counter(
+    "scraper_waf_challenges_total", "AWS WAF challenges met by pooled pages", ["outcome"]
+)
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_decisions_total", "API requests allowed or rejected by the per-key quotas", ["tier", "decision"]
+)
+SCHEDULER_DECISIONS = Counter(
+    "scrape_scheduler_decisions_total", "Scrapes admitted at once, queued or rejected by the scheduler", ["tier", "decision"]
+)
+SCHEDULER_WAIT_SECONDS = Histogram(
+    "scrape_scheduler_wait_seconds", "Time scrapes waited for a scheduler slot", ["tier"], buckets=STAGE_BUCKETS
+)
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "API requests by route and status", ["method", "route", "status"]
+)
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds", "API request latency by route", ["method", "route"], buckets=STAGE_BUCKETS
+)
+
+add_hook(lambda name, seconds: STAGE_SECONDS.labels(name).observe(seconds))
+
+
+class StatsCollector:
+    """Exports stats() of caches, SingleFlight groups and the browser pool as metrics"""
+
+    def __init__(self):
+        self.caches: Dict[str, object] = {}
+        self.flights: List[object] = []
+        self.pool_getter: Callable = None
+        self.sessions = None
+        self.scheduler = None
+        self.warmup = None
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache", "kind"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "Entries held in memory", labels=["cache"])
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Fresh plus stale hits over lookups", labels=["cache"])
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            hits.add_metric([name, "fresh"], stats["hits"])
+            hits.add_metric([name, "stale"], stats["stale_hits"])
+            hits.add_metric([name, "disk"], stats["disk_hits"])
+            misses.add_metric([name], stats["misses"])
+            entries.add_metric([name], stats["size"])
+            ratio.add_metric([name], stats["hit_ratio"])
+        yield from (hits, misses, entries, ratio)
+
+        in_flight = GaugeMetricFamily("scrapes_in_flight", "Distinct scrapes currently running", labels=["kind"])
+        coalesced = CounterMetricFamily("scrapes_coalesced", "Requests that joined a running scrape", labels=["kind"])
+        for flight in self.flights:
+            stats = flight.stats()
+            in_flight.add_metric([flight.name], stats["in_flight"])
+            coalesced.add_metric([flight.name], stats["coalesced"])
+        yield from (in_flight, coalesced)
+
+        if self.pool_getter is not None:
+            stats = self.pool_getter().stats()
+            slots = GaugeMetricFamily("browser_pool_slots", "Browser pool slots by state", labels=["state"])
+            idle = stats["idle"] if stats["started"] else 0
+            slots.add_metric(["idle"], idle)
+            slots.add_metric(["leased"], stats["size"] - idle if stats["started"] else 0)
+            yield slots
+            yield GaugeMetricFamily("browser_connected", "1 while the pooled Chromium is connected",
+                                    value=int(stats["browser_connected"]))
+
+        if self.sessions is not None:
+            stats = self.sessions.stats()
+            yield GaugeMetricFamily("waf_sessions_active", "WAF-cleared sessions available for reuse",
+                                    value=stats["active"])
+            yield CounterMetricFamily("waf_sessions_captured", "Sessions captured after a solved challenge",
+                                      value=stats["captured"])
+            yield CounterMetricFamily("waf_sessions_retired", "Sessions retired after failing or expiring early",
+                                      value=stats["retired"])
+
+        if self.scheduler is not None:
+            stats = self.scheduler.stats()
+            waiting = GaugeMetricFamily("scrape_queue_depth", "Scrapes waiting for a scheduler slot", labels=["tier"])
+            for tier, count in stats["waiting"].items():
+                waiting.add_metric([tier], count)
+            yield waiting
+            yield GaugeMetricFamily("scrapes_running", "Scrapes holding a scheduler slot", value=stats["running"])
+
+        if self.warmup is not None:
+            stats = self.warmup.stats()
+            phases = GaugeMetricFamily("startup_phase_seconds", "Time each startup phase took", labels=["phase"])
+            for phase, seconds in stats["phases"].items():
+                phases.add_metric([phase], seconds)
+            yield phases
+            yield GaugeMetricFamily("app_ready", "1 once the startup pre-warm has finished", value=int(stats["ready"]))
+
+
+runtime = StatsCollector()
+REGISTRY.register(runtime)
+
+
+def render_latest():
+    """(body, content_type) for a /metrics response"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
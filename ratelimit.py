@@ -0,0 +1,242 @@
+"""
+Per-key quotas and scrape admission
+Every API key draws from two token buckets (per minute and per day, scaled by its tier);
+an empty bucket is a 429 with Retry-After. Browser scrapes then pass a priority scheduler
+sized to the browser capacity: premium keys are served first, background refreshes last,
+and a full queue (overall or for one key) rejects at once instead of piling up waiters.
+"""
+
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+
+from config import (API_KEY_TIERS, BROWSER_POOL_CONFIG, RATE_LIMIT_CONFIG, SCHEDULER_CONFIG,
+                    TIER_CONFIG, WORKER_CONFIG)
+from metrics import RATE_LIMIT_DECISIONS, SCHEDULER_DECISIONS, SCHEDULER_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Client:
+    key: str
+    tier: str
+
+    @property
+    def priority(self) -> int:
+        return TIER_CONFIG[self.tier]["priority"]
+
+
+BACKGROUND = Client(key="background", tier="background")
+
+# Who the current request (or background task) is scraping for
+current_client: ContextVar[Client] = ContextVar("current_client", default=BACKGROUND)
+
+
+def client_for(api_key: str) -> Client:
+    return Client(key=api_key, tier=API_KEY_TIERS.get(api_key, "standard"))
+
+
+@contextmanager
+def background():
+    """Run the block's scrapes at background priority (e.g. refreshes started from a request)"""
+    token = current_client.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        current_client.reset(token)
+
+
+class Overloaded(Exception):
+    """The scrape queue is full; retry_after is a rough estimate in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, per_second: float):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    def wait_time(self, count: float = 1) -> float:
+        """Seconds until `count` tokens are available (0 if they are now)"""
+        self._refill()
+        count = min(count, self.capacity)
+        return 0.0 if self.tokens >= count else (count - self.tokens) / self.per_second
+
+    def take(self, count: float = 1):
+        self.tokens -= min(count, self.capacity)
+
+
+class RateLimiter:
+    """A per-minute and a per-day bucket for each key; a request takes `cost` tokens from both"""
+
+    def __init__(self):
+        self.enabled = RATE_LIMIT_CONFIG["enabled"]
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+
+    def _buckets_for(self, client: Client) -> Tuple[TokenBucket, TokenBucket]:
+        buckets = self._buckets.get(client.key)
+        if buckets is None:
+            scale = TIER_CONFIG[client.tier]["quota_multiplier"]
+            per_minute = RATE_LIMIT_CONFIG["per_minute"] * scale
+            per_day = RATE_LIMIT_CONFIG["per_day"] * scale
+            buckets = (TokenBucket(per_minute, per_minute / 60), TokenBucket(per_day, per_day / 86400))
+            self._buckets[client.key] = buckets
+        return buckets
+
+    def check(self, client: Client, cost: int = 1) -> Optional[Tuple[str, int]]:
+        """None if the request may proceed, else (exhausted quota, Retry-After seconds)"""
+        if not self.enabled:
+            return None
+        minute, day = self._buckets_for(client)
+        for name, bucket in (("day", day), ("minute", minute)):
+            wait = bucket.wait_time(cost)
+            if wait > 0:
+                RATE_LIMIT_DECISIONS.labels(client.tier, f"limited_{name}").inc()
+                return name, max(1, math.ceil(wait))
+        minute.take(cost)
+        day.take(cost)
+        RATE_LIMIT_DECISIONS.labels(client.tier, "allowed").inc()
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "per_minute": RATE_LIMIT_CONFIG["per_minute"],
+            "per_day": RATE_LIMIT_CONFIG["per_day"],
+            "keys": {
+                # Keys are secrets: show only a prefix
+                f"{key[:6]}…": {"minute_left": int(minute.tokens), "day_left": int(day.tokens)}
+                for key, (minute, day) in self._buckets.items()
+            },
+        }
+
+
+class ScrapeScheduler:
+    """At most `concurrency` scrapes at once; waiters are served by tier priority, then arrival"""
+
+    def __init__(self, concurrency: Optional[int] = None):
+        if concurrency is None:
+            concurrency = SCHEDULER_CONFIG["concurrency"] or (
+                WORKER_CONFIG["workers"] * WORKER_CONFIG["concurrency"]
+                if WORKER_CONFIG["enabled"] else BROWSER_POOL_CONFIG["size"]
+            )
+        self.concurrency = concurrency
+        self.max_waiting = SCHEDULER_CONFIG["max_waiting"]
+        self.max_waiting_per_key = SCHEDULER_CONFIG["max_waiting_per_key"]
+        self.running = 0
+        self._waiting: List[tuple] = []  # heap of (priority, seq, future, client)
+        self._waiting_by_key: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._avg_run = SCHEDULER_CONFIG["initial_run_estimate"]
+        self.rejected = 0
+
+    def _retry_after(self) -> int:
+        # Time for the queue ahead to drain at the current average scrape duration
+        return max(1, math.ceil((len(self._waiting) / self.concurrency + 1) * self._avg_run))
+
+    def _admit(self, client: Client):
+        if len(self._waiting) >= self.max_waiting:
+            reason = f"scrape queue full ({len(self._waiting)} waiting)"
+        elif client is not BACKGROUND and self._waiting_by_key.get(client.key, 0) >= self.max_waiting_per_key:
+            reason = f"too many queued scrapes for this key ({self.max_waiting_per_key})"
+        else:
+            return
+        self.rejected += 1
+        SCHEDULER_DECISIONS.labels(client.tier, "rejected").inc()
+        raise Overloaded(reason, self._retry_after())
+
+    def _wake_next(self):
+        while self._waiting and self.running < self.concurrency:
+            _, _, future, _ = heapq.heappop(self._waiting)
+            self.running += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one scrape slot for the current client; raises Overloaded when the queue is full"""
+        client = current_client.get()
+        started = time.monotonic()
+        if self.running < self.concurrency and not self._waiting:
+            self.running += 1
+            SCHEDULER_DECISIONS.labels(client.tier, "admitted").inc()
+        else:
+            self._admit(client)
+            SCHEDULER_DECISIONS.labels(client.tier, "queued").inc()
+            future = asyncio.get_running_loop().create_future()
+            entry = (client.priority, next(self._seq), future, client)
+            heapq.heappush(self._waiting, entry)
+            self._waiting_by_key[client.key] = self._waiting_by_key.get(client.key, 0) + 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Woken and cancelled at once: hand the slot on
+                    self.running -= 1
+                    self._wake_next()
+                else:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                raise
+            finally:
+                self._waiting_by_key[client.key] -= 1
+                if not self._waiting_by_key[client.key]:
+                    del self._waiting_by_key[client.key]
+        SCHEDULER_WAIT_SECONDS.labels(client.tier).observe(time.monotonic() - started)
+
+        began = time.monotonic()
+        try:
+            yield
+        finally:
+            self._avg_run = 0.8 * self._avg_run + 0.2 * (time.monotonic() - began)
+            self.running -= 1
+            self._wake_next()
+
+    @asynccontextmanager
+    async def extra_slots(self, wanted: int):
+        """Take up to `wanted` more slots that are free right now (never queues); yields how many"""
+        taken = 0
+        if not self._waiting:
+            taken = max(0, min(wanted, self.concurrency - self.running))
+        self.running += taken
+        try:
+            yield taken
+        finally:
+            self.running -= taken
+            self._wake_next()
+
+    def waiting_by_tier(self) -> Dict[str, int]:
+        counts = dict.fromkeys(TIER_CONFIG, 0)
+        for _, _, _, client in self._waiting:
+            counts[client.tier] += 1
+        return counts
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "running": self.running,
+            "waiting": self.waiting_by_tier(),
+            "rejected": self.rejected,
+            "avg_scrape_seconds": round(self._avg_run, 2),
+        }
+
+
+rate_limiter = RateLimiter()
+scrape_scheduler = ScrapeScheduler()
@@ -0,0 +1,133 @@
+"""
+Background refresh of cached searches
+Tracks how often each search key is requested and re-scrapes the hottest keys
+before they expire, plus on-demand refreshes for stale entries being served.
+"""
+
+from datetime import date
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+
+from cache import TTLCache
+from config import REFRESH_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# (city, checkin, checkout) -> awaitable that scrapes and stores the result
+RefreshFn = Callable[[str, str, str], Awaitable]
+
+
+class HotKeyRefresher:
+    """Keeps frequently requested searches warm within a concurrent-scrape budget"""
+
+    def __init__(self, cache: TTLCache, refresh_fn: RefreshFn):
+        self.cache = cache
+        self.refresh_fn = refresh_fn
+        self.enabled = REFRESH_CONFIG["enabled"]
+        self.interval = REFRESH_CONFIG["interval"]
+        self.top_n = REFRESH_CONFIG["top_n"]
+        self.refresh_ahead = REFRESH_CONFIG["refresh_ahead"]
+        self.decay = REFRESH_CONFIG["decay"]
+        self.max_tracked = REFRESH_CONFIG["max_tracked"]
+
+        self.counts: Dict[str, float] = {}
+        self.params: Dict[str, Tuple[str, str, str]] = {}
+        self._refreshing: Set[str] = set()
+        self._budget: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+        self.refreshes = 0
+        self.failures = 0
+
+    def record(self, key: str, city: str, checkin: str, checkout: str):
+        """Count one request for a search key"""
+        self.counts[key] = self.counts.get(key, 0.0) + 1
+        self.params[key] = (city, checkin, checkout)
+        if len(self.counts) > self.max_tracked:
+            coldest = min(self.counts, key=self.counts.get)
+            self.counts.pop(coldest, None)
+            self.params.pop(coldest, None)
+
+    def refresh_soon(self, key: str) -> bool:
+        """Schedule a background refresh unless one is already running for the key"""
+        if key in self._refreshing or key not in self.params:
+            return False
+        self._refreshing.add(key)
+        task = asyncio.get_running_loop().create_task(self._refresh(key, *self.params[key]))
+        # Hold a reference so the task is not garbage collected mid-flight
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return True
+
+    async def _refresh(self, key: str, city: str, checkin: str, checkout: str):
+        if self._budget is None:
+            self._budget = asyncio.Semaphore(REFRESH_CONFIG["max_concurrent"])
+        try:
+            async with self._budget:
+                logger.info(f"🔄 Background refresh for {key}")
+                await self.refresh_fn(city, checkin, checkout)
+                self.refreshes += 1
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Background refresh failed for {key}: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    def hottest(self) -> List[Tuple[str, str]]:
+        """(key, checkin) of the most requested keys"""
+        keys = sorted(self.counts, key=self.counts.get, reverse=True)[:self.top_n]
+        return [(key, self.params[key][1]) for key in keys]
+
+    def due_keys(self, hottest: Optional[List[Tuple[str, str]]] = None) -> list:
+        """Hottest keys whose cached entry is missing or near expiry (may read the disk tier)"""
+        today = date.today().isoformat()
+        due = []
+        for key, checkin in self.hottest() if hottest is None else hottest:
+            if checkin < today:
+                continue
+            age = self.cache.age(key)
+            if age is None or age >= self.cache.ttl * self.refresh_ahead:
+                due.append(key)
+        return due
+
+    def _decay(self):
+        for key in list(self.counts):
+            self.counts[key] *= self.decay
+            if self.counts[key] < 0.01:
+                del self.counts[key]
+                self.params.pop(key, None)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # Ages may come from the disk tier: read them off the event loop
+                for key in await asyncio.to_thread(self.due_keys, self.hottest()):
+                    self.refresh_soon(key)
+                self._decay()
+            except Exception as e:
+                logger.error(f"Refresh scheduler pass failed: {e}")
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "tracked_keys": len(self.counts),
+            "refreshing": len(self._refreshing),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "hottest": sorted(self.counts, key=self.counts.get, reverse=True)[:self.top_n],
+        }
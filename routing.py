@@ -0,0 +1,262 @@
+"""
+Request routing for pooled browser contexts
+Block rules are compiled into one regex and registered per context, so only requests
+that need a decision reach Python; first-party requests go straight to the network.
+Third-party requests that no rule blocks are checked once more by resource type.
+Static bstatic.com JS/CSS is kept in a content-addressed disk cache shared by every
+context (and every worker on the host) and fulfilled from disk.
+"""
+
+from typing import Dict, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from config import ROUTING_CONFIG
+from metrics import ASSET_CACHE, ROUTE_DECISIONS
+
+logger = logging.getLogger(__name__)
+
+# Response headers worth replaying for a cached asset
+ASSET_HEADERS = ("content-type", "access-control-allow-origin", "timing-allow-origin", "cache-control")
+
+
+HOST = r"^[a-z][a-z0-9+.-]*://"
+
+
+def _domains(domains) -> str:
+    return "|".join(re.escape(domain) for domain in domains)
+
+
+def _outside(domains) -> str:
+    """Matches a URL prefix whose host is not one of `domains` (or their subdomains)"""
+    return rf"{HOST}(?![^/?#]*({_domains(domains)})(:\d+)?([/?#]|$))"
+
+
+def compile_block_rule(config: Dict = ROUTING_CONFIG) -> "re.Pattern":
+    """One pattern for every blocked URL: tracker hosts, heavy file types, third-party scripts"""
+    rules = [
+        # Tracker domains and their subdomains
+        rf"{HOST}([^/?#]*\.)?({_domains(config['blocked_domains'])})(:\d+)?([/?#]|$)",
+        # Images, fonts and media by extension
+        rf"\.({'|'.join(config['blocked_extensions'])})([?#]|$)",
+        # Scripts from any host outside the allowed domains
+        rf"{_outside(config['allowed_script_domains'])}[^/?#]+/[^?#]*\.js([?#]|$)",
+    ]
+    return re.compile("|".join(f"(?:{rule})" for rule in rules), re.IGNORECASE)
+
+
+def compile_third_party_rule(config: Dict = ROUTING_CONFIG) -> "re.Pattern":
+    """Every URL on a host outside the allowed script domains (scripts there may not end in .js)"""
+    return re.compile(_outside(config["allowed_script_domains"]), re.IGNORECASE)
+
+
+# Versioned static assets served by Booking's CDN
+ASSET_RULE = re.compile(r"^https://[^/?#]*bstatic\.com/[^?#]*\.(js|css)([?#]|$)", re.IGNORECASE)
+
+BLOCK_RULE = compile_block_rule()
+THIRD_PARTY_RULE = compile_third_party_rule()
+
+
+class AssetCache:
+    """Content-addressed asset store: blobs named by SHA-256, an SQLite index from URL to digest"""
+
+    PURGE_EVERY = 50  # writes between purges
+    ORPHAN_GRACE = 60  # seconds an unindexed blob is kept (its index row may not be written yet)
+
+    def __init__(self, directory: str, max_bytes: int, max_age: float, max_total_bytes: Optional[int] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_total_bytes = max_total_bytes
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS assets ("
+                "url TEXT PRIMARY KEY, digest TEXT NOT NULL, headers TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.directory, "index.db"), timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "blobs", digest[:2], digest)
+
+    def get(self, url: str):
+        """(headers, body) for a cached URL, or None"""
+        row = self._connect().execute(
+            "SELECT digest, headers, stored_at FROM assets WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None or time.time() - row[2] > self.max_age:
+            return None
+        try:
+            with open(self._blob_path(row[0]), "rb") as f:
+                return json.loads(row[1]), f.read()
+        except OSError:
+            return None
+
+    def put(self, url: str, headers: Dict[str, str], body: bytes) -> bool:
+        if len(body) > self.max_bytes:
+            return False
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            # Identical bodies under different URLs share one blob; touch it so the orphan sweep leaves it
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        kept = {name: value for name, value in headers.items() if name.lower() in ASSET_HEADERS}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO assets (url, digest, headers, stored_at) VALUES (?, ?, ?, ?)",
+                (url, digest, json.dumps(kept), time.time()),
+            )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge()
+        return True
+
+    def _blob_size(self, digest: str) -> int:
+        try:
+            return os.path.getsize(self._blob_path(digest))
+        except OSError:
+            return 0
+
+    def purge(self) -> Dict[str, int]:
+        """Drop expired entries, then the oldest ones over max_total_bytes, then blobs nothing points to"""
+        with self._connect() as conn:
+            expired = conn.execute(
+                "DELETE FROM assets WHERE stored_at < ?", (time.time() - self.max_age,)
+            ).rowcount
+
+        evicted = 0
+        if self.max_total_bytes is not None:
+            total = 0
+            counted = set()
+            over = []
+            rows = self._connect().execute("SELECT url, digest FROM assets ORDER BY stored_at DESC").fetchall()
+            for url, digest in rows:
+                if digest in counted:
+                    continue  # A shared blob is only stored (and counted) once
+                size = self._blob_size(digest)
+                if total + size > self.max_total_bytes:
+                    over.append(url)
+                    continue
+                counted.add(digest)
+                total += size
+            if over:
+                with self._connect() as conn:
+                    evicted = conn.executemany("DELETE FROM assets WHERE url = ?", [(url,) for url in over]).rowcount
+
+        referenced = {row[0] for row in self._connect().execute("SELECT DISTINCT digest FROM assets")}
+        cutoff = time.time() - self.ORPHAN_GRACE
+        orphans = 0
+        for root, _, files in os.walk(os.path.join(self.directory, "blobs")):
+            for name in files:
+                if name in referenced:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        orphans += 1
+                except OSError:
+                    pass  # Already removed by another worker
+        if expired or evicted or orphans:
+            logger.info(f"🧹 Asset cache purge: {expired} expired, {evicted} over size, {orphans} orphan blobs")
+        return {"expired": expired, "evicted": evicted, "orphans": orphans}
+
+    def stats(self) -> dict:
+        count = self._connect().execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+        return {"entries": count, "directory": self.directory, "max_total_bytes": self.max_total_bytes}
+
+
+def _asset_cache() -> Optional[AssetCache]:
+    if not ROUTING_CONFIG["asset_cache"]:
+        return None
+    try:
+        return AssetCache(
+            ROUTING_CONFIG["asset_cache_dir"],
+            ROUTING_CONFIG["asset_max_bytes"],
+            ROUTING_CONFIG["asset_max_age"],
+            ROUTING_CONFIG["asset_cache_max_bytes"],
+        )
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"Asset cache unavailable at {ROUTING_CONFIG['asset_cache_dir']}: {e}")
+        return None
+
+
+asset_cache = _asset_cache()
+
+
+async def block_request(route):
+    ROUTE_DECISIONS.labels("block", route.request.resource_type).inc()
+    await route.abort()
+
+
+async def block_third_party_script(route):
+    # Script URLs without a .js suffix (loaders, tag managers) are caught by resource type
+    if route.request.resource_type == "script":
+        return await block_request(route)
+    await route.fallback()
+
+
+async def serve_asset(route):
+    url = route.request.url
+    try:
+        cached = await asyncio.to_thread(asset_cache.get, url)
+    except sqlite3.Error as e:
+        logger.debug(f"Asset cache read failed for {url}: {e}")
+        cached = None
+    if cached is not None:
+        ASSET_CACHE.labels("hit").inc()
+        headers, body = cached
+        return await route.fulfill(status=200, headers=headers, body=body)
+
+    ASSET_CACHE.labels("miss").inc()
+    try:
+        response = await route.fetch()
+        body = await response.body()
+    except Exception as e:
+        # Let the browser load it itself (or fail it) rather than leave the request hanging
+        logger.debug(f"Asset fetch failed for {url}: {e}")
+        return await route.fallback()
+    if response.status == 200:
+        try:
+            await asyncio.to_thread(asset_cache.put, url, response.headers, body)
+        except (OSError, sqlite3.Error) as e:
+            logger.debug(f"Asset cache write failed for {url}: {e}")
+    await route.fulfill(response=response, body=body)
+
+
+def _count_allowed(request):
+    ROUTE_DECISIONS.labels("allow", request.resource_type).inc()
+
+
+async def install_routes(context):
+    """Register the routing rules on a browser context (applies to all its pages)"""
+    # Playwright tries the most recently registered route first: this catch-all goes first
+    await context.route(THIRD_PARTY_RULE, block_third_party_script)
+    if asset_cache is not None:
+        await context.route(ASSET_RULE, serve_asset)
+    await context.route(BLOCK_RULE, block_request)
+    # Allowed requests never reach a Python route handler; count them from the event instead
+    context.on("requestfinished", _count_allowed)
@@ -0,0 +1,195 @@
+"""
+Basic browserless scraper for Booking.com
+Fetches search and hotel pages over a pooled keep-alive HTTP session and parses them
+with lxml (hotel details from the page's application/ld+json block). Callers fall back
+to the Playwright scraper when this raises WafChallenge or finds nothing to parse.
+"""
+
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional
+import json
+import logging
+import re
+import requests
+
+from booking_common import DETAIL_SECTIONS, build_search_url, normalize_hotel_details
+from booking_payloads import stable_hotel_id
+from config import BOOKING_CONFIG, HTTP_SCRAPER_CONFIG, SCRAPER_CONFIG
+from timings import stage
+
+logger = logging.getLogger(__name__)
+
+# Markers of the AWS WAF interstitial Booking serves to clients it does not trust yet
+WAF_MARKERS = ("challenge-container", "awsWafCookieDomainList", "AwsWafIntegration")
+
+
+class WafChallenge(Exception):
+    """Booking answered with a WAF challenge page; only a real browser can pass it"""
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_SCRAPER_CONFIG["pool_size"],
+        pool_maxsize=HTTP_SCRAPER_CONFIG["pool_size"],
+        max_retries=HTTP_SCRAPER_CONFIG["retries"],
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": SCRAPER_CONFIG["user_agents"][0],
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+    })
+    return session
+
+
+# Shared keep-alive session (requests' connection pool is thread-safe)
+_session = _build_session()
+
+
+def fetch_page(url: str) -> str:
+    with stage("fetch"):
+        response = _session.get(url, timeout=HTTP_SCRAPER_CONFIG["timeout"])
+        body = response.text
+    if response.headers.get("x-amzn-waf-action") or any(marker in body for marker in WAF_MARKERS):
+        raise WafChallenge(f"WAF challenge for {url}")
+    response.raise_for_status()
+    return body
+
+
+def _text(node) -> str:
+    return " ".join(node.text_content().split()) if node is not None else ""
+
+
+def _first(node, xpath: str):
+    found = node.xpath(xpath)
+    return found[0] if found else None
+
+
+def parse_search_page(page_html: str, max_results: Optional[int] = None) -> List[Dict]:
+    """Hotels from the server-rendered property cards, in the card script's shape"""
+    max_results = max_results or BOOKING_CONFIG["max_results"]
+    tree = lxml_html.fromstring(page_html)
+    hotels = []
+    for card in tree.xpath('//*[@data-testid="property-card"]'):
+        if len(hotels) >= max_results:
+            break
+        name = _text(_first(card, './/*[@data-testid="title"]'))
+        if not name:
+            continue
+
+        href = _first(card, './/a[@data-testid="title-link"]/@href')
+        url = str(href).split("?")[0] if href else None
+
+        price = 0.0
+        match = re.search(r"[\d,]+", _text(_first(card, './/*[@data-testid="price-and-discounted-price"]')))
+        if match:
+            price = float(match.group(0).replace(",", ""))
+
+        rating = 0.0
+        match = re.search(r"([\d.]+)", _text(_first(card, './/*[@data-testid="review-score"]')))
+        if match:
+            try:
+                value = float(match.group(1))
+                rating = value / 2 if value > 5 else value
+            except ValueError:
+                pass
+
+        hotels.append({
+            "hotel_id": stable_hotel_id(url, name),
+            "name": name,
+            "price": price,
+            "currency": "INR",
+            "rating": round(rating, 1),
+            "url": url,
+        })
+    return hotels
+
+
+def _ld_json(tree) -> Dict:
+    for script in tree.xpath('//script[@type="application/ld+json"]'):
+        try:
+            data = json.loads(script.text or "")
+        except ValueError:
+            continue
+        for item in data if isinstance(data, list) else [data]:
+            if isinstance(item, dict) and item.get("name"):
+                return item
+    return {}
+
+
+def parse_hotel_page(page_html: str, hotel_url: Optional[str] = None) -> Optional[Dict]:
+    """Hotel details from the JSON-LD block plus the statically rendered lists"""
+    tree = lxml_html.fromstring(page_html)
+    ld = _ld_json(tree)
+    name = ld.get("name") or _text(_first(tree, '//*[@data-testid="property-name"]'))
+    if not name:
+        return None
+
+    address = ld.get("address") or {}
+    hotel_data = {
+        "name": name.strip(),
+        "rating": float((ld.get("aggregateRating") or {}).get("ratingValue") or 0),
+        "address": address.get("streetAddress", "") if isinstance(address, dict) else str(address),
+        "description": ld.get("description", ""),
+        "amenities": [],
+        "reviews": [],
+        "photos": [],
+        "room_types": [],
+    }
+
+    seen = set()
+    for node in tree.xpath('//*[contains(@class, "important_facility")] | '
+                           '//*[@data-testid="property-most-popular-facilities-wrapper"]//span'):
+        text = _text(node)
+        if text and text not in seen:
+            seen.add(text)
+            hotel_data["amenities"].append({"category": "Popular", "name": text})
+
+    for node in tree.xpath('//*[@data-testid="featuredreview"]'):
+        comment = _text(_first(node, './/*[@data-testid="featuredreview-text"]'))
+        if comment and len(hotel_data["reviews"]) < 5:
+            author = _text(_first(node, './/*[@data-testid="featuredreview-avatar"]')).split(" ")[0] or "Guest"
+            hotel_data["reviews"].append({"reviewer_name": author, "comment": comment, "rating": hotel_data["rating"]})
+
+    room_names = set()
+    for node in tree.xpath('//*[contains(@class, "hprt-roomtype-link")] | //*[@data-testid="room-title"]'):
+        room = _text(node)
+        if room and len(room) > 3 and room not in room_names and len(room_names) < 10:
+            room_names.add(room)
+            hotel_data["room_types"].append({"name": room, "price": 0.0, "currency": "INR"})
+
+    return normalize_hotel_details(hotel_data, hotel_url)
+
+
+def fetch_hotels(city: str, checkin: Optional[str] = None, checkout: Optional[str] = None) -> List[Dict]:
+    """
+    Search hotels without a browser. Raises WafChallenge when Booking demands one;
+    returns [] when the page has no parseable cards.
+    """
+    url = build_search_url(city, checkin, checkout)
+    page_html = fetch_page(url)
+    with stage("parse"):
+        hotels = parse_search_page(page_html)
+    logger.info(f"⚡ HTTP search parsed {len(hotels)} hotels for {city}")
+    return hotels
+
+
+def fetch_hotel_details_http(hotel_url: str, sections: Optional[List[str]] = None) -> Optional[Dict]:
+    """
+    Hotel details without a browser. Returns None unless every requested section
+    was found in the static HTML (reviews and rooms are often rendered client-side).
+    """
+    page_html = fetch_page(hotel_url)
+    with stage("parse"):
+        hotel_data = parse_hotel_page(page_html, hotel_url)
+    if not hotel_data:
+        return None
+    for section in sections or DETAIL_SECTIONS:
+        if section != "info" and not any(hotel_data.get(field) for field in DETAIL_SECTIONS[section]):
+            logger.info(f"HTTP details for {hotel_url} missing '{section}', needs a browser")
+            return None
+    logger.info(f"⚡ HTTP details parsed for {hotel_data['name']}")
+    return hotel_data
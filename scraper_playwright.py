@@ -1,21 +1,240 @@
 """
 Advanced web scraper using Playwright to bypass anti-bot protection
-This scraper uses a stable launch-per-request model for FastAPI compatibility.
+Scrapes run as coroutines on warm pages leased from a long-lived browser pool
+(see browser_pool.py); the blocking functions are thin wrappers for sync callers.
 """
 
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
-from typing import List, Dict, Optional
+from playwright.async_api import TimeoutError as PlaywrightTimeout
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+import asyncio
 import logging
 import time
-from datetime import datetime, timedelta
 
-from config import BOOKING_CONFIG, SCRAPER_CONFIG
+from booking_common import DETAIL_SECTIONS, EXTRACT_RESERVE, build_search_url, canonical_hotel_url, normalize_hotel_details
+from booking_payloads import is_search_payload_url, parse_search_payload, search_results, with_hotel_id
+from browser_pool import BrowserPool, get_engine_loop, run_on_engine, run_sync
+from config import BOOKING_CONFIG, CALENDAR_CONFIG, SCRAPER_CONFIG, STREAM_CONFIG
+from metrics import SCRAPE_ATTEMPTS, WAF_CHALLENGES, runtime as metrics_runtime
+from routing import install_routes
+from singleflight import SingleFlight
+from timings import stage
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# --- Extraction scripts (evaluated inside the page) ---
+# Parses one [data-testid="property-card"] element into a hotel dict (null if it has no name)
+CARD_EXTRACT_SCRIPT = '''(card) => {
+    try {
+        const nameElem = card.querySelector('[data-testid="title"]');
+        const name = nameElem ? nameElem.textContent.trim() : null;
+        if (!name) return null;
+        
+        let url = null;
+        const link = card.querySelector('a[data-testid="title-link"]');
+        if (link) url = link.href.split('?')[0];
+        
+        let price = 0;
+        const priceElem = card.querySelector('[data-testid="price-and-discounted-price"]');
+        if (priceElem) {
+            const m = priceElem.textContent.match(/[\\d,]+/);
+            if (m) price = parseFloat(m[0].replace(/,/g, ''));
+        }
+        
+        let rating = 0;
+        const scoreElem = card.querySelector('[data-testid="review-score"]');
+        if (scoreElem) {
+            const m = scoreElem.textContent.match(/([\\d.]+)/);
+            if (m) {
+                const v = parseFloat(m[1]);
+                rating = v > 5 ? v / 2 : v;
+            }
+        }
+        
+        return {
+            name, price, currency: 'INR', 
+            rating: Math.round(rating * 10) / 10, url 
+        };
+    } catch (e) {
+        return null;
+    }
+}'''
+
+# Parses the first `maxResults` cards on a search results page
+SEARCH_EXTRACT_SCRIPT = '''(maxResults) => {
+    const parseCard = __CARD__;
+    const hotels = [];
+    const cards = document.querySelectorAll('[data-testid="property-card"]');
+    cards.forEach((card, index) => {
+        if (index >= maxResults) return;
+        const hotel = parseCard(card);
+        if (hotel) hotels.push(hotel);
+    });
+    return hotels;
+}'''.replace("__CARD__", CARD_EXTRACT_SCRIPT)
+
+DETAILS_EXTRACT_SCRIPT = '''() => {
+    const d = {
+        name: '', rating: 0, address: '', description: '',
+        amenities: [], reviews: [], photos: [], room_types: []
+    };
+    
+    // 1. Basic Info (JSON-LD)
+    try {
+        const ld = JSON.parse(document.querySelector('script[type="application/ld+json"]')?.innerText || '{}');
+        d.name = ld.name || '';
+        d.rating = ld.aggregateRating?.ratingValue || 0;
+        d.address = ld.address?.streetAddress || '';
+        d.description = ld.description || '';
+    } catch(e) {}
+
+    // 2. DOM Fallbacks for basic info
+    if (!d.name) d.name = document.querySelector('[data-testid="property-name"], h2.hp__hotel-name')?.innerText?.trim() || '';
+    if (!d.address) d.address = document.querySelector('.hp_address_subtitle, [data-testid="address_badge"]')?.innerText?.trim() || '';
+    if (!d.description) {
+        const descEl = document.querySelector('#property_description_content, [data-testid="property-description"]');
+        d.description = descEl ? descEl.innerText.trim() : '';
+    }
+
+    // 3. Amenities (Full extraction without limits)
+    const seenAms = new Set();
+    
+    // First, popular facilities
+    document.querySelectorAll('.hp_desc_important_facilities div, [data-testid="property-most-popular-facilities-wrapper"] span, .important_facility').forEach(el => {
+        const text = el.innerText.trim();
+        if (text && !seenAms.has(text)) {
+            seenAms.add(text);
+            d.amenities.push({ category: 'Popular', name: text });
+        }
+    });
+
+    // Next, full facilities list by category
+    document.querySelectorAll('.hotel_facilities_block, .hp-facilities-box, #hp_facilities_box .hotel_facilities_block').forEach(block => {
+        const category = block.querySelector('h3, h4')?.innerText?.trim() || 'General';
+        block.querySelectorAll('li, .hp-facilites-list li').forEach(item => {
+            const text = item.innerText.trim();
+            if (text && !seenAms.has(text)) {
+                seenAms.add(text);
+                d.amenities.push({ category: category, name: text });
+            }
+        });
+    });
+
+    // Catch-all for any other lists in the facilities area
+    document.querySelectorAll('#hp_facilities_box li, [data-testid="property-section-content"] li').forEach(el => {
+        const text = el.innerText.trim();
+        if (text && !seenAms.has(text)) {
+            seenAms.add(text);
+            d.amenities.push({ category: 'General', name: text });
+        }
+    });
+
+    // 4. Reviews extraction (Aligned with HotelReview model)
+    const reviewSelectors = [
+        '[data-testid="review-card"]',
+        '.review_item',
+        '.c-review-block',
+        '[data-testid="featuredreview"]'
+    ];
+    
+    const seenReviews = new Set();
+    for (const sel of reviewSelectors) {
+        document.querySelectorAll(sel).forEach(el => {
+            const text = el.querySelector('[data-testid="review-text"], .review_item_main_content, .c-review__body, [data-testid="featuredreview-text"]')?.innerText?.trim();
+            if (text && !seenReviews.has(text) && seenReviews.size < 5) {
+                seenReviews.add(text);
+                // Enhanced Author Extraction
+                const authorSelectors = [
+                    '.review_item_reviewer h4',
+                    '[data-testid="review-author-name"]',
+                    '.bui-avatar-block__title',
+                    '[data-testid="featuredreview-avatar"]',
+                    '.review-card__header__name'
+                ];
+                let author = 'Guest';
+                for (const aSel of authorSelectors) {
+                    const aEl = el.querySelector(aSel);
+                    if (aEl && aEl.innerText.trim()) {
+                        author = aEl.innerText.trim().split('\\n')[0]; // Take first line (name)
+                        break;
+                    }
+                }
+                
+                // Enhanced Score Extraction
+                let scoreEl = el.querySelector('[data-testid="review-score-badge"], [data-testid="review-scoreBadge"], .bui-review-score__badge, .review-score-badge, .a3b87295b3, .ebf0170a44, .d1921f0084');
+                let score = 0;
+                if (scoreEl) {
+                    let scoreText = scoreEl.innerText || scoreEl.getAttribute('aria-label') || '0';
+                    score = parseFloat(scoreText.match(/[\\d.]+/)?.[0] || '0');
+                } else {
+                    // Fallback to searching any div/span within the card that has a numeric class or content
+                    const scoreCandidates = Array.from(el.querySelectorAll('div, span')).filter(e => /^\\d+(\\.\\d+)?$/.test(e.innerText.trim()));
+                    if (scoreCandidates.length > 0) {
+                        score = parseFloat(scoreCandidates[0].innerText);
+                    }
+                }
+                
+                // Final fallback for snippet reviews (featured) which often don't have individual scores visible
+                if (score === 0 && d.rating > 0) score = d.rating;
+                
+                d.reviews.push({ reviewer_name: author, comment: text, rating: score });
+
+            }
+        });
+        if (d.reviews.length >= 3) break;
+    }
+
+    // 5. Photos extraction (Skipped as requested)
+    d.photos = [];
+
+    // 6. Room Types extraction (Aligned with RoomType model)
+    const roomNames = new Set();
+    const roomSelectors = [
+        '.rt-room-info',
+        '[data-testid="room-title"]',
+        '.hprt-roomtype-link',
+        '[data-room-id] .hprt-roomtype-icon-link',
+        '.hp-rt-room-name',
+        '[data-testid="rt-room-card"] .hprt-roomtype-link',
+        '.hprt-table-cell-roomtype .hprt-roomtype-icon-link',
+        '.room-info a'
+    ];
+    for (const rs of roomSelectors) {
+        document.querySelectorAll(rs).forEach(el => {
+            const name = el.innerText.trim().split('\\n')[0];
+            if (name && name.length > 3 && !roomNames.has(name) && roomNames.size < 10) {
+                roomNames.add(name);
+                d.room_types.push({ name: name, price: 0.0, currency: 'INR' });
+            }
+        });
+    }
+
+    // Secondary fallback for room types from window data if extraction failed
+    if (d.room_types.length === 0) {
+        try {
+            const b_env = window.booking?.env || {};
+            const rooms = b_env.b_room_group || b_env.hprt_room_data || [];
+            rooms.forEach(r => {
+                if (r.name && !roomNames.has(r.name)) {
+                    roomNames.add(r.name);
+                    d.room_types.push({ name: r.name, price: 0.0, currency: 'INR' });
+                }
+            });
+        } catch(e) {}
+    }
+
+    
+    return d;
+}'''
+
+
+# Identical concurrent scrapes share one browser session (engine loop only)
+search_flights = SingleFlight("search")
+details_flights = SingleFlight("details")
+
+
 class PlaywrightBookingScraper:
     """Advanced scraper using Playwright for Booking.com"""
     
@@ -23,407 +242,516 @@ class PlaywrightBookingScraper:
         self.base_url = BOOKING_CONFIG["base_url"]
         self.timeout = SCRAPER_CONFIG["timeout"] * 1000  # Convert to milliseconds
         self.max_retries = SCRAPER_CONFIG["max_retries"]
+        self.extraction_mode = SCRAPER_CONFIG["extraction_mode"]
 
     @staticmethod
-    def setup_route(page):
-        """Aggressive resource and script blocking (relaxed for reliability)"""
-        def handle_route(route):
-            url = route.request.url
-            resource_type = route.request.resource_type
-            
-            # Block heavy/tracking resources
-            if resource_type in ["font", "media"]:
-                return route.abort()
-            
-            # Block third-party trackers aggressively
-            blocked_domains = ["google-analytics.com", "doubleclick.net", "facebook.net", "adgoogles.com"]
-            if any(domain in url for domain in blocked_domains):
-                return route.abort()
-                
-            if resource_type == "image":
-                return route.abort()
-            
-            # Allow all booking-related scripts and AJAX calls
-            if "booking.com" in url or "bstatic.com" in url:
-                return route.continue_()
-            
-            # Block other third-party scripts
-            if resource_type == "script":
-                return route.abort()
-            
-            return route.continue_()
-            
-        page.route("**/*", handle_route)
+    async def setup_route(page):
+        """Compiled block rules and the shared static-asset cache for the page's context (see routing.py)"""
+        await install_routes(page.context)
 
         
     def _build_search_url(self, city: str, checkin: Optional[str] = None, checkout: Optional[str] = None) -> str:
         """Build Booking.com search URL"""
-        if not checkin:
-            checkin_date = datetime.now() + timedelta(days=BOOKING_CONFIG["default_checkin_offset"])
-            checkin = checkin_date.strftime("%Y-%m-%d")
-        
-        if not checkout:
-            checkout_date = datetime.now() + timedelta(days=BOOKING_CONFIG["default_checkout_offset"])
-            checkout = checkout_date.strftime("%Y-%m-%d")
-        
-        params = {
-            "ss": city,
-            "checkin": checkin,
-            "checkout": checkout,
-            "group_adults": 2,
-            "group_children": 0,
-            "no_rooms": 1,
-        }
-        
-        query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-        url = f"{self.base_url}/searchresults.html?{query_string}"
-        
+        url = build_search_url(city, checkin, checkout)
         logger.info(f"Built search URL: {url}")
         return url
     
     def search_hotels(self, city: str, checkin: Optional[str] = None, checkout: Optional[str] = None) -> List[Dict]:
-        """Search hotels using launch-per-request model for threading stability"""
+        """Blocking wrapper around search_hotels_async"""
+        return run_sync(self._search_hotels(city, checkin, checkout))
+
+    async def search_hotels_async(self, city: str, checkin: Optional[str] = None, checkout: Optional[str] = None) -> List[Dict]:
+        """Search hotels on a warm page borrowed from the browser pool"""
+        return await run_on_engine(self._search_hotels(city, checkin, checkout))
+
+    async def _search_hotels(self, city: str, checkin: Optional[str], checkout: Optional[str]) -> List[Dict]:
         url = self._build_search_url(city, checkin, checkout)
+        return await search_flights.do(url, lambda: self._scrape_search(url, city))
+
+    @staticmethod
+    def _watch_search_payload(page):
+        """Listen for the page's own GraphQL search response; returns (future, listener)"""
+        payload = asyncio.get_running_loop().create_future()
+        
+        async def on_response(response):
+            if payload.done() or not is_search_payload_url(response.url):
+                return
+            try:
+                data = await response.json()
+            except Exception:
+                return
+            if search_results(data) and not payload.done():
+                payload.set_result(data)
+        
+        page.on("response", on_response)
+        return payload, on_response
+
+    async def _await_search_payload(self, page, payload) -> Optional[List[Dict]]:
+        """
+        Race the JSON payload against the rendered cards: parse the payload if it wins,
+        otherwise return None so the DOM script runs without extra delay.
+        """
+        cards = asyncio.ensure_future(page.wait_for_selector(
+            '[data-testid="property-card"]', timeout=SCRAPER_CONFIG["payload_timeout"] * 1000
+        ))
+        cards.add_done_callback(lambda task: task.cancelled() or task.exception())
+        try:
+            await asyncio.wait({payload, cards}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            cards.cancel()
+        if not payload.done():
+            return None
+        hotels = parse_search_payload(payload.result(), BOOKING_CONFIG["max_results"])
+        if hotels:
+            logger.info(f"📦 Parsed {len(hotels)} hotels from the search payload")
+        return hotels or None
+
+    async def _search_on_page(self, page, url: str) -> List[Dict]:
+        """One search results load on an already leased page"""
+        payload = on_response = None
+        if self.extraction_mode != "dom":
+            payload, on_response = self._watch_search_payload(page)
+        try:
+            logger.info(f"Navigating to search results: {url}")
+            with stage("goto"):
+                await page.goto(url, wait_until='domcontentloaded', timeout=self.timeout)
+            await pass_waf_challenge(page, 12000)
+            
+            hotels_data = None
+            if payload is not None:
+                with stage("payload"):
+                    hotels_data = await self._await_search_payload(page, payload)
+            
+            if not hotels_data:
+                with stage("wait"):
+                    try:
+                        await page.wait_for_selector('[data-testid="property-card"]', timeout=10000)
+                    except PlaywrightTimeout: pass
+                    
+                    # Small delay for content settling
+                    await asyncio.sleep(1)
+                
+                with stage("evaluate"):
+                    hotels_data = await page.evaluate(SEARCH_EXTRACT_SCRIPT, BOOKING_CONFIG["max_results"])
+                hotels_data = [with_hotel_id(hotel) for hotel in hotels_data or []]
+        finally:
+            if on_response:
+                page.remove_listener("response", on_response)
+        
+        SCRAPE_ATTEMPTS.labels("search", "ok" if hotels_data else "empty").inc()
+        return hotels_data or []
+
+    async def _scrape_search(self, url: str, city: str) -> List[Dict]:
+        pool = get_pool()
         
         for attempt in range(self.max_retries):
             try:
                 logger.info(f"Playwright search attempt {attempt + 1}/{self.max_retries} for {city}")
                 
-                with sync_playwright() as p:
-                    browser = p.chromium.launch(
-                        headless=True,
-                        args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage', '--disable-blink-features=AutomationControlled']
-                    )
-                    
-                    context = browser.new_context(
-                        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-                        viewport={'width': 1280, 'height': 800},
-                        locale='en-US'
-                    )
-                    
-                    try:
-                        page = context.new_page()
-                        PlaywrightBookingScraper.setup_route(page)
-                        
-                        logger.info(f"Navigating to search results: {url}")
-                        page.goto(url, wait_until='domcontentloaded', timeout=self.timeout)
-                        
-                        try:
-                            page.wait_for_selector('[data-testid="property-card"]', timeout=10000)
-                        except: pass
-                        
-                        # Small delay for content settling
-                        time.sleep(1)
-                        
-                        hotels_data = page.evaluate('''() => {
-                            const hotels = [];
-                            const cards = document.querySelectorAll('[data-testid="property-card"]');
-                            cards.forEach((card, index) => {
-                                if (index >= 10) return;
-                                try {
-                                    const nameElem = card.querySelector('[data-testid="title"]');
-                                    const name = nameElem ? nameElem.textContent.trim() : null;
-                                    if (!name) return;
-                                    
-                                    let url = null;
-                                    const link = card.querySelector('a[data-testid="title-link"]');
-                                    if (link) url = link.href.split('?')[0];
-                                    
-                                    let price = 0;
-                                    const priceElem = card.querySelector('[data-testid="price-and-discounted-price"]');
-                                    if (priceElem) {
-                                        const m = priceElem.textContent.match(/[\\d,]+/);
-                                        if (m) price = parseFloat(m[0].replace(/,/g, ''));
-                                    }
-                                    
-                                    let rating = 0;
-                                    const scoreElem = card.querySelector('[data-testid="review-score"]');
-                                    if (scoreElem) {
-                                        const m = scoreElem.textContent.match(/([\\d.]+)/);
-                                        if (m) {
-                                            const v = parseFloat(m[1]);
-                                            rating = v > 5 ? v / 2 : v;
-                                        }
-                                    }
-                                    
-                                    const hotel_id = Math.abs(name.split('').reduce((a, b) => {
-                                        a = ((a << 5) - a) + b.charCodeAt(0);
-                                        return a & a;
-                                    }, 0)) % 100000;
-                                    
-                                    hotels.push({
-                                        hotel_id, name, price, currency: 'INR', 
-                                        rating: Math.round(rating * 10) / 10, url 
-                                    });
-                                } catch (e) {}
-                            });
-                            return hotels;
-                        }''')
-                        
-                        if hotels_data:
-                            logger.info(f"✅ Scraped {len(hotels_data)} hotels")
-                            return hotels_data
-                    finally:
-                        browser.close()
+                async with pool.lease() as page:
+                    hotels_data = await self._search_on_page(page, url)
+                    if hotels_data:
+                        logger.info(f"✅ Scraped {len(hotels_data)} hotels")
+                        return hotels_data
             except Exception as e:
+                SCRAPE_ATTEMPTS.labels("search", "error").inc()
                 logger.error(f"Search error on attempt {attempt + 1}: {e}")
                 if attempt < self.max_retries - 1:
-                    time.sleep(1)
+                    await asyncio.sleep(1)
         return []
 
+    async def sweep_dates_async(
+        self, city: str, stays: List[Tuple[str, str]], pages: Optional[int] = None, timeout: Optional[float] = None
+    ) -> Dict[str, List[Dict]]:
+        """
+        Search one city for many (checkin, checkout) stays on a few warm pages kept leased for the
+        whole sweep (`pages`, at most CALENDAR_CONFIG["parallel_pages"]). Returns {checkin: hotels};
+        a stay missing from the result failed on every attempt or was not reached within `timeout`.
+        """
+        return await run_on_engine(self._sweep_dates(city, stays, pages, timeout))
+
+    async def _sweep_dates(
+        self, city: str, stays: List[Tuple[str, str]], pages: Optional[int] = None, timeout: Optional[float] = None
+    ) -> Dict[str, List[Dict]]:
+        pool = get_pool()
+        pending = asyncio.Queue()
+        for stay in stays:
+            pending.put_nowait(stay)
+        results: Dict[str, List[Dict]] = {}
+        
+        async def search_stay(page, url: str) -> List[Dict]:
+            for attempt in range(self.max_retries):
+                try:
+                    return await self._search_on_page(page, url)
+                except Exception as e:
+                    SCRAPE_ATTEMPTS.labels("search", "error").inc()
+                    logger.error(f"Sweep error on attempt {attempt + 1} for {url}: {e}")
+                    if attempt == self.max_retries - 1:
+                        raise
+                    await asyncio.sleep(1)
+        
+        async def sweep_on_page():
+            # Pages take the next stay as they free up; a page that keeps failing is dropped
+            # (and recycled by the pool) while the others finish the remaining stays
+            async with pool.lease() as page:
+                while not pending.empty():
+                    checkin, checkout = pending.get_nowait()
+                    url = self._build_search_url(city, checkin, checkout)
+                    running = search_flights.running(url)
+                    if running is not None:
+                        # A plain search of this date is already running: share its result
+                        results[checkin] = await asyncio.shield(running)
+                    else:
+                        # Not shielded: a cancelled sweep stops driving the page before the lease returns it
+                        results[checkin] = await search_stay(page, url)
+        
+        wanted = min(pages or CALENDAR_CONFIG["parallel_pages"], CALENDAR_CONFIG["parallel_pages"])
+        pages = max(1, min(wanted, pool.size, len(stays)))
+        sweepers = [asyncio.ensure_future(sweep_on_page()) for _ in range(pages)]
+        try:
+            done, unfinished = await asyncio.wait(sweepers, timeout=timeout)
+        finally:
+            for sweeper in sweepers:
+                sweeper.cancel()
+        if unfinished:
+            # Dates swept so far are still returned; the pages go back to the pool first
+            await asyncio.wait(unfinished)
+            logger.warning(f"Sweep for {city} hit its {timeout}s limit")
+        for sweeper in done:
+            if sweeper.exception() is not None:
+                logger.error(f"Sweep page for {city} gave up: {sweeper.exception()}")
+        logger.info(f"✅ Swept {len(results)}/{len(stays)} dates for {city} on {pages} pages")
+        return results
+
+
+async def pass_waf_challenge(page, timeout_ms: float) -> bool:
+    """
+    Wait out an AWS WAF challenge if the page shows one. Loads that needed no challenge count
+    for the context's pooled session; a solved challenge is captured as a new session.
+    Returns False if the challenge did not clear in time.
+    """
+    pool = get_pool()
+    if not await page.query_selector('#challenge-container'):
+        pool.report_session(page, ok=True)
+        return True
+    
+    logger.info("🛡️ AWS WAF challenge detected. Waiting for resolution...")
+    pool.report_session(page, ok=False)
+    try:
+        with stage("waf"):
+            await page.wait_for_selector('#challenge-container', state='hidden', timeout=timeout_ms)
+    except PlaywrightTimeout:
+        WAF_CHALLENGES.labels("timeout").inc()
+        logger.warning("WAF challenge did not resolve in time.")
+        return False
+    WAF_CHALLENGES.labels("solved").inc()
+    logger.info("✅ Challenge resolved!")
+    try:
+        await pool.capture_session(page)
+    except Exception as e:
+        logger.warning(f"Could not capture the cleared session: {e}")
+    return True
+
+
+# --- Shared browser pool ---
+_pool: Optional[BrowserPool] = None
+
+
+def get_pool() -> BrowserPool:
+    """Return the process-wide browser pool (created on first use)"""
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool(page_setup=PlaywrightBookingScraper.setup_route)
+    return _pool
+
+
+# Exported by /metrics once something (the API's pre-warm or first scrape) loads this module
+metrics_runtime.flights.extend([search_flights, details_flights])
+metrics_runtime.pool_getter = get_pool
+
 
 def fetch_hotels_advanced(city: str, checkin: Optional[str] = None, checkout: Optional[str] = None) -> List[Dict]:
     scraper = PlaywrightBookingScraper()
     return scraper.search_hotels(city, checkin, checkout)
 
 
-def fetch_hotel_details(hotel_url: str) -> Optional[Dict]:
-    """Fetch hotel details with launch-per-request model"""
-    try:
-        logger.info(f"Fetching hotel details: {hotel_url}")
-        with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage', '--disable-blink-features=AutomationControlled']
-            )
-            
-            context = browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={'width': 1280, 'height': 800},
-                locale='en-US',
-                timezone_id='Asia/Kolkata',
-                permissions=['geolocation']
-            )
-            
-            try:
-                page = context.new_page()
-                page.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-                PlaywrightBookingScraper.setup_route(page)
+async def fetch_hotels_advanced_async(city: str, checkin: Optional[str] = None, checkout: Optional[str] = None) -> List[Dict]:
+    scraper = PlaywrightBookingScraper()
+    return await scraper.search_hotels_async(city, checkin, checkout)
+
+
+async def sweep_search_dates_async(
+    city: str, stays: List[Tuple[str, str]], pages: Optional[int] = None, timeout: Optional[float] = None
+) -> Dict[str, List[Dict]]:
+    scraper = PlaywrightBookingScraper()
+    return await scraper.sweep_dates_async(city, stays, pages, timeout)
+
 
-                logger.info(f"Navigating to hotel page...")
+class StreamTruncated(Exception):
+    """A stream gave up its page (idle reader or lease limit) before it had every result"""
+
+
+async def stream_hotels_async(
+    city: str,
+    checkin: Optional[str] = None,
+    checkout: Optional[str] = None,
+    max_results: Optional[int] = None,
+) -> AsyncIterator[Dict]:
+    """
+    Yield hotels one at a time as each property card is parsed, moving on to the next
+    results page (Booking's `offset` parameter) only while the consumer keeps reading.
+    The page is parsed in a task of its own and released once the consumer stops reading
+    for STREAM_CONFIG["idle_timeout"] or after STREAM_CONFIG["lease_timeout"] in total; the
+    hotels parsed by then are yielded and StreamTruncated is raised.
+    """
+    scraper = PlaywrightBookingScraper()
+    max_results = min(max_results or STREAM_CONFIG["max_results"], STREAM_CONFIG["max_results"])
+    
+    if get_engine_loop() is not asyncio.get_running_loop():
+        # Pooled pages belong to another loop; fall back to one buffered results page
+        hotels = await scraper.search_hotels_async(city, checkin, checkout)
+        for hotel in hotels[:max_results]:
+            yield hotel
+        return
+    
+    base_url = scraper._build_search_url(city, checkin, checkout)
+    card_selector = '[data-testid="property-card"]'
+    # Backpressure: the page stops parsing while `buffer` hotels wait for the consumer
+    space = asyncio.Semaphore(STREAM_CONFIG["buffer"])
+    ready: asyncio.Queue = asyncio.Queue()
+    done = object()
+    
+    async def scrape_pages():
+        seen = set()
+        offset = 0
+        async with get_pool().lease() as page:
+            while len(seen) < max_results:
+                logger.info(f"Streaming search results page at offset {offset} for {city}")
+                with stage("goto"):
+                    await page.goto(f"{base_url}&offset={offset}", wait_until='domcontentloaded', timeout=scraper.timeout)
+                if not await pass_waf_challenge(page, 12000):
+                    raise RuntimeError("WAF challenge did not clear")
                 try:
-                    # Use domcontentloaded for initial burst, but we'll need to wait for stabilization
-                    page.goto(hotel_url, wait_until='domcontentloaded', timeout=30000)
-                except Exception as e:
-                    logger.warning(f"Initial navigation warning: {e}")
+                    with stage("wait"):
+                        await page.wait_for_selector(card_selector, timeout=10000)
+                except PlaywrightTimeout:
+                    return
                 
-                # 1. Handle WAF Challenge
-                if page.query_selector('#challenge-container'):
-                    logger.info("🛡️ AWS WAF challenge detected. Waiting for resolution...")
+                cards = page.locator(card_selector)
+                total = await cards.count()
+                new_on_page = 0
+                for index in range(total):
+                    hotel = await cards.nth(index).evaluate(CARD_EXTRACT_SCRIPT)
+                    if not hotel:
+                        continue
+                    identity = hotel.get('url') or hotel['name']
+                    if identity in seen:
+                        continue
+                    seen.add(identity)
+                    new_on_page += 1
                     try:
-                        page.wait_for_selector('#challenge-container', state='hidden', timeout=12000)
-                        logger.info("✅ Challenge resolved!")
-                    except:
-                        logger.warning("WAF challenge did not resolve in time.")
-
-                # 2. Stabilization & Interaction
-                # High-speed progressive scroll
-                page.evaluate("window.scrollTo(0, 800);")
-                time.sleep(0.2)
-                
-                # Scroll to facilities section to load full amenities
-                try:
-                    page.evaluate("document.querySelector('#hp_facilities_box, [href=\"#hp_facilities_box\"]')?.scrollIntoView();")
-                    time.sleep(0.3)
-                    # Click "Show all facilities" if it exists
-                    show_all = page.query_selector('a[href="#hotelTmpl"], button[data-testid="show-all-facilities"], .show_all_facilities_trigger')
-                    if show_all:
-                        show_all.click()
-                        time.sleep(0.5)
-                except: pass
+                        await asyncio.wait_for(space.acquire(), STREAM_CONFIG["idle_timeout"])
+                    except asyncio.TimeoutError:
+                        logger.warning(f"Stream for {city} not read for {STREAM_CONFIG['idle_timeout']}s; releasing its page")
+                        raise StreamTruncated(f"not read for {STREAM_CONFIG['idle_timeout']}s")
+                    ready.put_nowait(with_hotel_id(hotel))
+                    if len(seen) >= max_results:
+                        return
                 
-                # Scroll to availability for room types
-                page.evaluate("document.querySelector('#availability_target')?.scrollIntoView();")
-                time.sleep(0.4) # Brief wait for rooms
-                
-                # Trigger Reviews only if really needed (already getting many from DOM)
-                try:
-                    review_count = page.evaluate("document.querySelectorAll('[data-testid=\"review-card\"], .review_item').length")
-                    if review_count < 3:
-                        trigger = page.query_selector('#reviews-tab-trigger, [data-testid="read-all-actionable"]')
-                        if trigger:
-                            trigger.click()
-                            time.sleep(0.8)
-                except: pass
-
-                # Final wait for core content
-                try:
-                    page.wait_for_selector('[data-testid="property-name"]', timeout=3000)
-                except: pass
-
-                # --- Extraction Logic ---
-                hotel_data = page.evaluate('''() => {
-                    const d = {
-                        name: '', rating: 0, address: '', description: '',
-                        amenities: [], reviews: [], photos: [], room_types: []
-                    };
-                    
-                    // 1. Basic Info (JSON-LD)
-                    try {
-                        const ld = JSON.parse(document.querySelector('script[type="application/ld+json"]')?.innerText || '{}');
-                        d.name = ld.name || '';
-                        d.rating = ld.aggregateRating?.ratingValue || 0;
-                        d.address = ld.address?.streetAddress || '';
-                        d.description = ld.description || '';
-                    } catch(e) {}
-
-                    // 2. DOM Fallbacks for basic info
-                    if (!d.name) d.name = document.querySelector('[data-testid="property-name"], h2.hp__hotel-name')?.innerText?.trim() || '';
-                    if (!d.address) d.address = document.querySelector('.hp_address_subtitle, [data-testid="address_badge"]')?.innerText?.trim() || '';
-                    if (!d.description) {
-                        const descEl = document.querySelector('#property_description_content, [data-testid="property-description"]');
-                        d.description = descEl ? descEl.innerText.trim() : '';
-                    }
+                # Past the last page Booking repeats results (or shows none)
+                if new_on_page == 0:
+                    return
+                offset += total
+    
+    async def produce():
+        # The page is held for at most lease_timeout, however slowly the client reads
+        try:
+            await asyncio.wait_for(scrape_pages(), STREAM_CONFIG["lease_timeout"])
+        except asyncio.TimeoutError:
+            logger.warning(f"Stream for {city} hit its {STREAM_CONFIG['lease_timeout']}s limit; releasing its page")
+            ready.put_nowait(StreamTruncated(f"hit the {STREAM_CONFIG['lease_timeout']}s limit"))
+        except Exception as e:
+            ready.put_nowait(e)
+        finally:
+            ready.put_nowait(done)
+    
+    producer = asyncio.get_running_loop().create_task(produce())
+    try:
+        while True:
+            item = await ready.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            space.release()
+            yield item
+    finally:
+        producer.cancel()
 
-                    // 3. Amenities (Full extraction without limits)
-                    const seenAms = new Set();
-                    
-                    // First, popular facilities
-                    document.querySelectorAll('.hp_desc_important_facilities div, [data-testid="property-most-popular-facilities-wrapper"] span, .important_facility').forEach(el => {
-                        const text = el.innerText.trim();
-                        if (text && !seenAms.has(text)) {
-                            seenAms.add(text);
-                            d.amenities.push({ category: 'Popular', name: text });
-                        }
-                    });
-
-                    // Next, full facilities list by category
-                    document.querySelectorAll('.hotel_facilities_block, .hp-facilities-box, #hp_facilities_box .hotel_facilities_block').forEach(block => {
-                        const category = block.querySelector('h3, h4')?.innerText?.trim() || 'General';
-                        block.querySelectorAll('li, .hp-facilites-list li').forEach(item => {
-                            const text = item.innerText.trim();
-                            if (text && !seenAms.has(text)) {
-                                seenAms.add(text);
-                                d.amenities.push({ category: category, name: text });
-                            }
-                        });
-                    });
-
-                    // Catch-all for any other lists in the facilities area
-                    document.querySelectorAll('#hp_facilities_box li, [data-testid="property-section-content"] li').forEach(el => {
-                        const text = el.innerText.trim();
-                        if (text && !seenAms.has(text)) {
-                            seenAms.add(text);
-                            d.amenities.push({ category: 'General', name: text });
-                        }
-                    });
-
-                    // 4. Reviews extraction (Aligned with HotelReview model)
-                    const reviewSelectors = [
-                        '[data-testid="review-card"]',
-                        '.review_item',
-                        '.c-review-block',
-                        '[data-testid="featuredreview"]'
-                    ];
-                    
-                    const seenReviews = new Set();
-                    for (const sel of reviewSelectors) {
-                        document.querySelectorAll(sel).forEach(el => {
-                            const text = el.querySelector('[data-testid="review-text"], .review_item_main_content, .c-review__body, [data-testid="featuredreview-text"]')?.innerText?.trim();
-                            if (text && !seenReviews.has(text) && seenReviews.size < 5) {
-                                seenReviews.add(text);
-                                // Enhanced Author Extraction
-                                const authorSelectors = [
-                                    '.review_item_reviewer h4',
-                                    '[data-testid="review-author-name"]',
-                                    '.bui-avatar-block__title',
-                                    '[data-testid="featuredreview-avatar"]',
-                                    '.review-card__header__name'
-                                ];
-                                let author = 'Guest';
-                                for (const aSel of authorSelectors) {
-                                    const aEl = el.querySelector(aSel);
-                                    if (aEl && aEl.innerText.trim()) {
-                                        author = aEl.innerText.trim().split('\\n')[0]; // Take first line (name)
-                                        break;
-                                    }
-                                }
-                                
-                                // Enhanced Score Extraction
-                                let scoreEl = el.querySelector('[data-testid="review-score-badge"], [data-testid="review-scoreBadge"], .bui-review-score__badge, .review-score-badge, .a3b87295b3, .ebf0170a44, .d1921f0084');
-                                let score = 0;
-                                if (scoreEl) {
-                                    let scoreText = scoreEl.innerText || scoreEl.getAttribute('aria-label') || '0';
-                                    score = parseFloat(scoreText.match(/[\\d.]+/)?.[0] || '0');
-                                } else {
-                                    // Fallback to searching any div/span within the card that has a numeric class or content
-                                    const scoreCandidates = Array.from(el.querySelectorAll('div, span')).filter(e => /^\\d+(\\.\\d+)?$/.test(e.innerText.trim()));
-                                    if (scoreCandidates.length > 0) {
-                                        score = parseFloat(scoreCandidates[0].innerText);
-                                    }
-                                }
-                                
-                                // Final fallback for snippet reviews (featured) which often don't have individual scores visible
-                                if (score === 0 && d.rating > 0) score = d.rating;
-                                
-                                d.reviews.push({ reviewer_name: author, comment: text, rating: score });
-
-                            }
-                        });
-                        if (d.reviews.length >= 3) break;
-                    }
 
-                    // 5. Photos extraction (Skipped as requested)
-                    d.photos = [];
-
-                    // 6. Room Types extraction (Aligned with RoomType model)
-                    const roomNames = new Set();
-                    const roomSelectors = [
-                        '.rt-room-info',
-                        '[data-testid="room-title"]',
-                        '.hprt-roomtype-link',
-                        '[data-room-id] .hprt-roomtype-icon-link',
-                        '.hp-rt-room-name',
-                        '[data-testid="rt-room-card"] .hprt-roomtype-link',
-                        '.hprt-table-cell-roomtype .hprt-roomtype-icon-link',
-                        '.room-info a'
-                    ];
-                    for (const rs of roomSelectors) {
-                        document.querySelectorAll(rs).forEach(el => {
-                            const name = el.innerText.trim().split('\\n')[0];
-                            if (name && name.length > 3 && !roomNames.has(name) && roomNames.size < 10) {
-                                roomNames.add(name);
-                                d.room_types.push({ name: name, price: 0.0, currency: 'INR' });
-                            }
-                        });
-                    }
+def fetch_hotel_details(
+    hotel_url: str, sections: Optional[List[str]] = None, deadline: Optional[float] = None
+) -> Optional[Dict]:
+    """Blocking wrapper around fetch_hotel_details_async"""
+    return run_sync(_fetch_hotel_details(hotel_url, sections, deadline))
 
-                    // Secondary fallback for room types from window data if extraction failed
-                    if (d.room_types.length === 0) {
-                        try {
-                            const b_env = window.booking?.env || {};
-                            const rooms = b_env.b_room_group || b_env.hprt_room_data || [];
-                            rooms.forEach(r => {
-                                if (r.name && !roomNames.has(r.name)) {
-                                    roomNames.add(r.name);
-                                    d.room_types.push({ name: r.name, price: 0.0, currency: 'INR' });
-                                }
-                            });
-                        } catch(e) {}
-                    }
 
-                    
-                    return d;
-                }''')
-                
-                # Post-process in python
-                if hotel_data and hotel_data.get('name'):
-                    name = hotel_data['name']
-                    # Use absolute value of hash to avoid negative IDs
-                    hotel_id = abs(hash(name)) % 100000
-                    hotel_data['hotel_id'] = hotel_id
-                    
-                    # Fix rating if exceeds 5 (Booking uses 10-point scale sometimes)
-                    if hotel_data.get('rating') and hotel_data['rating'] > 5:
-                        hotel_data['rating'] = round(hotel_data['rating'] / 2, 1)
-                    
-                    logger.info(f"✅ Successfully fetched details for: {name}")
-                    return hotel_data
-                
-                return None
-            finally:
-                browser.close()
+async def fetch_hotel_details_async(
+    hotel_url: str, sections: Optional[List[str]] = None, deadline: Optional[float] = None
+) -> Optional[Dict]:
+    """
+    Fetch hotel details on a warm page borrowed from the browser pool.
+    With `sections` (keys of DETAIL_SECTIONS) only the page interactions those sections need are run.
+    With `deadline` (seconds) whatever was extracted is returned when time runs out; the result's
+    "sections" map tells which sections finished loading.
+    """
+    return await run_on_engine(_fetch_hotel_details(hotel_url, sections, deadline))
+
+
+async def _fetch_hotel_details(hotel_url: str, sections: Optional[List[str]], deadline: Optional[float] = None) -> Optional[Dict]:
+    wanted = sorted(set(sections or DETAIL_SECTIONS) | {"info"})
+    key = f"{canonical_hotel_url(hotel_url)}|{','.join(wanted)}"
+    if deadline is not None:
+        # A deadline-cut result must not be handed to callers with more time
+        key += f"|{deadline:.1f}"
+    return await details_flights.do(key, lambda: _scrape_hotel_details(hotel_url, wanted, deadline))
+
+
+# Elements whose presence means a details section has rendered
+SECTION_READY_SELECTORS = {
+    "amenities": '#hp_facilities_box li, .hotel_facilities_block li, .important_facility, '
+                 '[data-testid="property-most-popular-facilities-wrapper"] span',
+    "reviews": '[data-testid="review-card"], .review_item, [data-testid="featuredreview"]',
+    "room_types": '.hprt-roomtype-link, [data-testid="room-title"], .rt-room-info, .hp-rt-room-name',
+}
+FACILITY_ITEMS = '#hp_facilities_box li, .hotel_facilities_block li'
+REVIEW_CARDS = '[data-testid="review-card"], .review_item'
+COUNT_SCRIPT = "(selector) => document.querySelectorAll(selector).length"
+GREW_SCRIPT = "([selector, before]) => document.querySelectorAll(selector).length > before"
+
+# Longest wait for each interaction when no deadline cuts it short (seconds)
+SECTION_WAITS = {"amenities": 3, "reviews": 3, "room_types": 3}
+
+
+class _Budget:
+    """Time left before an optional deadline, minus the extraction reserve"""
+    
+    def __init__(self, deadline: Optional[float]):
+        self.expires = None if deadline is None else time.monotonic() + deadline
+    
+    def left(self, cap: float) -> float:
+        if self.expires is None:
+            return cap
+        return max(0.0, min(cap, self.expires - time.monotonic() - EXTRACT_RESERVE))
+    
+    def ms(self, cap: float) -> float:
+        # Playwright reads a timeout of 0 as "wait forever"
+        return max(self.left(cap) * 1000, 1)
+
+
+async def _load_amenities(page, timeout_ms: float):
+    await page.evaluate("document.querySelector('#hp_facilities_box, [href=\"#hp_facilities_box\"]')?.scrollIntoView();")
+    show_all = await page.query_selector('a[href="#hotelTmpl"], button[data-testid="show-all-facilities"], .show_all_facilities_trigger')
+    if show_all:
+        before = await page.evaluate(COUNT_SCRIPT, FACILITY_ITEMS)
+        await show_all.click(timeout=timeout_ms)
+        # Done as soon as the expanded list renders, rather than after a fixed pause
+        await page.wait_for_function(GREW_SCRIPT, arg=[FACILITY_ITEMS, before], timeout=timeout_ms)
+    else:
+        await page.wait_for_selector(SECTION_READY_SELECTORS["amenities"], state="attached", timeout=timeout_ms)
+
+
+async def _load_room_types(page, timeout_ms: float):
+    await page.evaluate("document.querySelector('#availability_target')?.scrollIntoView();")
+    await page.wait_for_selector(SECTION_READY_SELECTORS["room_types"], state="attached", timeout=timeout_ms)
+
+
+async def _load_reviews(page, timeout_ms: float):
+    # Only open the reviews panel when the page shows too few (featured reviews usually suffice)
+    before = await page.evaluate(COUNT_SCRIPT, REVIEW_CARDS)
+    if before >= 3:
+        return
+    trigger = await page.query_selector('#reviews-tab-trigger, [data-testid="read-all-actionable"]')
+    if trigger:
+        await trigger.click(timeout=timeout_ms)
+        await page.wait_for_function(GREW_SCRIPT, arg=[REVIEW_CARDS, before], timeout=timeout_ms)
+    else:
+        await page.wait_for_selector(SECTION_READY_SELECTORS["reviews"], state="attached", timeout=timeout_ms)
+
+
+SECTION_LOADERS = {
+    "amenities": _load_amenities,
+    "room_types": _load_room_types,
+    "reviews": _load_reviews,
+}
+
+
+async def _scrape_hotel_details(hotel_url: str, sections: List[str], deadline: Optional[float] = None) -> Optional[Dict]:
+    budget = _Budget(deadline)
+    complete = {}
+    try:
+        logger.info(f"Fetching hotel details: {hotel_url} (sections: {', '.join(sections)})")
+        async with get_pool().lease(timeout=budget.left(get_pool().lease_timeout)) as page:
+            logger.info(f"Navigating to hotel page...")
+            try:
+                # Use domcontentloaded for initial burst; each section then waits for its own content
+                with stage("goto"):
+                    await page.goto(hotel_url, wait_until='domcontentloaded', timeout=budget.ms(30))
+            except Exception as e:
+                logger.warning(f"Initial navigation warning: {e}")
+            
+            # 1. Handle WAF Challenge (skipped when the context reuses a cleared session)
+            await pass_waf_challenge(page, budget.ms(12))
+
+            # 2. Only the interactions the requested sections need, each until its content shows up
+            with stage("scroll"):
+                await page.evaluate("window.scrollTo(0, 800);")
+            
+            for section in sections:
+                loader = SECTION_LOADERS.get(section)
+                if loader is None:
+                    continue
+                cap = SECTION_WAITS[section]
+                timeout = budget.left(cap)
+                if timeout <= 0:
+                    complete[section] = False
+                    continue
+                try:
+                    with stage(section):
+                        await asyncio.wait_for(loader(page, timeout * 1000), timeout)
+                    complete[section] = True
+                except (PlaywrightTimeout, asyncio.TimeoutError):
+                    # Missing and slow to render look the same: never cache a timed-out section as complete
+                    complete[section] = False
+                except Exception as e:
+                    logger.debug(f"Loading {section} failed for {hotel_url}: {e}")
+                    complete[section] = False
+
+            # Final wait for core content
+            with stage("wait"):
+                try:
+                    await page.wait_for_selector('[data-testid="property-name"]', timeout=budget.ms(3))
+                except PlaywrightTimeout: pass
+
+            # --- Extraction Logic ---
+            with stage("evaluate"):
+                hotel_data = await page.evaluate(DETAILS_EXTRACT_SCRIPT)
+            
+            # Post-process in python
+            if hotel_data and hotel_data.get('name'):
+                SCRAPE_ATTEMPTS.labels("details", "ok").inc()
+                complete["info"] = True
+                hotel_data["sections"] = {section: complete.get(section, False) for section in sections}
+                partial = [section for section, done in hotel_data["sections"].items() if not done]
+                if partial:
+                    logger.info(f"⏱️ Returning partial details for {hotel_data['name']} (incomplete: {', '.join(partial)})")
+                else:
+                    logger.info(f"✅ Successfully fetched details for: {hotel_data['name']}")
+                return normalize_hotel_details(hotel_data, hotel_url)
+            
+            SCRAPE_ATTEMPTS.labels("details", "empty").inc()
+            return None
     except Exception as e:
+        SCRAPE_ATTEMPTS.labels("details", "error").inc()
         logger.error(f"Detail error for {hotel_url}: {e}")
         return None
-
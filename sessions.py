@@ -0,0 +1,145 @@
+"""
+Pool of browser session states that already passed Booking's AWS WAF challenge
+Once a context solves a challenge its storage state (cookies incl. the clearance
+token, local storage) is captured here and handed to later contexts, so they skip
+the challenge until the token expires or the session starts failing.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import itertools
+import logging
+import time
+
+from config import SESSION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionState:
+    id: int
+    state: Dict  # Playwright storage_state(): {"cookies": [...], "origins": [...]}
+    created_at: float = field(default_factory=time.time)
+    expires_at: float = 0.0
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    retired: bool = False
+
+    @property
+    def cookies(self) -> List[Dict]:
+        return self.state.get("cookies", [])
+
+    @property
+    def uses(self) -> int:
+        return self.successes + self.failures
+
+    @property
+    def success_ratio(self) -> float:
+        return self.successes / self.uses if self.uses else 1.0
+
+    @property
+    def usable(self) -> bool:
+        return not self.retired and time.time() < self.expires_at
+
+
+class SessionStatePool:
+    """Cleared sessions, best first; counters retire sessions that stop passing the WAF"""
+
+    def __init__(self):
+        self.enabled = SESSION_CONFIG["enabled"]
+        self.max_sessions = SESSION_CONFIG["max_sessions"]
+        self.max_age = SESSION_CONFIG["max_age"]
+        self.max_failures = SESSION_CONFIG["max_consecutive_failures"]
+        self.min_success_ratio = SESSION_CONFIG["min_success_ratio"]
+        self.min_uses = SESSION_CONFIG["min_uses_for_ratio"]
+        self.clearance_cookie = SESSION_CONFIG["clearance_cookie"]
+        self._sessions: List[SessionState] = []
+        self._ids = itertools.count(1)
+        self.captured = 0
+        self.retired = 0
+
+    def _prune(self):
+        self._sessions = [s for s in self._sessions if s.usable]
+
+    def acquire(self) -> Optional[SessionState]:
+        """Best usable session (highest success ratio, then newest), or None"""
+        if not self.enabled:
+            return None
+        self._prune()
+        if not self._sessions:
+            return None
+        return max(self._sessions, key=lambda s: (s.success_ratio, s.created_at))
+
+    def add(self, state: Dict) -> Optional[SessionState]:
+        """Keep a captured storage state if it carries a WAF clearance cookie"""
+        if not self.enabled:
+            return None
+        clearance = [c for c in state.get("cookies", []) if c.get("name") == self.clearance_cookie]
+        if not clearance:
+            logger.info("Captured session has no WAF clearance cookie; not pooling it")
+            return None
+        expires_at = time.time() + self.max_age
+        cookie_expiry = clearance[0].get("expires", -1)
+        if cookie_expiry and cookie_expiry > 0:
+            expires_at = min(expires_at, cookie_expiry)
+
+        session = SessionState(id=next(self._ids), state=state, expires_at=expires_at)
+        self._prune()
+        self._sessions.append(session)
+        if len(self._sessions) > self.max_sessions:
+            # Drop the weakest (lowest success ratio, then oldest)
+            weakest = min(self._sessions, key=lambda s: (s.success_ratio, s.created_at))
+            self._sessions.remove(weakest)
+        self.captured += 1
+        logger.info(f"🍪 Captured WAF-cleared session {session.id} (valid {int(expires_at - time.time())}s)")
+        return session
+
+    def report(self, session: SessionState, ok: bool):
+        """Record whether a page load with this session got through without a challenge"""
+        if ok:
+            session.successes += 1
+            session.consecutive_failures = 0
+            return
+        session.failures += 1
+        session.consecutive_failures += 1
+        if session.consecutive_failures >= self.max_failures or (
+            session.uses >= self.min_uses and session.success_ratio < self.min_success_ratio
+        ):
+            self.invalidate(session, f"{session.failures}/{session.uses} loads challenged")
+
+    def invalidate(self, session: SessionState, reason: str = "invalidated"):
+        if session.retired:
+            return
+        session.retired = True
+        self.retired += 1
+        if session in self._sessions:
+            self._sessions.remove(session)
+        logger.info(f"🗑️ Retired session {session.id}: {reason}")
+
+    def clear(self):
+        for session in list(self._sessions):
+            self.invalidate(session, "cleared")
+
+    def stats(self) -> dict:
+        self._prune()
+        return {
+            "enabled": self.enabled,
+            "active": len(self._sessions),
+            "captured": self.captured,
+            "retired": self.retired,
+            "sessions": [
+                {
+                    "id": s.id,
+                    "successes": s.successes,
+                    "failures": s.failures,
+                    "expires_in": int(s.expires_at - time.time()),
+                }
+                for s in self._sessions
+            ],
+        }
+
+
+# Shared by every pooled browser context
+session_pool = SessionStatePool()
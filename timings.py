@@ -0,0 +1,61 @@
+"""
+Per-stage timing for scraper runs
+Wrap a step in `with stage("goto"):` and its duration is added to the StageTimer
+active in the current context (if any) and passed to every registered hook.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+import time
+
+_current: ContextVar[Optional["StageTimer"]] = ContextVar("stage_timer", default=None)
+
+# Called as hook(stage_name, seconds) for every finished stage
+_hooks: List[Callable[[str, float], None]] = []
+
+
+class StageTimer:
+    """Collects stage durations for everything run inside `with StageTimer():`"""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._token = None
+
+    def add(self, name: str, seconds: float):
+        self.seconds[name] += seconds
+        self.counts[name] += 1
+
+    def as_ms(self) -> Dict[str, float]:
+        return {name: round(total * 1000, 2) for name, total in self.seconds.items()}
+
+    def __enter__(self) -> "StageTimer":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+
+
+def add_hook(hook: Callable[[str, float], None]):
+    _hooks.append(hook)
+
+
+def current_timer() -> Optional[StageTimer]:
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timer = _current.get()
+        if timer is not None:
+            timer.add(name, elapsed)
+        for hook in _hooks:
+            hook(name, elapsed)
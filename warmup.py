@@ -0,0 +1,129 @@
+"""
+Startup pre-warm and readiness
+The API starts serving as soon as main.py is imported, without Playwright, lxml or NumPy;
+a background task then imports the scrapers, launches the browser pool and searches the
+configured hot cities into the cache, timing each phase. /readyz is 200 once it is done.
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import importlib
+import logging
+import time
+
+from config import STARTUP_CONFIG
+
+# main.py imports this module first: startup is timed from here
+BOOTED_AT = time.monotonic()
+
+logger = logging.getLogger(__name__)
+
+# Modules behind the first scrape; imported in a thread so the event loop keeps serving
+HEAVY_MODULES = ["scraper_playwright", "scraper", "hotel_store"]
+
+
+class Warmup:
+    """Runs the pre-warm phases after startup and records how long each one took"""
+
+    def __init__(self, start_browser: Optional[Callable[[], Awaitable]], warm_city: Callable[[str], Awaitable]):
+        self.start_browser = start_browser  # None when this process does not drive browsers
+        self.warm_city = warm_city
+        self.enabled = STARTUP_CONFIG["prewarm"]
+        self.cities: List[str] = STARTUP_CONFIG["prewarm_cities"]
+        self.phases: Dict[str, float] = {}  # Phase -> seconds
+        self.ready = False
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.cities_failed: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+        self._cities_task: Optional[asyncio.Task] = None
+
+    def _mark(self, phase: str, started: float):
+        self.phases[phase] = round(time.monotonic() - started, 3)
+
+    def start(self):
+        """Call from the startup event: times the app import and starts the pre-warm task"""
+        self._mark("app", BOOTED_AT)
+        if not self.enabled:
+            # Everything loads on the first request that needs it
+            self._set_ready()
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._cities_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._cities_task = None
+
+    async def _load(self) -> bool:
+        """Import the scrapers and launch the browser pool; False (with `error` set) if either failed"""
+        self.attempts += 1
+        try:
+            started = time.monotonic()
+            for name in HEAVY_MODULES:
+                await asyncio.to_thread(importlib.import_module, name)
+            self._mark("imports", started)
+
+            if self.start_browser and STARTUP_CONFIG["prewarm_browser"]:
+                started = time.monotonic()
+                await self.start_browser()
+                self._mark("browser", started)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            logger.error(f"❌ Pre-warm attempt {self.attempts} failed: {self.error}")
+            return False
+        self.error = None
+        return True
+
+    async def _run(self):
+        delay = STARTUP_CONFIG["retry_delay"]
+        while not await self._load():
+            # Not ready yet: requests still load and launch everything lazily, /readyz says why
+            logger.info(f"Retrying pre-warm in {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, STARTUP_CONFIG["max_retry_delay"])
+
+        if self.cities:
+            started = time.monotonic()
+            self._cities_task = asyncio.get_running_loop().create_task(self._warm_cities())
+            done, _ = await asyncio.wait({self._cities_task}, timeout=STARTUP_CONFIG["prewarm_timeout"])
+            if not done:
+                # Slow searches keep filling the cache in the background
+                logger.warning(f"City pre-warm still running after {STARTUP_CONFIG['prewarm_timeout']}s; reporting ready")
+            self._mark("cities", started)
+        self._set_ready()
+
+    async def _warm_cities(self):
+        budget = asyncio.Semaphore(STARTUP_CONFIG["prewarm_concurrency"])
+
+        async def warm(city: str):
+            async with budget:
+                try:
+                    await self.warm_city(city)
+                except Exception as e:
+                    self.cities_failed.append(city)
+                    logger.error(f"Pre-warm search for {city} failed: {e}")
+
+        await asyncio.gather(*(warm(city) for city in self.cities))
+
+    def _set_ready(self):
+        self._mark("total", BOOTED_AT)
+        self.ready = True
+        phases = ", ".join(f"{phase} {seconds}s" for phase, seconds in self.phases.items() if phase != "total")
+        logger.info(f"🚀 Ready {self.phases['total']}s after start ({phases})")
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "prewarm": self.enabled,
+            "phases": self.phases,
+            "cities": {"requested": self.cities, "failed": self.cities_failed} if self.enabled else None,
+            "error": self.error,
+            "attempts": self.attempts,
+            "uptime": round(time.monotonic() - BOOTED_AT, 1),
+        }
@@ -0,0 +1,219 @@
+"""
+Scraper worker fleet
+Runs Playwright scrape jobs from the SQLite job queue (jobqueue.py) outside the API
+process, so slow browser sessions never share an event loop with request handling and
+browsers scale independently of API replicas. Enable in the API with
+SCRAPER_WORKERS_ENABLED=true.
+
+    python worker.py                # WORKER_CONFIG["workers"] processes (SCRAPER_WORKERS env)
+    python worker.py --workers 4
+
+The supervisor replaces workers that exit or stop heartbeating and requeues their jobs.
+"""
+
+from typing import Dict
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from config import BROWSER_POOL_CONFIG, CALENDAR_CONFIG, WORKER_CONFIG
+from jobqueue import JobQueue, get_job_queue
+
+logger = logging.getLogger("worker")
+
+
+async def run_search(payload: Dict):
+    from scraper_playwright import PlaywrightBookingScraper
+    return await PlaywrightBookingScraper().search_hotels_async(
+        payload["city"], payload.get("checkin"), payload.get("checkout")
+    )
+
+
+async def run_details(payload: Dict):
+    from scraper_playwright import fetch_hotel_details_async
+    return await fetch_hotel_details_async(payload["hotel_url"], payload.get("sections"), payload.get("deadline"))
+
+
+async def run_calendar(payload: Dict):
+    from scraper_playwright import sweep_search_dates_async
+    return await sweep_search_dates_async(
+        payload["city"], [tuple(stay) for stay in payload["stays"]], payload.get("pages"), payload.get("timeout")
+    )
+
+
+JOB_HANDLERS = {
+    "search": run_search,
+    "details": run_details,
+    "calendar": run_calendar,
+}
+
+# Jobs that may run longer than WORKER_CONFIG["job_timeout"]
+JOB_TIMEOUTS = {
+    "calendar": CALENDAR_CONFIG["timeout"],
+}
+
+
+class Worker:
+    """One process: a browser pool plus up to `concurrency` jobs at a time"""
+
+    def __init__(self, worker_id: str, queue: JobQueue):
+        self.worker_id = worker_id
+        self.queue = queue
+        self.concurrency = WORKER_CONFIG["concurrency"]
+
+    async def _heartbeat(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.queue.heartbeat, self.worker_id)
+            except Exception as e:
+                logger.warning(f"Heartbeat failed: {e}")
+            await asyncio.sleep(WORKER_CONFIG["heartbeat_interval"])
+
+    async def _run_job(self, job: Dict):
+        handler = JOB_HANDLERS.get(job["kind"])
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown job kind {job['kind']}")
+            timeout = JOB_TIMEOUTS.get(job["kind"], WORKER_CONFIG["job_timeout"])
+            result = await asyncio.wait_for(handler(job["payload"]), timeout)
+            await asyncio.to_thread(self.queue.complete, job["id"], self.worker_id, result)
+            logger.info(f"✅ Job {job['id']} ({job['kind']}) done")
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            logger.error(f"Job {job['id']} ({job['kind']}) failed: {error}")
+            await asyncio.to_thread(self.queue.fail, job["id"], self.worker_id, error)
+
+    async def run(self):
+        from browser_pool import bind_engine_loop
+        from scraper_playwright import get_pool
+
+        self.queue.register_worker(self.worker_id, os.getpid())
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat())
+        bind_engine_loop(asyncio.get_running_loop())
+        await get_pool().start()
+        logger.info(f"🚀 Worker {self.worker_id} ready ({self.concurrency} concurrent jobs)")
+
+        free = asyncio.Semaphore(self.concurrency)
+        running = set()
+        try:
+            while True:
+                await free.acquire()
+                job = await asyncio.to_thread(self.queue.claim, self.worker_id)
+                if job is None:
+                    free.release()
+                    await asyncio.sleep(WORKER_CONFIG["poll_interval"])
+                    continue
+                task = asyncio.get_running_loop().create_task(self._run_job(job))
+                running.add(task)
+                task.add_done_callback(running.discard)
+                task.add_done_callback(lambda _: free.release())
+        finally:
+            heartbeat.cancel()
+            await get_pool().close()
+
+
+def worker_main(worker_id: str):
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s [{worker_id}] %(name)s: %(message)s")
+    # One pool slot per concurrent job
+    BROWSER_POOL_CONFIG["size"] = WORKER_CONFIG["concurrency"]
+    try:
+        asyncio.run(Worker(worker_id, get_job_queue()).run())
+    except KeyboardInterrupt:
+        pass
+
+
+class Supervisor:
+    """Keeps `count` worker processes alive and replaces dead or stuck ones"""
+
+    def __init__(self, count: int, queue: JobQueue):
+        self.count = count
+        self.queue = queue
+        self.host = socket.gethostname()
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.worker_ids: Dict[int, str] = {}
+        self.spawned_at: Dict[int, float] = {}
+        self.generation = 0
+        self.restarts = 0
+        self._stopping = False
+
+    def spawn(self, index: int):
+        self.generation += 1
+        worker_id = f"{self.host}:{index}.{self.generation}"
+        process = self.context.Process(target=worker_main, args=(worker_id,), name=f"scraper-worker-{index}", daemon=True)
+        process.start()
+        self.processes[index] = process
+        self.worker_ids[index] = worker_id
+        self.spawned_at[index] = time.time()
+        logger.info(f"Started worker {worker_id} (pid {process.pid})")
+
+    def replace(self, index: int, reason: str):
+        worker_id = self.worker_ids[index]
+        process = self.processes[index]
+        logger.warning(f"♻️ Replacing worker {worker_id}: {reason}")
+        if process.is_alive():
+            process.kill()
+        process.join(timeout=10)
+        requeued = self.queue.release_worker(worker_id, WORKER_CONFIG["max_attempts"])
+        if requeued:
+            logger.info(f"Requeued {requeued} jobs from {worker_id}")
+        self.queue.remove_worker(worker_id)
+        self.restarts += 1
+        self.spawn(index)
+
+    def check(self):
+        heartbeats = self.queue.worker_heartbeats()
+        now = time.time()
+        for index, process in list(self.processes.items()):
+            if not process.is_alive():
+                self.replace(index, f"exited with code {process.exitcode}")
+                continue
+            # Before its first heartbeat a worker is judged by its start time
+            last_seen = max(heartbeats.get(self.worker_ids[index]) or 0, self.spawned_at[index])
+            if now - last_seen > WORKER_CONFIG["stuck_after"]:
+                self.replace(index, f"no heartbeat for {int(now - last_seen)}s")
+        # Also covers workers of a supervisor that died without cleaning up
+        self.queue.requeue_stale(WORKER_CONFIG["stuck_after"], WORKER_CONFIG["max_attempts"])
+
+    def stop(self, *args):
+        self._stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        for index in range(self.count):
+            self.spawn(index)
+        last_purge = time.time()
+        try:
+            while not self._stopping:
+                time.sleep(WORKER_CONFIG["heartbeat_interval"])
+                self.check()
+                if time.time() - last_purge > WORKER_CONFIG["retention"]:
+                    self.queue.purge(WORKER_CONFIG["retention"])
+                    last_purge = time.time()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            logger.info("Stopping workers")
+            for index, process in self.processes.items():
+                process.terminate()
+            for index, process in self.processes.items():
+                process.join(timeout=10)
+                self.queue.release_worker(self.worker_ids[index], WORKER_CONFIG["max_attempts"])
+                self.queue.remove_worker(self.worker_ids[index])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=WORKER_CONFIG["workers"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    Supervisor(args.workers, get_job_queue()).run()
+
+
+if __name__ == "__main__":
+    main()